@@ -0,0 +1,279 @@
+"""
+Benchmark harness for the order/payment/report hot paths.
+
+    python -m benchmarks.hot_paths --scale 1k 100k --workers 1 8 --output bench.json
+    python -m benchmarks.hot_paths --scale 1k --baseline bench.json
+
+Seeds a synthetic catalog, customer base and order history (scale = number
+of historical orders) into the in-process SQLite backend, then drives the
+service methods single-threaded and from a thread pool. For every operation
+it reports latency percentiles, throughput and the number of DAO round trips
+per call. Results are written as JSON; --baseline compares against an earlier
+run and exits non-zero on regressions.
+"""
+import argparse
+import json
+import platform
+import random
+import statistics
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List
+
+from src.config import SupabaseConfig
+from src.dao.cache import get_cache
+from src.dao.sqlite_backend import SQLiteClient
+from src.services.order_service import OrderService
+from src.services.payment_service import PaymentService
+from src.services.report_service import ReportService
+
+SCALES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+
+# ------------------ Round-trip counting ------------------
+class _CountingQuery:
+    def __init__(self, query, client: "CountingClient"):
+        self._query = query
+        self._client = client
+
+    def __getattr__(self, name):
+        attr = getattr(self._query, name)
+        if not callable(attr):
+            return attr
+
+        def chained(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            return self if result is self._query else result
+        return chained
+
+    def execute(self):
+        self._client.count(f"{self._query.http_method} {self._query.path}")
+        return self._query.execute()
+
+
+class CountingClient:
+    """Wraps a client and counts every executed request, like network round trips."""
+
+    def __init__(self, client):
+        self.client = client
+        self.calls: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def count(self, key: str) -> None:
+        with self._lock:
+            self.calls[key] += 1
+
+    def total(self) -> int:
+        with self._lock:
+            return sum(self.calls.values())
+
+    def table(self, name: str):
+        return _CountingQuery(self.client.table(name), self)
+
+    def rpc(self, name: str, params: Dict | None = None):
+        return _CountingQuery(self.client.rpc(name, params), self)
+
+
+# ------------------ Seeding ------------------
+def seed(client: SQLiteClient, orders: int, seed_value: int = 1) -> Dict:
+    rnd = random.Random(seed_value)
+    n_products = max(100, orders // 10)
+    n_customers = max(100, orders // 5)
+    now = datetime.now(timezone.utc)
+    conn = client.db.conn
+    with client.db.transaction():
+        conn.executemany(
+            "insert into products (name, sku, price, stock, category) values (?, ?, ?, ?, ?)",
+            ((f"Product {i}", f"SKU-{i:08d}", round(rnd.uniform(1, 500), 2), 1_000_000, f"cat-{i % 50}")
+             for i in range(1, n_products + 1)))
+        conn.executemany(
+            "insert into customers (name, email, phone, city) values (?, ?, ?, ?)",
+            ((f"Customer {i}", f"customer{i}@example.com", f"9{i:09d}", f"city-{i % 200}")
+             for i in range(1, n_customers + 1)))
+
+        def order_rows():
+            for i in range(1, orders + 1):
+                created = now - timedelta(days=rnd.uniform(0, 365))
+                status = rnd.choices(("PLACED", "COMPLETED", "CANCELLED"), (2, 7, 1))[0]
+                yield (rnd.randint(1, n_customers), 0.0, status,
+                       created.strftime("%Y-%m-%dT%H:%M:%S.%f+00:00"))
+        conn.executemany("insert into orders (cust_id, total_amount, status, created_at) values (?, ?, ?, ?)",
+                         order_rows())
+
+        def item_rows():
+            for order_id in range(1, orders + 1):
+                for prod_id in rnd.sample(range(1, n_products + 1), rnd.randint(1, 3)):
+                    yield order_id, prod_id, rnd.randint(1, 4), round(rnd.uniform(1, 500), 2)
+        conn.executemany("insert into order_items (order_id, prod_id, quantity, price) values (?, ?, ?, ?)",
+                         item_rows())
+        conn.execute("update orders set total_amount = (select sum(quantity * price) from order_items "
+                     "where order_items.order_id = orders.order_id)")
+        conn.execute("insert into payments (order_id, amount, status, method) "
+                     "select order_id, total_amount, case status when 'COMPLETED' then 'PAID' "
+                     "when 'CANCELLED' then 'REFUNDED' else 'PENDING' end, "
+                     "case status when 'COMPLETED' then 'Card' end from orders")
+    client.rpc("rollup_refresh", {"p_full": True}).execute()
+    return {"products": n_products, "customers": n_customers, "orders": orders}
+
+
+# ------------------ Measurement ------------------
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def measure(name: str, op: Callable[[int], None], calls: int, workers: int, counter: CountingClient) -> Dict:
+    latencies: List[float] = []
+    errors = 0
+    lock = threading.Lock()
+
+    def run(i: int):
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            op(i)
+        except Exception:
+            with lock:
+                errors += 1
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+
+    before = counter.total()
+    start = time.perf_counter()
+    if workers == 1:
+        for i in range(calls):
+            run(i)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(run, range(calls)))
+    wall = time.perf_counter() - start
+    round_trips = counter.total() - before
+
+    latencies.sort()
+    ms = [x * 1000 for x in latencies]
+    return {
+        "operation": name,
+        "workers": workers,
+        "calls": calls,
+        "errors": errors,
+        "throughput_per_sec": round(calls / wall, 2) if wall else None,
+        "latency_ms": {
+            "mean": round(statistics.fmean(ms), 3) if ms else 0,
+            "p50": round(_percentile(ms, 50), 3),
+            "p90": round(_percentile(ms, 90), 3),
+            "p99": round(_percentile(ms, 99), 3),
+            "max": round(ms[-1], 3) if ms else 0,
+        },
+        "round_trips_per_call": round(round_trips / calls, 2) if calls else 0,
+    }
+
+
+def run_scale(scale: str, workers: List[int], calls: int, report_calls: int) -> Dict:
+    sqlite = SQLiteClient(":memory:")
+    t0 = time.perf_counter()
+    sizes = seed(sqlite, SCALES[scale])
+    seed_seconds = time.perf_counter() - t0
+
+    counter = CountingClient(sqlite)
+    SupabaseConfig.set_client(counter)
+    for table in ("products", "customers"):
+        get_cache(table).clear()
+    orders, payments, reports = OrderService(), PaymentService(), ReportService()
+    n_products, n_customers = sizes["products"], sizes["customers"]
+    rnd = random.Random(42)
+
+    def basket():
+        return [{"prod_id": rnd.randint(1, n_products), "quantity": rnd.randint(1, 3)}
+                for _ in range(rnd.randint(1, 5))]
+
+    results = []
+    for w in workers:
+        # fresh PLACED orders with PENDING payments for the mutating paths
+        placed = [orders.create_order(rnd.randint(1, n_customers), basket())["order"] for _ in range(2 * calls)]
+        for o in placed:
+            payments.create_pending_payment(o["order_id"], o["total_amount"])
+        to_cancel = [o["order_id"] for o in placed[:calls]]
+        to_pay = [o["order_id"] for o in placed[calls:]]
+        existing = SCALES[scale]
+
+        ops = [
+            ("create_order", lambda i: orders.create_order(rnd.randint(1, n_customers), basket()), calls),
+            ("get_order_details", lambda i: orders.get_order_details(rnd.randint(1, existing)), calls),
+            ("cancel_order", lambda i: orders.cancel_order(to_cancel[i]), calls),
+            ("process_payment", lambda i: payments.process_payment(to_pay[i], "Card"), calls),
+            ("top_selling_products", lambda i: reports.top_selling_products(10), report_calls),
+            ("total_revenue_last_month", lambda i: reports.total_revenue_last_month(), report_calls),
+            ("frequent_customers", lambda i: reports.frequent_customers(5), max(1, report_calls // 10)),
+        ]
+        for name, op, n in ops:
+            results.append(measure(name, op, n, w, counter))
+    SupabaseConfig.set_client(None)
+    sqlite.close()
+    return {"scale": scale, "rows": sizes, "seed_seconds": round(seed_seconds, 2), "results": results}
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """List operations whose p50 latency or round trips grew by more than `tolerance`."""
+    def index(run):
+        return {(s["scale"], r["operation"], r["workers"]): r for s in run["scales"] for r in s["results"]}
+    old, new = index(baseline), index(current)
+    regressions = []
+    for key, r in new.items():
+        b = old.get(key)
+        if not b:
+            continue
+        # cache hits make round trips vary a little between runs
+        if r["round_trips_per_call"] > b["round_trips_per_call"] * (1 + tolerance):
+            regressions.append(f"{key}: round trips {b['round_trips_per_call']} -> {r['round_trips_per_call']}")
+        if b["latency_ms"]["p50"] and r["latency_ms"]["p50"] > b["latency_ms"]["p50"] * (1 + tolerance):
+            regressions.append(f"{key}: p50 {b['latency_ms']['p50']}ms -> {r['latency_ms']['p50']}ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="hot-paths-bench")
+    parser.add_argument("--scale", nargs="+", choices=list(SCALES), default=["1k"])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--calls", type=int, default=200, help="calls per order/payment operation")
+    parser.add_argument("--report-calls", type=int, default=50, help="calls per report operation")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--baseline", help="compare against an earlier results JSON")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed relative growth in p50 latency or round trips")
+    args = parser.parse_args()
+
+    run = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "backend": "sqlite",
+        },
+        "scales": [run_scale(s, args.workers, args.calls, args.report_calls) for s in args.scale],
+    }
+    for s in run["scales"]:
+        for r in s["results"]:
+            print(f"{s['scale']:>5} {r['operation']:<26} w={r['workers']:<3} "
+                  f"p50={r['latency_ms']['p50']:>8.3f}ms p99={r['latency_ms']['p99']:>8.3f}ms "
+                  f"{r['throughput_per_sec']:>10}/s rt={r['round_trips_per_call']} err={r['errors']}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(run, fh, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as fh:
+            regressions = compare(run, json.load(fh), args.tolerance)
+        for line in regressions:
+            print("REGRESSION", line)
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+CLI startup benchmark.
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --runs 20 --budget-ms 120 --output startup.json
+
+Runs each scenario in a fresh interpreter (as cron does) and reports the
+median wall time to import the CLI and build what the scenario touches,
+plus which heavy modules ended up loaded. Exits non-zero when a scenario
+goes over its budget or loads a module it should not.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+# modules that must stay out of a scenario unless it really needs them
+HEAVY = ("supabase", "postgrest", "httpx", "sqlite3", "asyncio",
+         "src.services.order_service", "src.services.payment_service", "src.services.report_service")
+
+SCENARIOS = {
+    # name: (statement run after `import src.cli.main as cli`, modules allowed to load)
+    "import": ("pass", ()),
+    "help": ("cli.build_parser().format_help()", ()),
+    "product": ("cli.services.product", ()),
+    "report": ("cli.services.report", ("src.services.report_service",)),
+    "payment": ("cli.services.payment", ("src.services.order_service", "src.services.payment_service",
+                                         "src.services.report_service")),
+}
+
+_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import src.cli.main as cli
+{statement}
+elapsed = time.perf_counter() - t0
+print(json.dumps({{"ms": elapsed * 1000, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def probe(statement: str) -> Dict:
+    out = subprocess.run([sys.executable, "-c", _PROBE.format(statement=statement, heavy=HEAVY)],
+                         capture_output=True, text=True, check=True, env=os.environ.copy())
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def run(runs: int, budget_ms: float) -> List[Dict]:
+    results = []
+    for name, (statement, allowed) in SCENARIOS.items():
+        samples = [probe(statement) for _ in range(runs)]
+        ms = sorted(s["ms"] for s in samples)
+        loaded = samples[-1]["loaded"]
+        unexpected = [m for m in loaded if m not in allowed]
+        results.append({
+            "scenario": name,
+            "median_ms": round(statistics.median(ms), 2),
+            "max_ms": round(ms[-1], 2),
+            "loaded": loaded,
+            "unexpected": unexpected,
+            "ok": statistics.median(ms) <= budget_ms and not unexpected,
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="import-time-bench")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("RETAIL_IMPORT_BUDGET_MS", "150")),
+                        help="median startup budget per scenario")
+    parser.add_argument("--output", help="write results JSON here")
+    args = parser.parse_args()
+
+    results = run(args.runs, args.budget_ms)
+    for r in results:
+        flag = "ok" if r["ok"] else "OVER BUDGET" if not r["unexpected"] else "UNEXPECTED IMPORTS"
+        print(f"{r['scenario']:<10} median={r['median_ms']:>8.2f}ms max={r['max_ms']:>8.2f}ms "
+              f"loaded={','.join(r['loaded']) or '-'} {flag}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump({"budget_ms": args.budget_ms, "results": results}, fh, indent=2)
+    if not all(r["ok"] for r in results):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
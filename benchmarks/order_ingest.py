@@ -0,0 +1,80 @@
+"""
+Order ingestion throughput versus worker count.
+
+    python -m benchmarks.order_ingest --orders 2000 --workers 1 2 4 8 16 --latency-ms 5
+
+Seeds the SQLite backend, then places the same synthetic order stream
+through IngestService at each worker count. --latency-ms adds a sleep to
+every request to stand in for the network round trip to Supabase, which is
+what the worker pool overlaps; --hot-skus concentrates orders on a few
+SKUs to show the effect of SKU-owner routing under contention.
+"""
+import argparse
+import random
+import time
+from typing import Dict, List
+
+from benchmarks.hot_paths import CountingClient, seed
+from src.config import SupabaseConfig
+from src.dao.cache import get_cache
+from src.dao.sqlite_backend import SQLiteClient
+from src.services.ingest_service import IngestService
+from src.services.order_service import OrderService
+
+
+class LatencyClient(CountingClient):
+    """CountingClient that also sleeps per request, like a remote backend."""
+
+    def __init__(self, client, latency: float):
+        super().__init__(client)
+        self.latency = latency
+
+    def count(self, key: str) -> None:
+        super().count(key)
+        if self.latency:
+            time.sleep(self.latency)
+
+
+def requests(n: int, customers: int, products: int, hot_skus: int, seed_value: int = 7) -> List[Dict]:
+    rnd = random.Random(seed_value)
+    pool = range(1, (hot_skus or products) + 1)
+    return [{"ref": i, "cust_id": rnd.randint(1, customers),
+             "items": [{"prod_id": p, "quantity": rnd.randint(1, 3)}
+                       for p in rnd.sample(pool, min(len(pool), rnd.randint(1, 3)))]}
+            for i in range(n)]
+
+
+def run(orders: int, workers: int, latency_ms: float, hot_skus: int) -> Dict:
+    sqlite = SQLiteClient(":memory:")
+    sizes = seed(sqlite, 1_000)
+    SupabaseConfig.set_client(LatencyClient(sqlite, latency_ms / 1000))
+    for table in ("products", "customers"):
+        get_cache(table).clear()
+    stream = requests(orders, sizes["customers"], sizes["products"], hot_skus)
+    ingest = IngestService(OrderService(), workers=workers)
+    start = time.perf_counter()
+    ok = sum(1 for r in ingest.ingest(stream) if r["ok"])
+    wall = time.perf_counter() - start
+    SupabaseConfig.set_client(None)
+    sqlite.close()
+    return {"workers": workers, "orders": orders, "placed": ok,
+            "seconds": round(wall, 3), "orders_per_sec": round(orders / wall, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="order-ingest-bench")
+    parser.add_argument("--orders", type=int, default=1000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="simulated round-trip latency")
+    parser.add_argument("--hot-skus", type=int, default=0, help="draw every order from this many SKUs")
+    args = parser.parse_args()
+    base = None
+    for w in args.workers:
+        r = run(args.orders, w, args.latency_ms, args.hot_skus)
+        base = base or r["orders_per_sec"]
+        print(f"workers={w:<3} placed={r['placed']:<6} {r['seconds']:>8.3f}s "
+              f"{r['orders_per_sec']:>9}/s  x{r['orders_per_sec'] / base:.2f}")
+
+
+if __name__ == "__main__":
+    main()
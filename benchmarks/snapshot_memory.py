@@ -0,0 +1,81 @@
+"""
+Memory and latency of the columnar snapshot versus lists of dicts.
+
+    python -m benchmarks.snapshot_memory --scale 100k
+
+Seeds the SQLite backend, then loads products/orders/order_items once as
+the row dicts PostgREST returns and once as a CatalogSnapshot, reporting
+the memory each holds (tracemalloc) and the time of the three reports
+computed over each.
+"""
+import argparse
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.hot_paths import SCALES, seed
+from src.config import SupabaseConfig
+from src.dao import snapshot as snapshot_module
+from src.dao.snapshot import CatalogSnapshot, SnapshotDAO
+from src.dao.sqlite_backend import SQLiteClient
+
+
+def _measure(load):
+    tracemalloc.start()
+    start = time.perf_counter()
+    value = load()
+    seconds = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return value, current, seconds
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    fn()
+    return round((time.perf_counter() - start) * 1000, 2)
+
+
+def dict_reports(rows):
+    products, orders, items = rows
+    status = {o["order_id"]: o["status"] for o in orders}
+    units = Counter()
+    for i in items:
+        if status.get(i["order_id"]) != "CANCELLED":
+            units[i["prod_id"]] += i["quantity"]
+    top = units.most_common(10)
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=30)).isoformat()
+    revenue = sum(o["total_amount"] for o in orders if o["created_at"] >= cutoff and o["status"] != "CANCELLED")
+    per_customer = Counter(o["cust_id"] for o in orders)
+    return top, revenue, per_customer
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="snapshot-memory-bench")
+    parser.add_argument("--scale", choices=list(SCALES), default="100k")
+    args = parser.parse_args()
+
+    sqlite = SQLiteClient(":memory:")
+    seed(sqlite, SCALES[args.scale])
+    SupabaseConfig.set_client(sqlite)
+    dao = SnapshotDAO()
+
+    rows, dict_bytes, dict_load = _measure(lambda: (list(dao.iter_products(5000)), list(dao.iter_orders(5000)),
+                                                    list(dao.iter_order_items(5000))))
+    snap, snap_bytes, snap_load = _measure(lambda: CatalogSnapshot.load(dao, page_size=5000))
+    start = datetime.now(timezone.utc) - timedelta(days=30)
+    end = datetime.now(timezone.utc)
+
+    print(f"rows: {snap.counts()}  numpy: {snapshot_module.np is not None}")
+    print(f"dicts:    {dict_bytes / 2**20:>8.1f} MiB  load {dict_load:.2f}s  "
+          f"reports {_timed(lambda: dict_reports(rows))} ms")
+    print(f"snapshot: {snap_bytes / 2**20:>8.1f} MiB  load {snap_load:.2f}s  reports "
+          f"{_timed(lambda: (snap.top_selling_products(10), snap.revenue_between(start, end), snap.orders_by_customer()))} ms")
+    print(f"snapshot / dicts memory: {snap_bytes / dict_bytes:.2%}")
+    SupabaseConfig.set_client(None)
+    sqlite.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Stress benchmark for StockService against a local stand-in store.
+
+    python -m benchmarks.stock_reservation --workers 1 2 4 8 16 --orders 4000
+
+Every worker places small multi-SKU reservations on a handful of hot SKUs.
+The stand-in store behaves like the reserve_stock/release_stock functions:
+each call pays a simulated network round trip, then applies a conditional
+all-or-nothing decrement under per-row locks taken in prod_id order (what
+Postgres does for us). The script checks that nothing is oversold and
+reports throughput per worker count; --naive runs the old
+read-modify-write path for comparison.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from src.services.stock_service import StockService, StockError
+
+
+class InMemoryStockStore:
+    """Stand-in for StockDAO with row-level locking semantics."""
+
+    def __init__(self, stock: Dict[int, int], latency: float = 0.001):
+        self.stock = dict(stock)
+        self.latency = latency
+        self._row_locks = {pid: threading.Lock() for pid in stock}
+
+    def _round_trip(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def reserve(self, items: List[Dict]) -> Dict:
+        self._round_trip()
+        locks = [self._row_locks[i["prod_id"]] for i in items]  # items arrive sorted by prod_id
+        for lock in locks:
+            lock.acquire()
+        try:
+            failed = [{"prod_id": i["prod_id"], "requested": i["quantity"],
+                       "available": self.stock[i["prod_id"]], "reason": "insufficient_stock"}
+                      for i in items if self.stock[i["prod_id"]] < i["quantity"]]
+            if failed:
+                return {"ok": False, "failed": failed}
+            for i in items:
+                self.stock[i["prod_id"]] -= i["quantity"]
+            return {"ok": True, "failed": []}
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+    def release(self, items: List[Dict]) -> Dict:
+        self._round_trip()
+        for i in items:
+            with self._row_locks[i["prod_id"]]:
+                self.stock[i["prod_id"]] += i["quantity"]
+        return {"ok": True, "released": len(items)}
+
+    # old get_by_id / update(stock=...) path, one round trip each
+    def read(self, prod_id: int) -> int:
+        self._round_trip()
+        return self.stock[prod_id]
+
+    def write(self, prod_id: int, value: int) -> None:
+        self._round_trip()
+        self.stock[prod_id] = value
+
+
+def _baskets(n: int, skus: List[int], seed: int) -> List[List[Dict]]:
+    rnd = random.Random(seed)
+    return [[{"prod_id": pid, "quantity": rnd.randint(1, 3)} for pid in rnd.sample(skus, rnd.randint(1, 3))]
+            for _ in range(n)]
+
+
+def run(workers: int, orders: int, skus: int, initial: int, latency: float, naive: bool, seed: int) -> Dict:
+    ids = list(range(1, skus + 1))
+    store = InMemoryStockStore({pid: initial for pid in ids}, latency=latency)
+    service = StockService(store=store)
+    baskets = _baskets(orders, ids, seed)
+    sold = {pid: 0 for pid in ids}
+    sold_lock = threading.Lock()  # bookkeeping for the check only
+
+    def place(basket):
+        if naive:
+            for line in basket:
+                available = store.read(line["prod_id"])
+                if available < line["quantity"]:
+                    return False
+            for line in basket:
+                store.write(line["prod_id"], store.read(line["prod_id"]) - line["quantity"])
+        else:
+            try:
+                service.reserve(basket)
+            except StockError:
+                return False
+        with sold_lock:
+            for line in basket:
+                sold[line["prod_id"]] += line["quantity"]
+        return True
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        accepted = sum(pool.map(place, baskets))
+    elapsed = time.perf_counter() - start
+
+    oversold = {pid: sold[pid] - initial for pid in ids if sold[pid] > initial}
+    lost = {pid: (initial - sold[pid]) - store.stock[pid] for pid in ids
+            if initial - sold[pid] != store.stock[pid]}
+    return {
+        "mode": "naive" if naive else "reserve",
+        "workers": workers,
+        "orders": orders,
+        "accepted": accepted,
+        "seconds": round(elapsed, 4),
+        "orders_per_sec": round(orders / elapsed, 1),
+        "oversold_skus": oversold,
+        "inconsistent_skus": lost,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="stock-reservation-bench")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--orders", type=int, default=4000)
+    parser.add_argument("--skus", type=int, default=5, help="number of hot SKUs")
+    parser.add_argument("--stock", type=int, default=2000, help="initial stock per SKU")
+    parser.add_argument("--latency", type=float, default=0.001, help="simulated round trip in seconds")
+    parser.add_argument("--naive", action="store_true", help="also run the read-modify-write path")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    results = []
+    for w in args.workers:
+        results.append(run(w, args.orders, args.skus, args.stock, args.latency, False, args.seed))
+        if args.naive:
+            results.append(run(w, args.orders, args.skus, args.stock, args.latency, True, args.seed))
+    for r in results:
+        print(json.dumps(r))
+    if any(r["oversold_skus"] or r["inconsistent_skus"] for r in results if r["mode"] == "reserve"):
+        raise SystemExit("stock reservation oversold or lost updates")
+
+
+if __name__ == "__main__":
+    main()
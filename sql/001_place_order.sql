@@ -0,0 +1,88 @@
+-- sql/001_place_order.sql
+-- Single round-trip order placement used by OrderDAO.place_order.
+--
+-- Validates the customer and every line, locks the affected products in
+-- prod_id order, reserves stock and inserts the order with all of its items
+-- inside one transaction.  Nothing is written unless every line can be filled;
+-- the lines that could not be filled are returned in "failed".
+
+create or replace function place_order(p_cust_id bigint, p_items jsonb)
+returns jsonb
+language plpgsql
+as $$
+declare
+  v_customer customers%rowtype;
+  v_req      jsonb;
+  v_failed   jsonb;
+  v_total    numeric;
+  v_order    orders%rowtype;
+  v_items    jsonb;
+begin
+  select * into v_customer from customers where cust_id = p_cust_id;
+  if not found then
+    return jsonb_build_object('ok', false, 'error', 'customer_not_found', 'failed', '[]'::jsonb);
+  end if;
+
+  -- collapse duplicate lines for the same product
+  select coalesce(jsonb_agg(jsonb_build_object('prod_id', prod_id, 'quantity', quantity)), '[]'::jsonb)
+    into v_req
+    from (
+      select (e->>'prod_id')::bigint as prod_id, sum((e->>'quantity')::int) as quantity
+        from jsonb_array_elements(p_items) e
+       group by 1
+    ) q;
+
+  -- lock in a stable order so concurrent baskets cannot deadlock
+  perform 1
+     from products p
+     join jsonb_to_recordset(v_req) as r(prod_id bigint, quantity int) using (prod_id)
+    order by p.prod_id
+      for update of p;
+
+  select coalesce(jsonb_agg(jsonb_build_object(
+           'prod_id',   r.prod_id,
+           'name',      p.name,
+           'requested', r.quantity,
+           'available', coalesce(p.stock, 0),
+           'reason',    case when p.prod_id is null then 'not_found' else 'insufficient_stock' end
+         ) order by r.prod_id), '[]'::jsonb)
+    into v_failed
+    from jsonb_to_recordset(v_req) as r(prod_id bigint, quantity int)
+    left join products p using (prod_id)
+   where p.prod_id is null or p.stock < r.quantity;
+
+  if jsonb_array_length(v_failed) > 0 then
+    return jsonb_build_object('ok', false, 'error', 'lines_failed', 'failed', v_failed);
+  end if;
+
+  select sum(p.price * r.quantity) into v_total
+    from jsonb_to_recordset(v_req) as r(prod_id bigint, quantity int)
+    join products p using (prod_id);
+
+  insert into orders (cust_id, total_amount)
+  values (p_cust_id, v_total)
+  returning * into v_order;
+
+  update products p
+     set stock = p.stock - r.quantity
+    from jsonb_to_recordset(v_req) as r(prod_id bigint, quantity int)
+   where p.prod_id = r.prod_id;
+
+  with inserted as (
+    insert into order_items (order_id, prod_id, quantity, price)
+    select v_order.order_id, r.prod_id, r.quantity, p.price
+      from jsonb_to_recordset(v_req) as r(prod_id bigint, quantity int)
+      join products p using (prod_id)
+    returning *
+  )
+  select coalesce(jsonb_agg(to_jsonb(inserted)), '[]'::jsonb) into v_items from inserted;
+
+  return jsonb_build_object(
+    'ok',       true,
+    'order',    to_jsonb(v_order),
+    'customer', to_jsonb(v_customer),
+    'items',    v_items,
+    'failed',   '[]'::jsonb
+  );
+end;
+$$;
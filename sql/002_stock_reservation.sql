@@ -0,0 +1,84 @@
+-- sql/002_stock_reservation.sql
+-- Conditional stock primitives used by StockDAO.
+--
+-- reserve_stock decrements every line only if stock >= quantity and is
+-- all-or-nothing: if any line cannot be filled the whole reservation is
+-- rolled back and the failing lines are returned.  Rows are locked in
+-- prod_id order so concurrent multi-SKU reservations cannot deadlock.
+
+create or replace function reserve_stock(p_items jsonb)
+returns jsonb
+language plpgsql
+as $$
+declare
+  v_req     jsonb;
+  v_updated int;
+  v_failed  jsonb;
+begin
+  select coalesce(jsonb_agg(jsonb_build_object('prod_id', prod_id, 'quantity', quantity)), '[]'::jsonb)
+    into v_req
+    from (
+      select (e->>'prod_id')::bigint as prod_id, sum((e->>'quantity')::int) as quantity
+        from jsonb_array_elements(p_items) e
+       group by 1
+    ) q;
+
+  begin
+    perform 1
+       from products p
+       join jsonb_to_recordset(v_req) as r(prod_id bigint, quantity int) using (prod_id)
+      order by p.prod_id
+        for update of p;
+
+    with upd as (
+      update products p
+         set stock = p.stock - r.quantity
+        from jsonb_to_recordset(v_req) as r(prod_id bigint, quantity int)
+       where p.prod_id = r.prod_id
+         and p.stock >= r.quantity
+      returning p.prod_id
+    )
+    select count(*) into v_updated from upd;
+
+    if v_updated < jsonb_array_length(v_req) then
+      raise exception 'reservation_failed' using errcode = 'P0001';
+    end if;
+
+    return jsonb_build_object('ok', true, 'failed', '[]'::jsonb);
+  exception when sqlstate 'P0001' then
+    -- the block above has been rolled back; fall through and report
+  end;
+
+  select coalesce(jsonb_agg(jsonb_build_object(
+           'prod_id',   r.prod_id,
+           'name',      p.name,
+           'requested', r.quantity,
+           'available', coalesce(p.stock, 0),
+           'reason',    case when p.prod_id is null then 'not_found' else 'insufficient_stock' end
+         ) order by r.prod_id), '[]'::jsonb)
+    into v_failed
+    from jsonb_to_recordset(v_req) as r(prod_id bigint, quantity int)
+    left join products p using (prod_id)
+   where p.prod_id is null or p.stock < r.quantity;
+
+  return jsonb_build_object('ok', false, 'failed', v_failed);
+end;
+$$;
+
+create or replace function release_stock(p_items jsonb)
+returns jsonb
+language sql
+as $$
+  with req as (
+    select (e->>'prod_id')::bigint as prod_id, sum((e->>'quantity')::int) as quantity
+      from jsonb_array_elements(p_items) e
+     group by 1
+  ), upd as (
+    update products p
+       set stock = p.stock + req.quantity
+      from req
+     where p.prod_id = req.prod_id
+    returning p.prod_id
+  )
+  select jsonb_build_object('ok', true, 'released', count(*)) from upd;
+$$;
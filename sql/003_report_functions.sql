@@ -0,0 +1,34 @@
+-- sql/003_report_functions.sql
+-- Aggregations used by ReportDAO.  Grouping, summing, date filtering and
+-- top-N all run in the database and only the final rows are returned.
+
+create index if not exists order_items_prod_id_idx on order_items (prod_id);
+create index if not exists orders_created_at_idx on orders (created_at);
+
+create or replace function report_top_selling_products(p_limit int default 5)
+returns table (prod_id bigint, product text, quantity_sold bigint)
+language sql
+stable
+as $$
+  select t.prod_id, p.name, t.quantity_sold
+    from (
+      select oi.prod_id, sum(oi.quantity)::bigint as quantity_sold
+        from order_items oi
+       group by oi.prod_id
+       order by quantity_sold desc, oi.prod_id
+       limit p_limit
+    ) t
+    join products p on p.prod_id = t.prod_id
+   order by t.quantity_sold desc, t.prod_id;
+$$;
+
+create or replace function report_revenue_between(p_from timestamptz, p_to timestamptz)
+returns numeric
+language sql
+stable
+as $$
+  select coalesce(sum(total_amount), 0)
+    from orders
+   where created_at >= p_from
+     and created_at < p_to;
+$$;
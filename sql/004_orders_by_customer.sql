@@ -0,0 +1,25 @@
+-- sql/004_orders_by_customer.sql
+-- Grouped order counts per customer, paged by cust_id keyset, with a
+-- HAVING-style minimum applied in the database.
+
+create index if not exists orders_cust_id_idx on orders (cust_id);
+
+create or replace function report_orders_by_customer(
+  p_min_orders int default 0,
+  p_after      bigint default null,
+  p_limit      int default 1000
+)
+returns table (cust_id bigint, customer text, orders_count bigint)
+language sql
+stable
+as $$
+  select c.cust_id, c.name, o.orders_count
+    from customers c
+    cross join lateral (
+      select count(*)::bigint as orders_count from orders where orders.cust_id = c.cust_id
+    ) o
+   where (p_after is null or c.cust_id > p_after)
+     and o.orders_count >= p_min_orders
+   order by c.cust_id
+   limit p_limit;
+$$;
@@ -0,0 +1,233 @@
+-- sql/005_sales_rollups.sql
+-- Incrementally maintained sales rollups.
+--
+-- OrderService reports each order event (CREATED / CANCELLED / COMPLETED)
+-- through rollup_apply_order_event.  sales_rollup_events records which
+-- events have been applied, so applying one twice is a no-op.
+-- rollup_refresh either rebuilds everything from the base tables (p_full)
+-- or catches up on orders above the stored watermark, e.g. orders whose
+-- event was never reported.
+--
+-- Revenue and units exclude cancelled orders; order counts per customer
+-- include them, as the live reports always have.
+
+create table if not exists sales_daily_revenue (
+  day             date primary key,
+  revenue         numeric not null default 0,
+  orders_count    bigint  not null default 0,
+  completed_count bigint  not null default 0
+);
+
+create table if not exists sales_product_daily (
+  day     date   not null,
+  prod_id bigint not null,
+  units   bigint not null default 0,
+  revenue numeric not null default 0,
+  primary key (day, prod_id)
+);
+
+-- all-time per-product totals so top-N reads one row per product
+create table if not exists sales_product_totals (
+  prod_id bigint primary key,
+  units   bigint not null default 0,
+  revenue numeric not null default 0
+);
+create index if not exists sales_product_totals_units_idx on sales_product_totals (units desc);
+
+create table if not exists sales_customer_orders (
+  cust_id         bigint primary key,
+  orders_count    bigint not null default 0,
+  cancelled_count bigint not null default 0,
+  completed_count bigint not null default 0
+);
+
+create table if not exists sales_rollup_events (
+  order_id bigint not null,
+  event    text   not null,
+  primary key (order_id, event)
+);
+
+create table if not exists rollup_watermark (
+  name          text primary key,
+  last_order_id bigint not null default 0,
+  refreshed_at  timestamptz
+);
+insert into rollup_watermark (name) values ('sales') on conflict do nothing;
+
+
+create or replace function rollup_apply_order_event(p_order_id bigint, p_event text)
+returns boolean
+language plpgsql
+as $$
+declare
+  v_order orders%rowtype;
+  v_day   date;
+  v_sign  int;
+begin
+  insert into sales_rollup_events (order_id, event) values (p_order_id, p_event)
+  on conflict do nothing;
+  if not found then
+    return false;  -- already applied
+  end if;
+
+  select * into v_order from orders where order_id = p_order_id;
+  if not found then
+    return false;
+  end if;
+  v_day := (v_order.created_at at time zone 'utc')::date;
+
+  if p_event = 'COMPLETED' then
+    insert into sales_daily_revenue (day, completed_count) values (v_day, 1)
+    on conflict (day) do update set completed_count = sales_daily_revenue.completed_count + 1;
+    insert into sales_customer_orders (cust_id, completed_count) values (v_order.cust_id, 1)
+    on conflict (cust_id) do update set completed_count = sales_customer_orders.completed_count + 1;
+    return true;
+  end if;
+
+  v_sign := case p_event when 'CREATED' then 1 when 'CANCELLED' then -1 else 0 end;
+  if v_sign = 0 then
+    raise exception 'unknown rollup event %', p_event;
+  end if;
+
+  insert into sales_daily_revenue (day, revenue, orders_count)
+  values (v_day, v_sign * v_order.total_amount, v_sign)
+  on conflict (day) do update
+     set revenue      = sales_daily_revenue.revenue + excluded.revenue,
+         orders_count = sales_daily_revenue.orders_count + excluded.orders_count;
+
+  insert into sales_product_daily (day, prod_id, units, revenue)
+  select v_day, prod_id, v_sign * sum(quantity), v_sign * sum(quantity * price)
+    from order_items where order_id = p_order_id group by prod_id
+  on conflict (day, prod_id) do update
+     set units   = sales_product_daily.units + excluded.units,
+         revenue = sales_product_daily.revenue + excluded.revenue;
+
+  insert into sales_product_totals (prod_id, units, revenue)
+  select prod_id, v_sign * sum(quantity), v_sign * sum(quantity * price)
+    from order_items where order_id = p_order_id group by prod_id
+  on conflict (prod_id) do update
+     set units   = sales_product_totals.units + excluded.units,
+         revenue = sales_product_totals.revenue + excluded.revenue;
+
+  if v_sign = 1 then
+    insert into sales_customer_orders (cust_id, orders_count) values (v_order.cust_id, 1)
+    on conflict (cust_id) do update set orders_count = sales_customer_orders.orders_count + 1;
+  else
+    insert into sales_customer_orders (cust_id, cancelled_count) values (v_order.cust_id, 1)
+    on conflict (cust_id) do update set cancelled_count = sales_customer_orders.cancelled_count + 1;
+  end if;
+  return true;
+end;
+$$;
+
+
+create or replace function rollup_refresh(p_full boolean default false, p_batch int default 10000)
+returns jsonb
+language plpgsql
+as $$
+declare
+  v_from    bigint;
+  v_to      bigint;
+  v_applied int := 0;
+  r         record;
+begin
+  if p_full then
+    truncate sales_daily_revenue, sales_product_daily, sales_product_totals,
+             sales_customer_orders, sales_rollup_events;
+
+    insert into sales_daily_revenue (day, revenue, orders_count, completed_count)
+    select (created_at at time zone 'utc')::date,
+           coalesce(sum(total_amount) filter (where status <> 'CANCELLED'), 0),
+           count(*) filter (where status <> 'CANCELLED'),
+           count(*) filter (where status = 'COMPLETED')
+      from orders group by 1;
+
+    insert into sales_product_daily (day, prod_id, units, revenue)
+    select (o.created_at at time zone 'utc')::date, oi.prod_id, sum(oi.quantity), sum(oi.quantity * oi.price)
+      from order_items oi join orders o using (order_id)
+     where o.status <> 'CANCELLED'
+     group by 1, 2;
+
+    insert into sales_product_totals (prod_id, units, revenue)
+    select prod_id, sum(units), sum(revenue) from sales_product_daily group by prod_id;
+
+    insert into sales_customer_orders (cust_id, orders_count, cancelled_count, completed_count)
+    select cust_id, count(*), count(*) filter (where status = 'CANCELLED'),
+           count(*) filter (where status = 'COMPLETED')
+      from orders group by cust_id;
+
+    insert into sales_rollup_events (order_id, event)
+    select order_id, 'CREATED' from orders
+    union all select order_id, 'CANCELLED' from orders where status = 'CANCELLED'
+    union all select order_id, 'COMPLETED' from orders where status = 'COMPLETED';
+
+    select coalesce(max(order_id), 0) into v_to from orders;
+    update rollup_watermark set last_order_id = v_to, refreshed_at = now() where name = 'sales';
+    return jsonb_build_object('mode', 'full', 'watermark', v_to, 'remaining', false);
+  end if;
+
+  select last_order_id into v_from from rollup_watermark where name = 'sales' for update;
+  v_to := v_from;
+  for r in select order_id, status from orders where order_id > v_from order by order_id limit p_batch loop
+    if rollup_apply_order_event(r.order_id, 'CREATED') then v_applied := v_applied + 1; end if;
+    if r.status = 'CANCELLED' and rollup_apply_order_event(r.order_id, 'CANCELLED') then
+      v_applied := v_applied + 1;
+    end if;
+    if r.status = 'COMPLETED' and rollup_apply_order_event(r.order_id, 'COMPLETED') then
+      v_applied := v_applied + 1;
+    end if;
+    v_to := r.order_id;
+  end loop;
+  update rollup_watermark set last_order_id = v_to, refreshed_at = now() where name = 'sales';
+  return jsonb_build_object('mode', 'incremental', 'applied', v_applied, 'watermark', v_to,
+                            'remaining', exists (select 1 from orders where order_id > v_to));
+end;
+$$;
+
+
+-- Reports now read the rollups instead of the base tables.
+
+-- Orders inside a partial day (the edges of a rolling window); cancelled
+-- orders are not revenue, as in the rollups.
+create or replace function report_revenue_between(p_from timestamptz, p_to timestamptz)
+returns numeric
+language sql
+stable
+as $$
+  select coalesce(sum(total_amount), 0)
+    from orders
+   where created_at >= p_from
+     and created_at < p_to
+     and status <> 'CANCELLED';
+$$;
+
+create or replace function report_top_selling_products(p_limit int default 5)
+returns table (prod_id bigint, product text, quantity_sold bigint)
+language sql
+stable
+as $$
+  select t.prod_id, p.name, t.units
+    from sales_product_totals t
+    join products p on p.prod_id = t.prod_id
+   where t.units > 0
+   order by t.units desc, t.prod_id
+   limit p_limit;
+$$;
+
+create or replace function report_orders_by_customer(
+  p_min_orders int default 0,
+  p_after      bigint default null,
+  p_limit      int default 1000
+)
+returns table (cust_id bigint, customer text, orders_count bigint)
+language sql
+stable
+as $$
+  select c.cust_id, c.name, coalesce(s.orders_count, 0)
+    from customers c
+    left join sales_customer_orders s on s.cust_id = c.cust_id
+   where (p_after is null or c.cust_id > p_after)
+     and coalesce(s.orders_count, 0) >= p_min_orders
+   order by c.cust_id
+   limit p_limit;
+$$;
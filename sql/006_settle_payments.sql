@@ -0,0 +1,68 @@
+-- sql/006_settle_payments.sql
+-- Bulk settlement used by PaymentService.settle.
+--
+-- settle_payments marks each listed payment PAID with its method, completes
+-- the order and applies its COMPLETED rollup event, all in one transaction.
+-- A line is only settled while its payment is PENDING and its order PLACED;
+-- anything that changed since the caller matched it is returned under
+-- 'skipped' with the current statuses.
+
+create or replace function settle_payments(p_lines jsonb)
+returns jsonb
+language plpgsql
+as $$
+declare
+  v_req     jsonb;
+  v_settled bigint[];
+  v_skipped jsonb;
+  v_id      bigint;
+begin
+  -- one line per order; a repeated order keeps its last method
+  select coalesce(jsonb_agg(jsonb_build_object('order_id', order_id, 'method', method)), '[]'::jsonb)
+    into v_req
+    from (
+      select distinct on (order_id) order_id, method
+        from (select (e->>'order_id')::bigint as order_id, e->>'method' as method, n
+                from jsonb_array_elements(p_lines) with ordinality as t(e, n)) l
+       order by order_id, n desc
+    ) q;
+
+  -- lock in a fixed order so concurrent settlements cannot deadlock
+  perform 1
+     from orders o
+     join jsonb_to_recordset(v_req) as r(order_id bigint, method text) using (order_id)
+    order by o.order_id
+      for update of o;
+
+  with paid as (
+    update payments p
+       set status = 'PAID', method = r.method
+      from jsonb_to_recordset(v_req) as r(order_id bigint, method text), orders o
+     where p.order_id = r.order_id
+       and o.order_id = r.order_id
+       and p.status = 'PENDING'
+       and o.status = 'PLACED'
+    returning p.order_id
+  )
+  select coalesce(array_agg(order_id order by order_id), '{}') into v_settled from paid;
+
+  update orders set status = 'COMPLETED' where order_id = any(v_settled);
+
+  foreach v_id in array v_settled loop
+    perform rollup_apply_order_event(v_id, 'COMPLETED');
+  end loop;
+
+  select coalesce(jsonb_agg(jsonb_build_object(
+           'order_id',       r.order_id,
+           'payment_status', p.status,
+           'order_status',   o.status
+         ) order by r.order_id), '[]'::jsonb)
+    into v_skipped
+    from jsonb_to_recordset(v_req) as r(order_id bigint, method text)
+    left join payments p on p.order_id = r.order_id
+    left join orders o on o.order_id = r.order_id
+   where r.order_id <> all(v_settled);
+
+  return jsonb_build_object('settled', to_jsonb(v_settled), 'skipped', v_skipped);
+end;
+$$;
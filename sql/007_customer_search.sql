@@ -0,0 +1,73 @@
+-- sql/007_customer_search.sql
+-- Ranked, paginated customer search used by CustomerService.search_page.
+--
+-- Every criterion is optional and they combine with AND: name prefix,
+-- case-insensitive email, partial phone (digits only), city, and fuzzy
+-- text matched on name or email by trigram similarity or substring. Rows
+-- come back by score (best trigram similarity, +1 when the name starts
+-- with the text), then cust_id; pass the last row's (score, cust_id) as
+-- p_after_score / p_after_id for the next page. The rules are mirrored
+-- by src/dao/customer_index.py for the offline index.
+
+create extension if not exists pg_trgm;
+
+-- prefix and equality lookups
+create index if not exists customers_name_prefix_idx on customers (lower(name) text_pattern_ops);
+create index if not exists customers_email_lower_idx on customers (lower(email));
+create index if not exists customers_city_lower_idx on customers (lower(city));
+-- fuzzy and substring lookups (similarity `%`, like '%...%')
+create index if not exists customers_name_trgm_idx on customers using gin (lower(name) gin_trgm_ops);
+create index if not exists customers_email_trgm_idx on customers using gin (lower(email) gin_trgm_ops);
+create index if not exists customers_phone_digits_trgm_idx
+  on customers using gin (regexp_replace(coalesce(phone, ''), '\D', '', 'g') gin_trgm_ops);
+
+create or replace function like_escape(p text)
+returns text
+language sql
+immutable
+as $$
+  select replace(replace(replace(p, '\', '\\'), '%', '\%'), '_', '\_');
+$$;
+
+create or replace function search_customers(
+  p_name_prefix text default null,
+  p_email       text default null,
+  p_phone       text default null,
+  p_city        text default null,
+  p_text        text default null,
+  p_after_score numeric default null,
+  p_after_id    bigint default null,
+  p_limit       int default 20
+)
+returns table (cust_id bigint, name text, email text, phone text, city text, score numeric)
+language sql
+stable
+as $$
+  with matched as (
+    select c.cust_id, c.name, c.email, c.phone, c.city,
+           case when p_text is null then 0
+                else round((greatest(similarity(lower(c.name), lower(p_text)),
+                                     similarity(lower(c.email), lower(p_text)))
+                            + case when lower(c.name) like like_escape(lower(p_text)) || '%' then 1 else 0 end
+                           )::numeric, 4)
+           end as score
+      from customers c
+     where (p_name_prefix is null or lower(c.name) like like_escape(lower(p_name_prefix)) || '%')
+       and (p_email is null or lower(c.email) = lower(p_email))
+       and (p_phone is null or regexp_replace(coalesce(c.phone, ''), '\D', '', 'g')
+                               like '%' || regexp_replace(p_phone, '\D', '', 'g') || '%')
+       and (p_city is null or lower(c.city) = lower(p_city))
+       and (p_text is null
+            or lower(c.name) % lower(p_text)
+            or lower(c.email) % lower(p_text)
+            or lower(c.name) like '%' || like_escape(lower(p_text)) || '%'
+            or lower(c.email) like '%' || like_escape(lower(p_text)) || '%')
+  )
+  select m.cust_id, m.name, m.email, m.phone, m.city, m.score
+    from matched m
+   where p_after_id is null
+      or m.score < p_after_score
+      or (m.score = p_after_score and m.cust_id > p_after_id)
+   order by m.score desc, m.cust_id
+   limit p_limit;
+$$;
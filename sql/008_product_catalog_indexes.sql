@@ -0,0 +1,19 @@
+-- sql/008_product_catalog_indexes.sql
+-- Indexes behind ProductQuery (src/dao/product_dao.py).
+--
+-- Each sortable column is indexed together with prod_id, the tie-breaker
+-- of every catalog page. A filtered, sorted page is then a range scan that
+-- stops after `limit` rows, and so is the keyset predicate
+-- (col > v or (col = v and prod_id > id)) that resumes it. A low-stock
+-- listing ("stock < 5 order by stock") reads only the matching rows, even
+-- over millions of SKUs. Name search (ilike '%pen%') uses a trigram index,
+-- and the sku prefix filter (like 'PEN-%') uses the text_pattern_ops one.
+
+create extension if not exists pg_trgm;
+
+create index if not exists products_category_idx on products (category, prod_id);
+create index if not exists products_price_idx on products (price, prod_id);
+create index if not exists products_stock_idx on products (stock, prod_id);
+create index if not exists products_name_idx on products (name, prod_id);
+create index if not exists products_name_trgm_idx on products using gin (name gin_trgm_ops);
+create index if not exists products_sku_prefix_idx on products (sku text_pattern_ops);
@@ -0,0 +1,35 @@
+-- sql/009_replenishment.sql
+-- Sales velocity per SKU for the replenishment planner
+-- (src/services/replenishment_service.py).
+--
+-- Velocity comes from sales_product_daily, which rollup_apply_order_event
+-- already maintains on every order event, so nothing rescans order_items.
+-- report_product_velocity pages (by prod_id) through the SKUs that can
+-- need attention: those sold since p_since, and those already out of
+-- stock. Units per SKU are read through the (prod_id, day) index, so a
+-- page costs about the same however many SKUs the catalog has.
+
+create index if not exists sales_product_daily_prod_day_idx
+  on sales_product_daily (prod_id, day) include (units);
+
+create or replace function report_product_velocity(
+  p_since date,
+  p_after bigint default null,
+  p_limit int default 1000
+)
+returns table (prod_id bigint, sku text, name text, stock int, units bigint)
+language sql
+stable
+as $$
+  select p.prod_id, p.sku, p.name, p.stock, coalesce(v.units, 0)::bigint
+    from products p
+    cross join lateral (
+      select sum(d.units) as units
+        from sales_product_daily d
+       where d.prod_id = p.prod_id and d.day >= p_since
+    ) v
+   where (p_after is null or p.prod_id > p_after)
+     and (coalesce(v.units, 0) > 0 or p.stock <= 0)
+   order by p.prod_id
+   limit p_limit;
+$$;
@@ -0,0 +1,331 @@
+-- sql/010_warehouse_stock.sql
+-- Stock per warehouse, split into shard counters.
+--
+-- Each product's stock at a warehouse is held in one or more stock_shards
+-- rows. Checkout decrements whichever shard it can lock first (skip
+-- locked), so concurrent orders for one hot SKU update different rows
+-- instead of queueing on a single counter; throughput for a SKU grows with
+-- its shard count. products.stock remains as the unassigned ("central")
+-- pool: SKUs that were never assigned to a warehouse keep working exactly
+-- as before, and it is the last resort when the shards run out.
+--
+-- place_order takes the caller's warehouse preference (OrderService's
+-- allocation strategy). It fills the whole order from the first
+-- warehouse that can cover every line, and otherwise splits lines across
+-- warehouses in preference order. Where each unit came from is recorded
+-- in order_allocations so a cancellation puts it back in the same place.
+-- The CREATED sales rollup event is applied in the same transaction, so
+-- placing an order stays a single round trip.
+-- reserve_stock / release_stock (002) still work on the central pool only.
+
+create table if not exists warehouses (
+  warehouse_id bigserial primary key,
+  code         text not null unique,
+  name         text not null,
+  city         text,
+  priority     int not null default 100,
+  active       boolean not null default true
+);
+
+create table if not exists stock_shards (
+  prod_id      bigint not null references products (prod_id),
+  warehouse_id bigint not null references warehouses (warehouse_id),
+  shard        smallint not null,
+  quantity     int not null default 0 check (quantity >= 0),
+  primary key (prod_id, warehouse_id, shard)
+);
+
+create table if not exists order_allocations (
+  allocation_id bigserial primary key,
+  order_id      bigint not null references orders (order_id),
+  prod_id       bigint not null,
+  warehouse_id  bigint references warehouses (warehouse_id),  -- null: the central pool
+  shard         smallint,
+  quantity      int not null
+);
+create index if not exists order_allocations_order_idx on order_allocations (order_id);
+
+
+-- Available units per product: central pool, assigned shards, and per warehouse.
+create or replace function product_availability(p_ids bigint[])
+returns table (prod_id bigint, central int, located bigint, total bigint, warehouses jsonb)
+language sql
+stable
+as $$
+  select p.prod_id, p.stock, coalesce(s.located, 0), p.stock + coalesce(s.located, 0),
+         coalesce(s.by_warehouse, '{}'::jsonb)
+    from products p
+    left join lateral (
+      select sum(w.qty) as located, jsonb_object_agg(w.warehouse_id::text, w.qty) as by_warehouse
+        from (select warehouse_id, sum(quantity) as qty
+                from stock_shards where stock_shards.prod_id = p.prod_id
+               group by warehouse_id) w
+    ) s on true
+   where p.prod_id = any(p_ids)
+   order by p.prod_id;
+$$;
+
+
+-- Move stock into a warehouse, spread evenly over p_shards shard rows.
+-- With p_from_central the units are taken from products.stock (false:
+-- newly received stock).
+create or replace function assign_stock(p_prod_id bigint, p_warehouse_id bigint, p_quantity int,
+                                        p_shards int default 1, p_from_central boolean default true)
+returns jsonb
+language plpgsql
+as $$
+declare
+  v_shards int;
+begin
+  if p_quantity <= 0 or p_shards <= 0 then
+    return jsonb_build_object('ok', false, 'error', 'invalid_quantity');
+  end if;
+  if not exists (select 1 from warehouses where warehouse_id = p_warehouse_id) then
+    return jsonb_build_object('ok', false, 'error', 'warehouse_not_found');
+  end if;
+  if p_from_central then
+    update products set stock = stock - p_quantity where prod_id = p_prod_id and stock >= p_quantity;
+    if not found then
+      return jsonb_build_object('ok', false, 'error', 'insufficient_central_stock');
+    end if;
+  elsif not exists (select 1 from products where prod_id = p_prod_id) then
+    return jsonb_build_object('ok', false, 'error', 'product_not_found');
+  end if;
+
+  -- keep existing shards; add rows up to p_shards
+  select greatest(p_shards, count(*)) into v_shards
+    from stock_shards where prod_id = p_prod_id and warehouse_id = p_warehouse_id;
+
+  insert into stock_shards (prod_id, warehouse_id, shard, quantity)
+  select p_prod_id, p_warehouse_id, g.shard,
+         p_quantity / v_shards + case when g.shard < p_quantity % v_shards then 1 else 0 end
+    from generate_series(0, v_shards - 1) as g(shard)
+  on conflict (prod_id, warehouse_id, shard) do update
+     set quantity = stock_shards.quantity + excluded.quantity;
+
+  return jsonb_build_object('ok', true, 'shards', v_shards);
+end;
+$$;
+
+
+drop function if exists place_order(bigint, jsonb);
+
+create or replace function place_order(p_cust_id bigint, p_items jsonb, p_warehouses bigint[] default null)
+returns jsonb
+language plpgsql
+as $$
+declare
+  v_customer customers%rowtype;
+  v_req      jsonb;
+  v_failed   jsonb;
+  v_total    numeric;
+  v_order    orders%rowtype;
+  v_items    jsonb;
+  v_pref     bigint[];
+  v_home     bigint;
+  v_line     record;
+  v_shard    record;
+  v_left     int;
+  v_take     int;
+  v_pass     int;
+begin
+  select * into v_customer from customers where cust_id = p_cust_id;
+  if not found then
+    return jsonb_build_object('ok', false, 'error', 'customer_not_found', 'failed', '[]'::jsonb);
+  end if;
+
+  select coalesce(jsonb_agg(jsonb_build_object('prod_id', prod_id, 'quantity', quantity)), '[]'::jsonb)
+    into v_req
+    from (
+      select (e->>'prod_id')::bigint as prod_id, sum((e->>'quantity')::int) as quantity
+        from jsonb_array_elements(p_items) e
+       group by 1
+    ) q;
+
+  v_pref := coalesce(p_warehouses,
+                     array(select warehouse_id from warehouses where active order by priority, warehouse_id));
+
+  -- one warehouse that can ship the whole order goes first
+  select w.id into v_home
+    from unnest(v_pref) with ordinality as w(id, rank)
+   where not exists (
+     select 1 from jsonb_to_recordset(v_req) as r(prod_id bigint, quantity int)
+      where r.quantity > (select coalesce(sum(s.quantity), 0) from stock_shards s
+                           where s.prod_id = r.prod_id and s.warehouse_id = w.id))
+   order by w.rank
+   limit 1;
+  if v_home is not null then
+    v_pref := array_prepend(v_home, array_remove(v_pref, v_home));
+  end if;
+
+  begin
+    select sum(p.price * r.quantity) into v_total
+      from jsonb_to_recordset(v_req) as r(prod_id bigint, quantity int)
+      join products p using (prod_id);
+
+    insert into orders (cust_id, total_amount)
+    values (p_cust_id, coalesce(v_total, 0))
+    returning * into v_order;
+
+    for v_line in select r.prod_id, r.quantity
+                    from jsonb_to_recordset(v_req) as r(prod_id bigint, quantity int)
+                   order by r.prod_id loop
+      v_left := v_line.quantity;
+      -- one shard at a time, so only the rows actually drawn from are
+      -- locked: first shards no other checkout holds (random within a
+      -- warehouse, so concurrent orders spread out), then, if still short,
+      -- waiting for busy ones (their quantity is re-checked after the wait)
+      v_pass := 1;
+      while v_left > 0 loop
+        if v_pass = 1 then
+          select s.warehouse_id, s.shard, s.quantity into v_shard
+            from stock_shards s
+            join unnest(v_pref) with ordinality as w(id, rank) on w.id = s.warehouse_id
+           where s.prod_id = v_line.prod_id and s.quantity > 0
+           order by w.rank, random()
+           limit 1
+             for update of s skip locked;
+        else
+          select s.warehouse_id, s.shard, s.quantity into v_shard
+            from stock_shards s
+            join unnest(v_pref) with ordinality as w(id, rank) on w.id = s.warehouse_id
+           where s.prod_id = v_line.prod_id and s.quantity > 0
+           order by w.rank, s.shard
+           limit 1
+             for update of s;
+        end if;
+        if not found then
+          exit when v_pass = 2;
+          v_pass := 2;
+          continue;
+        end if;
+        v_take := least(v_left, v_shard.quantity);
+        update stock_shards set quantity = quantity - v_take
+         where prod_id = v_line.prod_id and warehouse_id = v_shard.warehouse_id and shard = v_shard.shard;
+        insert into order_allocations (order_id, prod_id, warehouse_id, shard, quantity)
+        values (v_order.order_id, v_line.prod_id, v_shard.warehouse_id, v_shard.shard, v_take);
+        v_left := v_left - v_take;
+      end loop;
+
+      if v_left > 0 then
+        update products set stock = stock - v_left where prod_id = v_line.prod_id and stock >= v_left;
+        if not found then
+          raise exception 'lines_failed' using errcode = 'P0001';
+        end if;
+        insert into order_allocations (order_id, prod_id, warehouse_id, shard, quantity)
+        values (v_order.order_id, v_line.prod_id, null, null, v_left);
+      end if;
+    end loop;
+
+    with inserted as (
+      insert into order_items (order_id, prod_id, quantity, price)
+      select v_order.order_id, r.prod_id, r.quantity, p.price
+        from jsonb_to_recordset(v_req) as r(prod_id bigint, quantity int)
+        join products p using (prod_id)
+      returning *
+    )
+    select coalesce(jsonb_agg(to_jsonb(inserted)), '[]'::jsonb) into v_items from inserted;
+
+    perform rollup_apply_order_event(v_order.order_id, 'CREATED');
+
+    return jsonb_build_object(
+      'ok',          true,
+      'order',       to_jsonb(v_order),
+      'customer',    to_jsonb(v_customer),
+      'items',       v_items,
+      'allocations', (select coalesce(jsonb_agg(to_jsonb(a) - 'allocation_id'), '[]'::jsonb)
+                        from order_allocations a where a.order_id = v_order.order_id),
+      'failed',      '[]'::jsonb
+    );
+  exception when sqlstate 'P0001' then
+    -- everything above has been rolled back; report the short lines
+  end;
+
+  select coalesce(jsonb_agg(jsonb_build_object(
+           'prod_id',   r.prod_id,
+           'name',      p.name,
+           'requested', r.quantity,
+           'available', coalesce(p.stock + s.located, 0),
+           'reason',    case when p.prod_id is null then 'not_found' else 'insufficient_stock' end
+         ) order by r.prod_id), '[]'::jsonb)
+    into v_failed
+    from jsonb_to_recordset(v_req) as r(prod_id bigint, quantity int)
+    left join products p using (prod_id)
+    cross join lateral (
+      select coalesce(sum(quantity), 0) as located
+        from stock_shards where stock_shards.prod_id = r.prod_id and warehouse_id = any(v_pref)
+    ) s
+   where p.prod_id is null or p.stock + s.located < r.quantity;
+
+  return jsonb_build_object('ok', false, 'error', 'lines_failed', 'failed', v_failed);
+end;
+$$;
+
+
+-- Put a cancelled order's units back where they were taken from. Orders
+-- placed before allocations were recorded go back to the central pool.
+create or replace function release_order_stock(p_order_id bigint)
+returns jsonb
+language plpgsql
+as $$
+declare
+  v_released int := 0;
+begin
+  with a as (
+    select prod_id, warehouse_id, shard, sum(quantity) as quantity
+      from order_allocations
+     where order_id = p_order_id and warehouse_id is not null
+     group by 1, 2, 3
+  ), upd as (
+    update stock_shards s set quantity = s.quantity + a.quantity
+      from a
+     where s.prod_id = a.prod_id and s.warehouse_id = a.warehouse_id and s.shard = a.shard
+    returning 1
+  )
+  select count(*) into v_released from upd;
+
+  with central as (
+    select i.prod_id,
+           sum(i.quantity) - coalesce((select sum(a.quantity) from order_allocations a
+                                        where a.order_id = p_order_id and a.prod_id = i.prod_id
+                                          and a.warehouse_id is not null), 0) as quantity
+      from order_items i
+     where i.order_id = p_order_id
+     group by i.prod_id
+  )
+  update products p set stock = p.stock + c.quantity
+    from central c
+   where p.prod_id = c.prod_id and c.quantity > 0;
+
+  return jsonb_build_object('ok', true, 'released_shards', v_released);
+end;
+$$;
+
+
+-- Velocity rows now report total availability (central + shards).
+drop function if exists report_product_velocity(date, bigint, int);
+
+create or replace function report_product_velocity(
+  p_since date,
+  p_after bigint default null,
+  p_limit int default 1000
+)
+returns table (prod_id bigint, sku text, name text, stock bigint, units bigint)
+language sql
+stable
+as $$
+  select p.prod_id, p.sku, p.name, p.stock + coalesce(s.located, 0), coalesce(v.units, 0)::bigint
+    from products p
+    cross join lateral (
+      select sum(d.units) as units
+        from sales_product_daily d
+       where d.prod_id = p.prod_id and d.day >= p_since
+    ) v
+    cross join lateral (
+      select sum(quantity) as located from stock_shards where stock_shards.prod_id = p.prod_id
+    ) s
+   where (p_after is null or p.prod_id > p_after)
+     and (coalesce(v.units, 0) > 0 or p.stock + coalesce(s.located, 0) <= 0)
+   order by p.prod_id
+   limit p_limit;
+$$;
@@ -0,0 +1,42 @@
+-- sql/011_cancel_order.sql
+-- Single-call cancellation used by OrderService.cancel_order.
+--
+-- cancel_order claims the PLACED -> CANCELLED transition, puts the units
+-- back where place_order took them from (release_order_stock: the shards
+-- recorded in order_allocations, the rest to the central pool) and applies
+-- the CANCELLED rollup event, all in one transaction. A failure between the
+-- steps can no longer leave a cancelled order holding its stock, and two
+-- concurrent cancels cannot both restore it: the loser's update matches no
+-- row and it returns 'not_placed' with the current status.
+
+create or replace function cancel_order(p_order_id bigint)
+returns jsonb
+language plpgsql
+as $$
+declare
+  v_order  orders%rowtype;
+  v_status text;
+  v_items  jsonb;
+begin
+  update orders set status = 'CANCELLED'
+   where order_id = p_order_id and status = 'PLACED'
+  returning * into v_order;
+
+  if not found then
+    select status into v_status from orders where order_id = p_order_id;
+    return jsonb_build_object('ok', false,
+                              'error', case when v_status is null then 'not_found' else 'not_placed' end,
+                              'status', v_status);
+  end if;
+
+  perform release_order_stock(p_order_id);
+  perform rollup_apply_order_event(p_order_id, 'CANCELLED');
+
+  select coalesce(jsonb_agg(to_jsonb(i) order by i.item_id), '[]'::jsonb)
+    into v_items
+    from order_items i
+   where i.order_id = p_order_id;
+
+  return jsonb_build_object('ok', true, 'order', to_jsonb(v_order), 'items', v_items);
+end;
+$$;
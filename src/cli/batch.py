@@ -0,0 +1,235 @@
+# src/cli/batch.py
+"""
+Batch mode: run a stream of CLI commands on one warm client.
+
+Each input line is a JSON object naming a command the regular CLI exposes,
+either as an argv list or as fields:
+
+    {"id": 1, "argv": ["product", "add", "--name", "Pen", "--sku", "P-1", "--price", "2.5"]}
+    {"id": 2, "cmd": "customer", "action": "add", "name": "Ann", "email": "a@x.io", "phone": "1"}
+    {"id": 3, "cmd": "order", "action": "create", "customer": 7, "item": ["1:2", "4:1"]}
+
+Arguments are validated by the same parser as the one-shot CLI. Consecutive
+product or customer adds are sent as one bulk insert; if the bulk request
+is rejected (a taken SKU, say) the group is retried row by row so each line
+gets its own result. Consecutive `order show` lines are looked up together
+(one query each for the orders, their items and their customers). One NDJSON result is written per input line, in input
+order: {"id": ..., "ok": true, "result": ...} or {"id": ..., "ok": false,
+"error": "..."}. A pending group is held until a different command,
+the group size or the end of input.
+"""
+import contextlib
+import io
+import json
+import threading
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+
+from src.dao.product_dao import ProductQuery
+from src.services.order_service import OrderError
+
+DEFAULT_GROUP_SIZE = 500
+
+
+def _items(args) -> List[Dict]:
+    return [{"prod_id": int(i.split(":")[0]), "quantity": int(i.split(":")[1])} for i in args.item]
+
+
+def _order_cancel(s, args):
+    if args.sync:
+        s.order.cancel_order(args.order)
+        return s.payment.refund_payment(args.order)
+    return s.outbox.cancel_order(args.order)
+
+
+def _payment_process(s, args):
+    if args.sync:
+        return s.payment.process_payment(args.order, args.method)
+    return s.outbox.process_payment(args.order, args.method)
+
+
+def _product_list(s, args):
+    fields = args.fields.split(",") if args.fields else None
+    if fields and args.availability and "prod_id" not in fields:
+        fields.insert(0, "prod_id")
+    query = ProductQuery.of(categories=args.category, min_price=args.min_price, max_price=args.max_price,
+                            stock_below=args.stock_below, min_stock=args.min_stock, name=args.name,
+                            sku_prefix=args.sku_prefix, sort=args.sort, desc=args.desc, fields=fields)
+    if args.limit:
+        page = s.product.find(query, limit=args.limit, cursor=args.cursor)
+        if args.availability:
+            page["results"] = list(s.product.with_availability(page["results"]))
+        return page
+    rows = s.product.iter_query(query, page_size=args.page_size)
+    return list(s.product.with_availability(rows) if args.availability else rows)
+
+
+def _planner(s, args):
+    s.replenishment.configure(window_days=args.window_days, lead_time_days=args.lead_time_days,
+                              safety_days=args.safety_days)
+    return s.replenishment
+
+
+def _fields(args, names) -> Dict:
+    return {n: getattr(args, n) for n in names if getattr(args, n, None)}
+
+
+# (cmd, action) -> handler(services, args); same calls as the cmd_* functions
+HANDLERS: Dict[Tuple[str, str], Callable] = {
+    ("product", "add"): lambda s, a: s.product.add(a.name, a.sku, a.price, a.stock, a.category),
+    ("product", "list"): _product_list,
+    ("product", "update"): lambda s, a: s.product.update(
+        a.id, **_fields(a, ("name", "sku", "price", "stock", "category"))),
+    ("product", "delete"): lambda s, a: s.product.delete(a.id),
+    ("customer", "add"): lambda s, a: s.customer.add(a.name, a.email, a.phone, a.city),
+    ("customer", "list"): lambda s, a: list(islice(s.customer.iter_all(page_size=a.page_size), a.limit)),
+    ("customer", "update"): lambda s, a: s.customer.update(a.id, **_fields(a, ("phone", "city"))),
+    ("customer", "delete"): lambda s, a: s.customer.delete(a.id),
+    ("customer", "search"): lambda s, a: s.customer.search_page(
+        limit=a.limit, cursor=a.cursor, local=a.local, name_prefix=a.name, email=a.email,
+        phone=a.phone, city=a.city, text=a.text),
+    ("order", "create"): lambda s, a: s.order.create_order(a.customer, _items(a), allocation=a.allocation),
+    ("order", "show"): lambda s, a: s.order.get_order_details(a.order),
+    ("order", "cancel"): _order_cancel,
+    ("order", "complete"): lambda s, a: s.order.complete_order(a.order),
+    ("order", "list"): lambda s, a: list(s.order.iter_orders_by_customer(a.customer, page_size=a.page_size)),
+    ("payment", "process"): _payment_process,
+    ("report", "top"): lambda s, a: s.report.top_selling_products(a.limit),
+    ("report", "revenue"): lambda s, a: s.report.total_revenue_last_month(),
+    ("report", "customers"): lambda s, a: s.report.orders_by_customer(min_orders=a.min_orders),
+    ("report", "refresh"): lambda s, a: s.report.refresh(full=a.full, batch_size=a.batch_size),
+    ("inventory", "alerts"): lambda s, a: _planner(s, a).alerts(limit=a.limit, horizon_days=a.horizon_days),
+    ("inventory", "plan"): lambda s, a: _planner(s, a).plan(limit=a.limit, target_days=a.target_days),
+    ("inventory", "add-warehouse"): lambda s, a: s.stock.add_warehouse(a.code, a.name, a.city, a.priority),
+    ("inventory", "warehouses"): lambda s, a: s.stock.warehouses(fresh=True),
+    ("inventory", "assign"): lambda s, a: s.stock.assign(a.product, a.warehouse, a.quantity, a.shards,
+                                                         from_central=not a.received),
+    ("inventory", "availability"): lambda s, a: s.product.availability(a.product, fresh=True),
+}
+
+# (cmd, action) -> (service attribute, fields passed to its add_many)
+BULK_ADDS = {
+    ("product", "add"): ("product", ("name", "sku", "price", "stock", "category")),
+    ("customer", "add"): ("customer", ("name", "email", "phone", "city")),
+}
+
+
+def _order_show_many(s, batch) -> List:
+    details = s.order.get_orders_details([args.order for _, _, args in batch])
+    return [d if d else OrderError("Order not found") for d in details]
+
+
+# (cmd, action) -> reader(services, group) returning one result or exception per line
+BULK_READS = {
+    ("order", "show"): _order_show_many,
+}
+GROUPED = set(BULK_ADDS) | set(BULK_READS)
+
+
+def to_argv(command: Dict) -> List[str]:
+    """Turn a JSON command into the argv the one-shot CLI would receive."""
+    if "argv" in command:
+        return [str(a) for a in command["argv"]]
+    argv = [str(command.get("cmd", "")), str(command.get("action", ""))]
+    for key, value in command.items():
+        if key in ("id", "cmd", "action") or value is None or value is False:
+            continue
+        flag = "--" + key.replace("_", "-")
+        if value is True:
+            argv.append(flag)
+        elif isinstance(value, list):
+            argv += [flag] + [str(v) for v in value]
+        else:
+            argv += [flag, str(value)]
+    return argv
+
+
+class BatchRunner:
+    """Parses, groups and executes batch commands against shared services."""
+
+    def __init__(self, services, parser, group_size: int = DEFAULT_GROUP_SIZE):
+        self.services = services
+        self.parser = parser
+        self.group_size = group_size
+        # argparse reports errors on the process-wide stderr
+        self._parse_lock = threading.Lock()
+
+    def parse(self, command: Dict):
+        argv = to_argv(command)
+        err = io.StringIO()
+        try:
+            with self._parse_lock, contextlib.redirect_stderr(err):
+                args = self.parser.parse_args(argv)
+        except SystemExit:
+            lines = err.getvalue().strip().splitlines()
+            raise ValueError(lines[-1] if lines else f"invalid command: {' '.join(argv)}")
+        key = (args.cmd, getattr(args, "action", None))
+        if key not in HANDLERS:
+            raise ValueError(f"unsupported command: {' '.join(argv[:2])}")
+        return key, args
+
+    def run(self, lines: Iterable[str]) -> Iterator[Dict]:
+        """Yield one result per non-blank input line, in order."""
+        group: List[Tuple[object, Tuple[str, str], object]] = []
+        for line_no, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            cid = line_no
+            try:
+                command = json.loads(line)
+                cid = command.get("id", line_no)
+                key, args = self.parse(command)
+            except Exception as e:
+                yield from self._flush(group)
+                yield {"id": cid, "ok": False, "error": str(e)}
+                continue
+            if group and (key != group[0][1] or len(group) >= self.group_size):
+                yield from self._flush(group)
+            group.append((cid, key, args))
+            if key not in GROUPED:
+                yield from self._flush(group)
+        yield from self._flush(group)
+
+    def _flush(self, group: List) -> Iterator[Dict]:
+        if not group:
+            return
+        batch = list(group)
+        group.clear()
+        key = batch[0][1]
+        if len(batch) > 1 and key in BULK_ADDS:
+            attr, names = BULK_ADDS[key]
+            rows = [{n: getattr(args, n) for n in names} for _, _, args in batch]
+            try:
+                created = getattr(self.services, attr).add_many(rows)
+            except Exception:
+                created = None  # fall back to one request per row for per-line errors
+            if created is not None and len(created) == len(batch):
+                for (cid, _, _), row in zip(batch, created):
+                    yield {"id": cid, "ok": True, "result": row}
+                return
+        if len(batch) > 1 and key in BULK_READS:
+            try:
+                results = BULK_READS[key](self.services, batch)
+            except Exception as e:
+                results = [e] * len(batch)
+            for (cid, _, _), result in zip(batch, results):
+                if isinstance(result, Exception):
+                    yield {"id": cid, "ok": False, "error": str(result)}
+                else:
+                    yield {"id": cid, "ok": True, "result": result}
+            return
+        for cid, key, args in batch:
+            try:
+                yield {"id": cid, "ok": True, "result": HANDLERS[key](self.services, args)}
+            except Exception as e:
+                yield {"id": cid, "ok": False, "error": str(e)}
+
+
+def run_batch(runner: BatchRunner, lines: Iterable[str], out) -> Dict:
+    """Run `lines` and write NDJSON results to `out`; returns ok/failed counts."""
+    counts = {"ok": 0, "failed": 0}
+    for result in runner.run(lines):
+        counts["ok" if result["ok"] else "failed"] += 1
+        out.write(json.dumps(result, default=str) + "\n")
+        out.flush()
+    return counts
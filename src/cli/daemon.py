@@ -0,0 +1,114 @@
+# src/cli/daemon.py
+"""
+Local daemon that keeps services and the database client warm.
+
+    python -m src.cli.main daemon --socket /tmp/retail-cli.sock
+    python -m src.cli.main batch --socket /tmp/retail-cli.sock < commands.ndjson
+
+Clients connect over a Unix socket, send batch-mode NDJSON commands (see
+src/cli/batch.py) and close their write side. One NDJSON result per command
+comes back as each group finishes, while later commands are still arriving,
+so clients must read while they write. Connections are served on separate
+threads that share one ServiceRegistry, so caches and connection pools
+outlive any single caller.
+A background thread drains the outbox every RETAIL_OUTBOX_INTERVAL seconds.
+"""
+import contextlib
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+from typing import Dict, Iterable
+
+from src.cli.batch import BatchRunner, run_batch
+
+DEFAULT_SOCKET = os.getenv("RETAIL_DAEMON_SOCKET", "/tmp/retail-cli.sock")
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        lines = (raw.decode("utf-8") for raw in self.rfile)
+        out = _TextWriter(self.wfile)
+        run_batch(self.server.runner, lines, out)
+
+
+class _TextWriter:
+    def __init__(self, wfile):
+        self.wfile = wfile
+
+    def write(self, text: str) -> None:
+        self.wfile.write(text.encode("utf-8"))
+
+    def flush(self) -> None:
+        self.wfile.flush()
+
+
+class BatchServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, runner: BatchRunner):
+        self.runner = runner
+        super().__init__(path, _Handler)
+
+
+def _drain_outbox(services, interval: float, stop: threading.Event) -> None:
+    while not stop.wait(interval):
+        try:
+            services.outbox.drain()
+        except Exception as e:
+            print("Outbox drain failed:", e, file=sys.stderr)
+
+
+def serve(runner: BatchRunner, path: str = DEFAULT_SOCKET) -> None:
+    if os.path.exists(path):
+        os.unlink(path)  # stale socket from a previous run
+    stop = threading.Event()
+    interval = float(os.getenv("RETAIL_OUTBOX_INTERVAL", "2"))
+    threading.Thread(target=_drain_outbox, args=(runner.services, interval, stop),
+                     name="outbox-drain", daemon=True).start()
+    with BatchServer(path, runner) as server:
+        os.chmod(path, 0o600)
+        try:
+            server.serve_forever()
+        finally:
+            stop.set()
+            os.unlink(path)
+
+
+def send(lines: Iterable[str], out, path: str = DEFAULT_SOCKET) -> Dict:
+    """
+    Forward NDJSON commands to a running daemon and copy its results to `out`.
+
+    The daemon answers after every group while it is still reading, so
+    commands are written from a separate thread: reading only after the last
+    write would deadlock once both socket buffers filled up.
+    """
+    counts = {"ok": 0, "failed": 0}
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        failed: list = []
+
+        def write():
+            try:
+                with sock.makefile("wb") as w:
+                    for line in lines:
+                        w.write(line.encode("utf-8") if line.endswith("\n") else (line + "\n").encode("utf-8"))
+                sock.shutdown(socket.SHUT_WR)
+            except BaseException as e:
+                failed.append(e)
+                with contextlib.suppress(OSError):
+                    sock.shutdown(socket.SHUT_RDWR)  # unblock the reader
+
+        writer = threading.Thread(target=write, name="batch-send", daemon=True)
+        writer.start()
+        with sock.makefile("rb") as r:
+            for raw in r:
+                text = raw.decode("utf-8")
+                counts["ok" if json.loads(text)["ok"] else "failed"] += 1
+                out.write(text)
+        writer.join()
+        if failed:
+            raise failed[0]
+    return counts
@@ -1,30 +1,52 @@
 import argparse
 import json
-from src.services.product_service import ProductService
-from src.services.customer_service import CustomerService
-from src.services.order_service import OrderService
-from src.services.payment_service import PaymentService
+import os
+import sys
+from collections import Counter
+from itertools import islice
+from src.cli.records import read_lines, read_records, write_records
+from src.dao.instrumentation import instrumentation
+from src.dao import product_fields
+from src.services.registry import ServiceRegistry
 
 # ---------------- SERVICES ----------------
-product_service = ProductService()
-customer_service = CustomerService()
-order_service = OrderService()
-payment_service = PaymentService()
+# built on first use, so `--help` or `product list` loads only what it needs
+services = ServiceRegistry()
+
+SETTLEMENT_FIELDS = ["line", "order_id", "result", "amount", "expected", "method", "order_status", "error"]
 
 # ---------------- PRODUCT COMMANDS ----------------
 def cmd_product_add(args):
     try:
-        p = product_service.add(args.name, args.sku, args.price, args.stock, args.category)
+        p = services.product.add(args.name, args.sku, args.price, args.stock, args.category)
         print("Created product:", json.dumps(p, indent=2, default=str))
     except Exception as e:
         print("Error:", e)
 
+def _product_query(args):
+    from src.dao.product_dao import ProductQuery
+    fields = args.fields.split(",") if args.fields else None
+    if fields and args.availability and "prod_id" not in fields:
+        fields.insert(0, "prod_id")  # availability is looked up by id
+    return ProductQuery.of(categories=args.category, min_price=args.min_price, max_price=args.max_price,
+                           stock_below=args.stock_below, min_stock=args.min_stock, name=args.name,
+                           sku_prefix=args.sku_prefix, sort=args.sort, desc=args.desc, fields=fields)
+
+
 def cmd_product_list(args):
     try:
-        products = product_service.list(limit=100)
-        print(json.dumps(products, indent=2, default=str))
+        query = _product_query(args)
+        if args.limit:
+            page = services.product.find(query, limit=args.limit, cursor=args.cursor)
+            rows = page["results"]
+            write_records(services.product.with_availability(rows) if args.availability else rows, "-", "jsonl")
+            if page["next_cursor"]:
+                print("Next page: --cursor", page["next_cursor"], file=sys.stderr)
+            return
+        rows = services.product.iter_query(query, page_size=args.page_size)
+        write_records(services.product.with_availability(rows) if args.availability else rows, "-", "jsonl")
     except Exception as e:
-        print("Error:", e)
+        print("Error:", e, file=sys.stderr)
 
 def cmd_product_update(args):
     try:
@@ -34,54 +56,93 @@ def cmd_product_update(args):
         if args.price: fields["price"] = args.price
         if args.stock: fields["stock"] = args.stock
         if args.category: fields["category"] = args.category
-        updated = product_service.update(args.id, **fields)
+        updated = services.product.update(args.id, **fields)
         print("Updated product:", json.dumps(updated, indent=2, default=str))
     except Exception as e:
         print("Error:", e)
 
 def cmd_product_delete(args):
     try:
-        deleted = product_service.delete(args.id)
+        deleted = services.product.delete(args.id)
         print("Deleted product:", json.dumps(deleted, indent=2, default=str))
     except Exception as e:
         print("Error:", e)
 
+def cmd_product_import(args):
+    try:
+        rows = read_records(args.file, args.format)
+        summary = services.product.bulk_upsert(rows, chunk_size=args.chunk_size)
+        print("Imported products:", json.dumps(summary, indent=2, default=str))
+    except Exception as e:
+        print("Error:", e)
+
+def cmd_product_export(args):
+    try:
+        count = write_records(services.product.export(page_size=args.page_size), args.file, args.format,
+                              fields=["prod_id", "name", "sku", "price", "stock", "category"])
+        if args.file != "-":
+            print(f"Exported {count} products to {args.file}")
+    except Exception as e:
+        print("Error:", e, file=sys.stderr if args.file == "-" else sys.stdout)
+
 # ---------------- CUSTOMER COMMANDS ----------------
 def cmd_customer_add(args):
     try:
-        c = customer_service.add(args.name, args.email, args.phone, args.city)
+        c = services.customer.add(args.name, args.email, args.phone, args.city)
         print("Created customer:", json.dumps(c, indent=2, default=str))
     except Exception as e:
         print("Error:", e)
 
 def cmd_customer_list(args):
     try:
-        customers = customer_service.list(limit=100)
-        print(json.dumps(customers, indent=2, default=str))
+        customers = services.customer.iter_all(page_size=args.page_size)
+        write_records(islice(customers, args.limit), "-", "jsonl")
     except Exception as e:
-        print("Error:", e)
+        print("Error:", e, file=sys.stderr)
 
 def cmd_customer_update(args):
     try:
         fields = {}
         if args.phone: fields["phone"] = args.phone
         if args.city: fields["city"] = args.city
-        updated = customer_service.update(args.id, **fields)
+        updated = services.customer.update(args.id, **fields)
         print("Updated customer:", json.dumps(updated, indent=2, default=str))
     except Exception as e:
         print("Error:", e)
 
 def cmd_customer_delete(args):
     try:
-        deleted = customer_service.delete(args.id)
+        deleted = services.customer.delete(args.id)
         print("Deleted customer:", json.dumps(deleted, indent=2, default=str))
     except Exception as e:
         print("Error:", e)
 
+def _search_criteria(args) -> dict:
+    return {"name_prefix": args.name, "email": args.email, "phone": args.phone,
+            "city": args.city, "text": args.text}
+
+
 def cmd_customer_search(args):
     try:
-        results = customer_service.search(email=args.email, city=args.city)
-        print(json.dumps(results, indent=2, default=str))
+        if args.local and args.index_file:
+            services.customer.load_index(args.index_file)
+        if args.all:
+            results = services.customer.iter_search_ranked(page_size=args.page_size, local=args.local,
+                                                           **_search_criteria(args))
+            write_records(results, "-", "jsonl")
+            return
+        page = services.customer.search_page(limit=args.limit, cursor=args.cursor, local=args.local,
+                                             **_search_criteria(args))
+        write_records(page["results"], "-", "jsonl")
+        if page["next_cursor"]:
+            print("Next page: --cursor", page["next_cursor"], file=sys.stderr)
+    except Exception as e:
+        print("Error:", e, file=sys.stderr)
+
+def cmd_customer_index(args):
+    try:
+        index = services.customer.load_index(page_size=args.page_size)
+        print(f"Indexed {index.save(args.out)} customers into {args.out}")
     except Exception as e:
         print("Error:", e)
 
@@ -89,51 +150,239 @@ def cmd_customer_search(args):
 def cmd_order_create(args):
     try:
         items = [{"prod_id": int(i.split(":")[0]), "quantity": int(i.split(":")[1])} for i in args.item]
-        order = order_service.create_order(args.customer, items)
+        order = services.order.create_order(args.customer, items, allocation=args.allocation)
         print("Order created:", json.dumps(order, indent=2, default=str))
     except Exception as e:
         print("Error:", e)
 
 def cmd_order_show(args):
     try:
-        order = order_service.get_order_details(args.order)
+        order = services.order.get_order_details(args.order)
         print(json.dumps(order, indent=2, default=str))
     except Exception as e:
         print("Error:", e)
 
 def cmd_order_cancel(args):
     try:
-        order_service.cancel_order(args.order)
-        payment_service.refund_payment(args.order)
-        print("Order cancelled and payment refunded")
+        if args.sync:
+            services.order.cancel_order(args.order)
+            services.payment.refund_payment(args.order)
+            print("Order cancelled and payment refunded")
+        else:
+            services.outbox.cancel_order(args.order)
+            print("Order cancelled; refund queued (run `outbox drain`)")
     except Exception as e:
         print("Error:", e)
 
 def cmd_order_complete(args):
     try:
-        order_service.complete_order(args.order)
+        services.order.complete_order(args.order)
         print("Order completed")
     except Exception as e:
         print("Error:", e)
 
 def cmd_order_list(args):
     try:
-        orders = order_service.list_orders_by_customer(args.customer)
-        print(json.dumps(orders, indent=2, default=str))
+        orders = services.order.iter_orders_by_customer(args.customer, page_size=args.page_size)
+        write_records(orders, "-", "jsonl")
     except Exception as e:
-        print("Error:", e)
+        print("Error:", e, file=sys.stderr)
+
+def cmd_order_ingest(args):
+    try:
+        from src.services.ingest_service import IngestService
+        ingest = IngestService(services.order, workers=args.workers, queue_size=args.queue_size)
+        counts: Counter = Counter()
+
+        def results():
+            for result in ingest.ingest(read_records(args.file, "jsonl")):
+                counts["ok" if result["ok"] else "failed"] += 1
+                yield result
+
+        write_records(results(), args.output, "jsonl")
+        print(f"ingest: {counts['ok']} placed, {counts['failed']} failed", file=sys.stderr)
+    except Exception as e:
+        print("Error:", e, file=sys.stderr)
 
 # ---------------- PAYMENT COMMANDS ----------------
 def cmd_payment_process(args):
     try:
-        payment = payment_service.process_payment(args.order, args.method)
+        if args.sync:
+            payment = services.payment.process_payment(args.order, args.method)
+        else:
+            payment = services.outbox.process_payment(args.order, args.method)
         print("Payment processed:", json.dumps(payment, indent=2, default=str))
     except Exception as e:
         print("Error:", e)
 
+def cmd_payment_settle(args):
+    try:
+        counts: Counter = Counter()
+
+        def mismatches():
+            for record in services.payment.settle(read_records(args.file, args.format),
+                                                  chunk_size=args.chunk_size, tolerance=args.tolerance):
+                counts[record["result"]] += 1
+                if record["result"] != "settled":
+                    yield record
+
+        write_records(mismatches(), args.report, fields=SETTLEMENT_FIELDS)
+        print("Settlement:", json.dumps(dict(counts), indent=2), file=sys.stderr)
+    except Exception as e:
+        print("Error:", e, file=sys.stderr)
+
+# ---------------- REPORT COMMANDS ----------------
+def cmd_report_top(args):
+    try:
+        print(json.dumps(services.report.top_selling_products(args.limit), indent=2, default=str))
+    except Exception as e:
+        print("Error:", e)
+
+def cmd_report_revenue(args):
+    try:
+        print("Revenue (last 30 days):", services.report.total_revenue_last_month())
+    except Exception as e:
+        print("Error:", e)
+
+def cmd_report_customers(args):
+    try:
+        print(json.dumps(services.report.orders_by_customer(min_orders=args.min_orders), indent=2, default=str))
+    except Exception as e:
+        print("Error:", e)
+
+def cmd_report_refresh(args):
+    try:
+        result = services.report.refresh(full=args.full, batch_size=args.batch_size)
+        print("Rollups refreshed:", json.dumps(result, indent=2, default=str))
+    except Exception as e:
+        print("Error:", e)
+
+def cmd_report_windows(args):
+    try:
+        rows = services.report.revenue_by_window(days=args.days, window_days=args.window_days)
+        print(json.dumps(rows, indent=2, default=str))
+    except Exception as e:
+        print("Error:", e)
+
+def cmd_report_snapshot(args):
+    try:
+        snap = services.report.load_snapshot(page_size=args.page_size)
+        print(json.dumps({
+            "rows": snap.counts(),
+            "bytes": snap.nbytes(),
+            "top": services.report.top_selling_products(args.limit),
+            "revenue": services.report.revenue_by_window(days=args.days, window_days=args.window_days),
+            "frequent_customers": services.report.frequent_customers(args.min_orders),
+        }, indent=2, default=str))
+    except Exception as e:
+        print("Error:", e)
+
+# ---------------- OUTBOX COMMANDS ----------------
+def cmd_outbox_drain(args):
+    try:
+        summary = services.outbox.drain(batch_size=args.batch_size, max_batches=args.max_batches)
+        print("Outbox drained:", json.dumps(summary, indent=2))
+    except Exception as e:
+        print("Error:", e)
+
+def cmd_outbox_status(args):
+    try:
+        print(json.dumps(services.outbox.status(args.limit), indent=2, default=str))
+    except Exception as e:
+        print("Error:", e)
+
+# ---------------- INVENTORY COMMANDS ----------------
+PLAN_FIELDS = ["prod_id", "sku", "name", "stock", "units_sold", "daily_velocity", "days_of_cover",
+               "reorder_quantity", "order_by_days"]
+
+def _planner(args):
+    services.replenishment.configure(window_days=args.window_days, lead_time_days=args.lead_time_days,
+                                     safety_days=args.safety_days)
+    return services.replenishment
+
+def cmd_inventory_alerts(args):
+    try:
+        alerts = _planner(args).alerts(limit=args.limit, horizon_days=args.horizon_days)
+        write_records(alerts, "-", "jsonl")
+        print(f"{len(alerts)} SKU(s) run out within the horizon", file=sys.stderr)
+    except Exception as e:
+        print("Error:", e, file=sys.stderr)
+
+def cmd_inventory_plan(args):
+    try:
+        plan = _planner(args).plan(limit=args.limit, target_days=args.target_days)
+        write_records(plan, args.out, fields=PLAN_FIELDS if args.out.endswith(".csv") else None)
+        print(f"{len(plan)} reorder line(s), {sum(p['reorder_quantity'] for p in plan)} units", file=sys.stderr)
+    except Exception as e:
+        print("Error:", e, file=sys.stderr)
+
+def cmd_inventory_add_warehouse(args):
+    try:
+        w = services.stock.add_warehouse(args.code, args.name, args.city, args.priority)
+        print("Created warehouse:", json.dumps(w, indent=2, default=str))
+    except Exception as e:
+        print("Error:", e)
+
+def cmd_inventory_warehouses(args):
+    try:
+        write_records(services.stock.warehouses(fresh=True), "-", "jsonl")
+    except Exception as e:
+        print("Error:", e, file=sys.stderr)
+
+def cmd_inventory_assign(args):
+    try:
+        result = services.stock.assign(args.product, args.warehouse, args.quantity, args.shards,
+                                       from_central=not args.received)
+        print(f"Assigned {args.quantity} units of product {args.product} to {args.warehouse} "
+              f"over {result['shards']} shard(s)")
+    except Exception as e:
+        print("Error:", e)
+
+def cmd_inventory_availability(args):
+    try:
+        write_records(services.product.availability(args.product, fresh=True), "-", "jsonl")
+    except Exception as e:
+        print("Error:", e, file=sys.stderr)
+
+# ---------------- BATCH / DAEMON ----------------
+def cmd_batch(args):
+    try:
+        lines = read_lines(args.file)
+        if args.socket:
+            from src.cli.daemon import send
+            counts = send(lines, sys.stdout, args.socket)
+        else:
+            from src.cli.batch import BatchRunner, run_batch
+            counts = run_batch(BatchRunner(services, build_parser(), args.group_size), lines, sys.stdout)
+        print(f"batch: {counts['ok']} ok, {counts['failed']} failed", file=sys.stderr)
+    except Exception as e:
+        print("Error:", e, file=sys.stderr)
+
+def cmd_daemon(args):
+    try:
+        from src.cli.batch import BatchRunner
+        from src.cli.daemon import serve
+        print(f"Serving batch commands on {args.socket}", file=sys.stderr)
+        serve(BatchRunner(services, build_parser(), args.group_size), args.socket)
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        print("Error:", e, file=sys.stderr)
+
 # ---------------- PARSER ----------------
+def _planner_args(p):
+    p.add_argument("--window-days", type=int, default=28, help="sales window for velocity")
+    p.add_argument("--lead-time-days", type=float, default=7)
+    p.add_argument("--safety-days", type=float, default=3)
+
 def build_parser():
     parser = argparse.ArgumentParser(prog="retail-cli")
+    parser.add_argument("--profile", action="store_true",
+                        help="print per-query timings and round trips for the command")
+    parser.add_argument("--profile-export", metavar="PATH",
+                        help="write query metrics to PATH (.prom for Prometheus text, else JSON)")
+    parser.add_argument("--slow-query-ms", type=float,
+                        help="log queries slower than this (see RETAIL_SLOW_QUERY_LOG)")
     sub = parser.add_subparsers(dest="cmd")
 
     # Product commands
@@ -148,7 +397,22 @@ def build_parser():
     addp.add_argument("--category", default=None)
     addp.set_defaults(func=cmd_product_add)
 
-    listp = pprod_sub.add_parser("list")
+    listp = pprod_sub.add_parser("list", help="stream products as NDJSON; filters combine with AND")
+    listp.add_argument("--category", nargs="+", help="one or more categories")
+    listp.add_argument("--min-price", type=float)
+    listp.add_argument("--max-price", type=float)
+    listp.add_argument("--stock-below", type=int, help="low stock: stock under this threshold")
+    listp.add_argument("--min-stock", type=int)
+    listp.add_argument("--name", help="name contains (case-insensitive)")
+    listp.add_argument("--sku-prefix")
+    listp.add_argument("--sort", choices=product_fields.SORTABLE, default="prod_id")
+    listp.add_argument("--desc", action="store_true")
+    listp.add_argument("--fields", help="comma-separated columns, e.g. sku,stock")
+    listp.add_argument("--limit", type=int, help="return one page of this many rows")
+    listp.add_argument("--cursor", help="with --limit, continue after a previous page")
+    listp.add_argument("--page-size", type=int, default=1000)
+    listp.add_argument("--availability", action="store_true",
+                       help="add `available`: units across the central pool and every warehouse")
     listp.set_defaults(func=cmd_product_list)
 
     updatep = pprod_sub.add_parser("update")
@@ -164,6 +428,18 @@ def build_parser():
     deletep.add_argument("--id", type=int, required=True)
     deletep.set_defaults(func=cmd_product_delete)
 
+    importp = pprod_sub.add_parser("import")
+    importp.add_argument("--file", required=True, help="CSV or JSONL file, '-' for stdin")
+    importp.add_argument("--format", choices=["csv", "jsonl"])
+    importp.add_argument("--chunk-size", type=int, default=500)
+    importp.set_defaults(func=cmd_product_import)
+
+    exportp = pprod_sub.add_parser("export")
+    exportp.add_argument("--file", default="-", help="CSV or JSONL file, '-' for stdout")
+    exportp.add_argument("--format", choices=["csv", "jsonl"])
+    exportp.add_argument("--page-size", type=int, default=1000)
+    exportp.set_defaults(func=cmd_product_export)
+
     # Customer commands
     p_cust = sub.add_parser("customer", help="customer commands")
     pcust_sub = p_cust.add_subparsers(dest="action")
@@ -175,7 +451,9 @@ def build_parser():
     addc.add_argument("--city")
     addc.set_defaults(func=cmd_customer_add)
 
-    listc = pcust_sub.add_parser("list")
+    listc = pcust_sub.add_parser("list", help="stream customers as NDJSON")
+    listc.add_argument("--limit", type=int, help="stop after this many rows")
+    listc.add_argument("--page-size", type=int, default=1000)
     listc.set_defaults(func=cmd_customer_list)
 
     updatec = pcust_sub.add_parser("update")
@@ -188,11 +466,25 @@ def build_parser():
     deletec.add_argument("--id", type=int, required=True)
     deletec.set_defaults(func=cmd_customer_delete)
 
-    searchc = pcust_sub.add_parser("search")
-    searchc.add_argument("--email")
-    searchc.add_argument("--city")
+    searchc = pcust_sub.add_parser("search", help="ranked search; criteria combine with AND")
+    searchc.add_argument("--name", help="name starts with (case-insensitive)")
+    searchc.add_argument("--email", help="exact email (case-insensitive)")
+    searchc.add_argument("--phone", help="phone contains these digits (3 or more)")
+    searchc.add_argument("--city", help="exact city (case-insensitive)")
+    searchc.add_argument("--text", "-q", help="fuzzy match on name or email")
+    searchc.add_argument("--limit", type=int, default=20, help="results per page")
+    searchc.add_argument("--cursor", help="continue after a previous page")
+    searchc.add_argument("--all", action="store_true", help="stream every page")
+    searchc.add_argument("--page-size", type=int, default=100, help="page size with --all")
+    searchc.add_argument("--local", action="store_true", help="search an in-memory index instead of the database")
+    searchc.add_argument("--index-file", help="with --local, load the index from this file (see customer index)")
     searchc.set_defaults(func=cmd_customer_search)
 
+    indexc = pcust_sub.add_parser("index", help="save customers to a file for offline search --local")
+    indexc.add_argument("--out", required=True)
+    indexc.add_argument("--page-size", type=int, default=5000)
+    indexc.set_defaults(func=cmd_customer_index)
+
     # Order commands
     p_order = sub.add_parser("order", help="order commands")
     porder_sub = p_order.add_subparsers(dest="action")
@@ -200,6 +492,8 @@ def build_parser():
     createo = porder_sub.add_parser("create")
     createo.add_argument("--customer", type=int, required=True)
     createo.add_argument("--item", nargs="+", required=True, help="prod_id:qty")
+    createo.add_argument("--allocation", help="warehouse order: priority or nearest "
+                                              "(default: RETAIL_ALLOCATION, else priority)")
     createo.set_defaults(func=cmd_order_create)
 
     showo = porder_sub.add_parser("show")
@@ -208,6 +502,7 @@ def build_parser():
 
     cano = porder_sub.add_parser("cancel")
     cano.add_argument("--order", type=int, required=True)
+    cano.add_argument("--sync", action="store_true", help="refund inline instead of via the outbox")
     cano.set_defaults(func=cmd_order_cancel)
 
     completeo = porder_sub.add_parser("complete")
@@ -216,8 +511,16 @@ def build_parser():
 
     listo = porder_sub.add_parser("list")
     listo.add_argument("--customer", type=int, required=True)
+    listo.add_argument("--page-size", type=int, default=1000)
     listo.set_defaults(func=cmd_order_list)
 
+    ingesto = porder_sub.add_parser("ingest", help="place NDJSON orders {ref, cust_id, items} in parallel")
+    ingesto.add_argument("--file", default="-", help="NDJSON order requests, '-' for stdin")
+    ingesto.add_argument("--output", default="-", help="NDJSON results, '-' for stdout")
+    ingesto.add_argument("--workers", type=int, default=8)
+    ingesto.add_argument("--queue-size", type=int, default=100, help="pending orders per worker")
+    ingesto.set_defaults(func=cmd_order_ingest)
+
     # Payment commands
     p_payment = sub.add_parser("payment", help="payment commands")
     pay_sub = p_payment.add_subparsers(dest="action")
@@ -225,17 +528,143 @@ def build_parser():
     process_pay = pay_sub.add_parser("process")
     process_pay.add_argument("--order", type=int, required=True)
     process_pay.add_argument("--method", choices=["Cash","Card","UPI"], required=True)
+    process_pay.add_argument("--sync", action="store_true", help="complete the order inline instead of via the outbox")
     process_pay.set_defaults(func=cmd_payment_process)
 
+    settle_pay = pay_sub.add_parser("settle", help="settle PENDING payments from a settlement file")
+    settle_pay.add_argument("--file", required=True, help="CSV or JSONL with order_id, amount, method; '-' for stdin")
+    settle_pay.add_argument("--format", choices=["csv", "jsonl"])
+    settle_pay.add_argument("--report", default="-", help="where to write mismatches (CSV or JSONL, '-' for stdout)")
+    settle_pay.add_argument("--chunk-size", type=int, default=500)
+    settle_pay.add_argument("--tolerance", type=float, default=0.01, help="allowed amount difference")
+    settle_pay.set_defaults(func=cmd_payment_settle)
+
+    # Report commands
+    p_report = sub.add_parser("report", help="report commands")
+    rep_sub = p_report.add_subparsers(dest="action")
+
+    topr = rep_sub.add_parser("top")
+    topr.add_argument("--limit", type=int, default=5)
+    topr.set_defaults(func=cmd_report_top)
+
+    revr = rep_sub.add_parser("revenue")
+    revr.set_defaults(func=cmd_report_revenue)
+
+    custr = rep_sub.add_parser("customers")
+    custr.add_argument("--min-orders", type=int, default=0)
+    custr.set_defaults(func=cmd_report_customers)
+
+    refreshr = rep_sub.add_parser("refresh")
+    refreshr.add_argument("--full", action="store_true", help="rebuild rollups from scratch")
+    refreshr.add_argument("--batch-size", type=int, default=10000)
+    refreshr.set_defaults(func=cmd_report_refresh)
+
+    windowsr = rep_sub.add_parser("windows", help="revenue per time window")
+    windowsr.add_argument("--days", type=int, default=30)
+    windowsr.add_argument("--window-days", type=int, default=1)
+    windowsr.set_defaults(func=cmd_report_windows)
+
+    snapr = rep_sub.add_parser("snapshot", help="load a columnar snapshot and report from memory")
+    snapr.add_argument("--limit", type=int, default=5)
+    snapr.add_argument("--days", type=int, default=30)
+    snapr.add_argument("--window-days", type=int, default=7)
+    snapr.add_argument("--min-orders", type=int, default=2)
+    snapr.add_argument("--page-size", type=int, default=5000)
+    snapr.set_defaults(func=cmd_report_snapshot)
+
+    # Outbox commands
+    p_outbox = sub.add_parser("outbox", help="queued follow-up writes")
+    outbox_sub = p_outbox.add_subparsers(dest="action")
+
+    draino = outbox_sub.add_parser("drain", help="apply due refunds / completions")
+    draino.add_argument("--batch-size", type=int, default=100)
+    draino.add_argument("--max-batches", type=int)
+    draino.set_defaults(func=cmd_outbox_drain)
+
+    statuso = outbox_sub.add_parser("status")
+    statuso.add_argument("--limit", type=int, default=20, help="dead-lettered entries to show")
+    statuso.set_defaults(func=cmd_outbox_status)
+
+    # Inventory commands
+    p_inv = sub.add_parser("inventory", help="warehouses, low-stock alerts and replenishment")
+    inv_sub = p_inv.add_subparsers(dest="action")
+
+    alertsi = inv_sub.add_parser("alerts", help="SKUs that run out soonest (NDJSON)")
+    alertsi.add_argument("--limit", type=int, default=20)
+    alertsi.add_argument("--horizon-days", type=float, help="default: lead time + safety days")
+    _planner_args(alertsi)
+    alertsi.set_defaults(func=cmd_inventory_alerts)
+
+    plani = inv_sub.add_parser("plan", help="reorder quantities for SKUs at their reorder point")
+    plani.add_argument("--limit", type=int, default=100)
+    plani.add_argument("--target-days", type=float, default=30, help="cover to buy beyond the lead time")
+    plani.add_argument("--out", default="-", help="CSV or JSONL file, '-' for stdout")
+    _planner_args(plani)
+    plani.set_defaults(func=cmd_inventory_plan)
+
+    addw = inv_sub.add_parser("add-warehouse")
+    addw.add_argument("--code", required=True)
+    addw.add_argument("--name", required=True)
+    addw.add_argument("--city")
+    addw.add_argument("--priority", type=int, default=100, help="lower is drawn from first")
+    addw.set_defaults(func=cmd_inventory_add_warehouse)
+
+    listw = inv_sub.add_parser("warehouses", help="active warehouses by priority (NDJSON)")
+    listw.set_defaults(func=cmd_inventory_warehouses)
+
+    assigni = inv_sub.add_parser("assign", help="move a product's stock into a warehouse")
+    assigni.add_argument("--product", type=int, required=True)
+    assigni.add_argument("--warehouse", required=True, help="warehouse id or code")
+    assigni.add_argument("--quantity", type=int, required=True)
+    assigni.add_argument("--shards", type=int, default=1,
+                         help="split over this many counters so concurrent orders of a hot SKU do not queue")
+    assigni.add_argument("--received", action="store_true",
+                         help="new stock, instead of units taken from the central pool")
+    assigni.set_defaults(func=cmd_inventory_assign)
+
+    availi = inv_sub.add_parser("availability", help="units per product: central, per warehouse, total")
+    availi.add_argument("--product", type=int, nargs="+", required=True)
+    availi.set_defaults(func=cmd_inventory_availability)
+
+    # Batch / daemon
+    batch = sub.add_parser("batch", help="run NDJSON commands on one warm client")
+    batch.add_argument("--file", default="-", help="NDJSON commands, '-' for stdin")
+    batch.add_argument("--socket", help="send the commands to a running daemon instead")
+    batch.add_argument("--group-size", type=int, default=500, help="max adds per bulk insert")
+    batch.set_defaults(func=cmd_batch)
+
+    daemon = sub.add_parser("daemon", help="serve batch commands on a local Unix socket")
+    daemon.add_argument("--socket", default=os.getenv("RETAIL_DAEMON_SOCKET", "/tmp/retail-cli.sock"))
+    daemon.add_argument("--group-size", type=int, default=500, help="max adds per bulk insert")
+    daemon.set_defaults(func=cmd_daemon)
+
     return parser
 
 def main():
     parser = build_parser()
     args = parser.parse_args()
-    if hasattr(args, "func"):
-        args.func(args)
-    else:
+    if not hasattr(args, "func"):
         parser.print_help()
+        return
+    if args.profile or args.profile_export:
+        instrumentation.enable(slow_ms=args.slow_query_ms)
+    command = " ".join(filter(None, (args.cmd, getattr(args, "action", None))))
+    with instrumentation.scope(command):
+        args.func(args)
+    queued = services.loaded("outbox") or (services.loaded("order") and services.order.queued)
+    # follow-ups are left to `outbox drain` / the daemon's drain thread so the command
+    # returns after its primary write; RETAIL_OUTBOX_DRAIN_ON_EXIT=1 applies them before exiting
+    if queued and args.cmd != "outbox" and os.getenv("RETAIL_OUTBOX_DRAIN_ON_EXIT", "0") == "1":
+        sys.stdout.flush()
+        try:
+            services.outbox.drain()
+        except Exception as e:
+            print("Outbox drain failed (entries stay queued):", e, file=sys.stderr)
+    if args.profile:
+        print(f"\n--- profile: {command} ---", file=sys.stderr)
+        print(instrumentation.report(), file=sys.stderr)
+    if args.profile_export:
+        instrumentation.export(args.profile_export)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,59 @@
+# src/cli/records.py
+import csv
+import json
+import sys
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List
+
+
+def detect_format(path: str, fmt: str | None = None) -> str:
+    if fmt:
+        return fmt
+    return "csv" if path.lower().endswith(".csv") else "jsonl"
+
+
+@contextmanager
+def _open(path: str, mode: str):
+    if path == "-":
+        yield sys.stdin if "r" in mode else sys.stdout
+    else:
+        with open(path, mode, newline="", encoding="utf-8") as fh:
+            yield fh
+
+
+def read_records(path: str, fmt: str | None = None) -> Iterator[Dict]:
+    """Stream dict records from a CSV or JSONL file ('-' for stdin)."""
+    fmt = detect_format(path, fmt)
+    with _open(path, "r") as fh:
+        if fmt == "csv":
+            yield from csv.DictReader(fh)
+            return
+        for line in fh:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def read_lines(path: str) -> Iterator[str]:
+    """Stream raw lines from a file ('-' for stdin)."""
+    with _open(path, "r") as fh:
+        yield from fh
+
+
+def write_records(rows: Iterable[Dict], path: str, fmt: str | None = None,
+                  fields: List[str] | None = None) -> int:
+    """Write dict records as CSV or JSONL ('-' for stdout), row by row."""
+    fmt = detect_format(path, fmt)
+    count = 0
+    with _open(path, "w") as fh:
+        writer = None
+        for row in rows:
+            if fmt == "csv":
+                if writer is None:
+                    writer = csv.DictWriter(fh, fieldnames=fields or list(row), extrasaction="ignore")
+                    writer.writeheader()
+                writer.writerow(row)
+            else:
+                fh.write(json.dumps(row, default=str) + "\n")
+            count += 1
+    return count
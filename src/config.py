@@ -17,26 +17,256 @@ def get_supabase() -> Client:
     return create_client(SUPABASE_URL, SUPABASE_KEY)
  '''
 # src/config.py
+from __future__ import annotations
+
+import atexit
 import os
+import random
+import threading
+import weakref
+from typing import TYPE_CHECKING
 from dotenv import load_dotenv
-from supabase import create_client, Client
+
+if TYPE_CHECKING:
+    from supabase import Client, AsyncClient
 
 load_dotenv()  # loads .env from project root
 
 
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, default))
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    return os.getenv(name, "1" if default else "0").lower() in ("1", "true", "yes", "on")
+
+
+class _ThreadClient:
+    """A thread's client; its pool is closed once the thread ends and this is collected."""
+
+    __slots__ = ("client", "__weakref__")
+
+    def __init__(self, client):
+        self.client = client
+
+
 class SupabaseConfig:
-    """Singleton-style access to Supabase client."""
+    """
+    Manages Supabase clients and their HTTP transport.
+
+    Clients share a tuned httpx connection pool (keep-alive, optional
+    HTTP/2, timeouts). By default one client serves the whole process;
+    SUPABASE_CLIENT_SCOPE=thread gives each thread its own, closed when the
+    thread ends. A client installed with set_client() serves every thread.
+    Clients
+    inherited across fork() are dropped in the child, and close() (also run
+    at exit) shuts every pool down.
+
+    RETAIL_BACKEND=sqlite swaps Supabase for the in-process SQLite backend
+    (src/dao/sqlite_backend.py) at RETAIL_SQLITE_PATH.
+
+    supabase and httpx are imported on first client use, so commands that
+    never reach the database (or run on SQLite) do not pay for them.
+    """
 
     _client: Client | None = None
+    _async_client: AsyncClient | None = None
+    _local = threading.local()
+    _lock = threading.Lock()
+    _pid = os.getpid()
+    _http_clients: list = []
+
+    # ------------------ Settings ------------------
+    @staticmethod
+    def _credentials() -> tuple[str, str]:
+        url = os.getenv("SUPABASE_URL")
+        key = os.getenv("SUPABASE_KEY")
+        if not url or not key:
+            raise RuntimeError(
+                "SUPABASE_URL and SUPABASE_KEY must be set in environment (.env)"
+            )
+        return url, key
+
+    @staticmethod
+    def backend() -> str:
+        return os.getenv("RETAIL_BACKEND", "supabase").lower()
+
+    @staticmethod
+    def _http2() -> bool:
+        if not _env_flag("SUPABASE_HTTP2", True):
+            return False
+        try:
+            import h2  # noqa: F401  (httpx needs it for HTTP/2)
+        except ImportError:
+            return False
+        return True
+
+    @staticmethod
+    def _transport_settings() -> dict:
+        import httpx
+        return {
+            "limits": httpx.Limits(
+                max_connections=_env_int("SUPABASE_POOL_SIZE", 20),
+                max_keepalive_connections=_env_int("SUPABASE_POOL_KEEPALIVE", 10),
+                keepalive_expiry=_env_float("SUPABASE_KEEPALIVE_EXPIRY", 30.0),
+            ),
+            "timeout": httpx.Timeout(
+                _env_float("SUPABASE_TIMEOUT", 10.0),
+                connect=_env_float("SUPABASE_CONNECT_TIMEOUT", 3.0),
+            ),
+        }
+
+    @classmethod
+    def read_retries(cls) -> int:
+        return _env_int("SUPABASE_READ_RETRIES", 3)
+
+    @classmethod
+    def backoff(cls, attempt: int) -> float:
+        """Full-jitter exponential backoff delay for retry `attempt` (0-based)."""
+        base = _env_float("SUPABASE_RETRY_BACKOFF", 0.2)
+        cap = _env_float("SUPABASE_RETRY_BACKOFF_MAX", 5.0)
+        return random.uniform(0, min(cap, base * 2 ** attempt))
+
+    # ------------------ Clients ------------------
+    @classmethod
+    def _check_fork(cls) -> None:
+        # A client's sockets belong to the process that opened them. Forget,
+        # but do not close, anything inherited from the parent.
+        if cls._pid != os.getpid():
+            with cls._lock:
+                if cls._pid != os.getpid():
+                    cls._pid = os.getpid()
+                    cls._client = None
+                    cls._async_client = None
+                    cls._local = threading.local()
+                    cls._http_clients = []
+
+    @classmethod
+    def _build_client(cls) -> tuple[Client, object]:
+        """A client on a new pool, and that pool (an httpx.Client)."""
+        import httpx
+        from supabase import create_client, ClientOptions
+        url, key = cls._credentials()
+        settings = cls._transport_settings()
+        # transport-level retries only cover failed connects, which are always safe
+        http = httpx.Client(
+            timeout=settings["timeout"],
+            transport=httpx.HTTPTransport(http2=cls._http2(), limits=settings["limits"], retries=1),
+        )
+        with cls._lock:
+            cls._http_clients.append(http)
+        options = ClientOptions(httpx_client=http,
+                                postgrest_client_timeout=settings["timeout"].read)
+        return create_client(url, key, options=options), http
+
+    @classmethod
+    def _release_http(cls, http, pid: int) -> None:
+        """Close one pool and stop tracking it (a thread client's finalizer)."""
+        if pid != os.getpid():
+            return  # inherited across fork; the parent owns the sockets
+        with cls._lock:
+            if http not in cls._http_clients:
+                return  # already closed by close()
+            cls._http_clients.remove(http)
+        http.close()
+
+    @classmethod
+    def _build_sqlite_client(cls):
+        from src.dao.sqlite_backend import SQLiteClient
+        return SQLiteClient(os.getenv("RETAIL_SQLITE_PATH", ":memory:"))
+
+    @classmethod
+    def set_client(cls, client) -> None:
+        """Install `client` (e.g. a SQLiteClient) as the process-wide client."""
+        with cls._lock:
+            cls._client = client
+            cls._async_client = client.as_async() if hasattr(client, "as_async") else None
+            cls._local = threading.local()  # thread clients are closed as their holders are collected
 
     @classmethod
     def get_client(cls) -> Client:
+        cls._check_fork()
+        if cls.backend() == "sqlite":
+            if cls._client is None:
+                with cls._lock:
+                    if cls._client is None:
+                        cls._client = cls._build_sqlite_client()
+            return cls._client
+        # in thread scope _client is only ever set by set_client(), which wins
+        if cls._client is None and os.getenv("SUPABASE_CLIENT_SCOPE", "process") == "thread":
+            holder = getattr(cls._local, "holder", None)
+            if holder is None:
+                client, http = cls._build_client()
+                holder = cls._local.holder = _ThreadClient(client)
+                # thread-local values are dropped when their thread ends
+                weakref.finalize(holder, cls._release_http, http, os.getpid())
+            return holder.client
         if cls._client is None:
-            url = os.getenv("SUPABASE_URL")
-            key = os.getenv("SUPABASE_KEY")
-            if not url or not key:
-                raise RuntimeError(
-                    "SUPABASE_URL and SUPABASE_KEY must be set in environment (.env)"
-                )
-            cls._client = create_client(url, key)
+            client, http = cls._build_client()
+            with cls._lock:
+                if cls._client is None:
+                    cls._client, http = client, None
+            if http is not None:
+                cls._release_http(http, os.getpid())  # another thread got there first
         return cls._client
+
+    @classmethod
+    async def get_async_client(cls) -> AsyncClient:
+        cls._check_fork()
+        if cls._async_client is None and cls.backend() == "sqlite":
+            client = cls.get_client().as_async()
+            with cls._lock:
+                if cls._async_client is None:
+                    cls._async_client = client
+        if cls._async_client is None:
+            import httpx
+            from supabase import acreate_client, AsyncClientOptions
+            url, key = cls._credentials()
+            settings = cls._transport_settings()
+            http = httpx.AsyncClient(
+                timeout=settings["timeout"],
+                transport=httpx.AsyncHTTPTransport(http2=cls._http2(), limits=settings["limits"], retries=1),
+            )
+            options = AsyncClientOptions(httpx_client=http,
+                                         postgrest_client_timeout=settings["timeout"].read)
+            client = await acreate_client(url, key, options=options)
+            # the lock is not held across the await; a caller that loses the race closes its pool
+            with cls._lock:
+                won = cls._async_client is None
+                if won:
+                    cls._async_client = client
+                    cls._http_clients.append(http)
+            if not won:
+                await http.aclose()
+        return cls._async_client
+
+    @classmethod
+    def close(cls) -> None:
+        """Close every connection pool opened by this process."""
+        if cls._pid != os.getpid():
+            return
+        with cls._lock:
+            for http in cls._http_clients:
+                if hasattr(http, "close"):
+                    http.close()
+                # AsyncClient pools are closed by their event loop via aclose()
+            cls._http_clients = []
+            cls._client = None
+            cls._async_client = None
+            cls._local = threading.local()
+
+    @classmethod
+    async def aclose(cls) -> None:
+        if cls._async_client is not None:
+            for http in list(cls._http_clients):
+                if hasattr(http, "aclose") and not hasattr(http, "close"):
+                    await http.aclose()
+                    cls._http_clients.remove(http)
+            cls._async_client = None
+
+
+atexit.register(SupabaseConfig.close)
@@ -0,0 +1,255 @@
+# src/dao/async_dao.py
+"""
+Async counterparts of the table DAOs, built on supabase's AsyncClient.
+
+They issue the same queries as the sync DAOs and share their caches, but
+every request is awaited through a semaphore (one per event loop) so
+callers can fan out with asyncio.gather without flooding PostgREST. Lookups by id that are awaited
+together are coalesced into one `in_` query (src/dao/loader.py). Create them with
+`await AsyncProductDAO.create()` so the async client is ready.
+"""
+import asyncio
+import os
+import weakref
+from typing import Optional, List, Dict
+from src.config import SupabaseConfig
+from src.dao.base_dao import RETURNING, DEFAULT_PAGE_SIZE, IN_CHUNK, is_idempotent, is_transport_error
+from src.dao.cache import MISS, get_cache, invalidate
+from src.dao.instrumentation import instrumentation
+from src.dao.loader import AsyncBatchLoader
+from src.dao.stock_dao import StockDAO
+
+# A semaphore is bound to the loop it is first used on, so each loop gets its own.
+_limit: int | None = None
+_limiters: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+
+def concurrency_limit() -> asyncio.Semaphore:
+    global _limit
+    loop = asyncio.get_running_loop()
+    limiter = _limiters.get(loop)
+    if limiter is None:
+        if _limit is None:
+            _limit = int(os.getenv("RETAIL_ASYNC_CONCURRENCY", "10"))
+        limiter = _limiters[loop] = asyncio.Semaphore(_limit)
+    return limiter
+
+
+def set_concurrency_limit(limit: int) -> None:
+    global _limit
+    _limit = limit
+    _limiters.clear()
+
+
+class AsyncBaseDAO:
+    """Shared async query/write layer."""
+
+    def __init__(self, sb):
+        self.sb = sb
+
+    @classmethod
+    async def create(cls):
+        return cls(await SupabaseConfig.get_async_client())
+
+    # ------------------ Reads ------------------
+    async def _execute(self, query):
+        retries = SupabaseConfig.read_retries() if is_idempotent(query) else 0
+        for attempt in range(retries + 1):
+            try:
+                async with concurrency_limit():
+                    return await instrumentation.execute_async(query)
+            except Exception as e:
+                if attempt == retries or not is_transport_error(e):
+                    raise
+                await asyncio.sleep(SupabaseConfig.backoff(attempt))
+
+    async def _one(self, query) -> Optional[Dict]:
+        resp = await self._execute(query)
+        return resp.data[0] if resp.data else None
+
+    async def _all(self, query) -> List[Dict]:
+        return (await self._execute(query)).data or []
+
+    async def _fetch_in(self, table: str, key: str, ids: List, columns: str = "*") -> Dict:
+        ids = list(dict.fromkeys(ids))
+        pages = await asyncio.gather(*(self._all(self.sb.table(table).select(columns).in_(key, ids[i:i + IN_CHUNK]))
+                                       for i in range(0, len(ids), IN_CHUNK)))
+        return {row[key]: row for page in pages for row in page}
+
+    # ------------------ Writes ------------------
+    async def _insert(self, table: str, payload: Dict | List[Dict]) -> List[Dict]:
+        return await self._all(self.sb.table(table).insert(payload, returning=RETURNING))
+
+    async def _update(self, table: str, fields: Dict, **match) -> List[Dict]:
+        q = self.sb.table(table).update(fields, returning=RETURNING)
+        for col, val in match.items():
+            q = q.eq(col, val)
+        return await self._all(q)
+
+
+class AsyncCachedDAO(AsyncBaseDAO):
+    """Async DAO reading through the same shared cache as CachedDAO."""
+
+    table: str = ""
+    key: str = ""
+    unique: tuple = ()
+
+    def __init__(self, sb, cache=None):
+        super().__init__(sb)
+        self.cache = cache or get_cache(self.table)
+        # concurrent get_by_id misses are coalesced into one `in_` query
+        self._loader = AsyncBatchLoader(lambda ids: self._fetch_in(self.table, self.key, ids), IN_CHUNK)
+
+    def _remember(self, row: Optional[Dict]) -> Optional[Dict]:
+        if row:
+            self.cache.set(("id", row[self.key]), dict(row))
+            for col in self.unique:
+                if row.get(col) is not None:
+                    self.cache.set((col, row[col]), row[self.key])
+        return row
+
+    async def get_by_id(self, pk, fresh: bool = False) -> Optional[Dict]:
+        if not fresh:
+            row = self.cache.get(("id", pk))
+            if row is not MISS:
+                return dict(row)
+        row = await self._loader.load(pk)
+        return dict(self._remember(row)) if row else None
+
+    async def get_many(self, ids: List, fresh: bool = False) -> List[Optional[Dict]]:
+        """Rows in request order (None where missing); cache misses share one query."""
+        return list(await asyncio.gather(*(self.get_by_id(pk, fresh) for pk in ids)))
+
+
+class AsyncProductDAO(AsyncCachedDAO):
+    table = "products"
+    key = "prod_id"
+    unique = ("sku",)
+
+    async def get_by_sku(self, sku: str) -> Optional[Dict]:
+        return self._remember(await self._one(self.sb.table("products").select("*").eq("sku", sku).limit(1)))
+
+    async def insert(self, name: str, sku: str, price: float,
+                     stock: int = 0, category: str | None = None) -> Optional[Dict]:
+        payload = {"name": name, "sku": sku, "price": price, "stock": stock}
+        if category:
+            payload["category"] = category
+        rows = await self._insert("products", payload)
+        return self._remember(rows[0]) if rows else None
+
+    async def update(self, prod_id: int, fields: Dict) -> Optional[Dict]:
+        invalidate("products", [prod_id])
+        rows = await self._update("products", fields, prod_id=prod_id)
+        return self._remember(rows[0]) if rows else None
+
+    async def list(self, limit: int = 100, category: str | None = None,
+                   after: int | None = None) -> List[Dict]:
+        q = self.sb.table("products").select("*").order("prod_id", desc=False).limit(limit)
+        if category:
+            q = q.eq("category", category)
+        if after is not None:
+            q = q.gt("prod_id", after)
+        return await self._all(q)
+
+
+class AsyncCustomerDAO(AsyncCachedDAO):
+    table = "customers"
+    key = "cust_id"
+    unique = ("email",)
+
+
+class AsyncOrderDAO(AsyncBaseDAO):
+    def __init__(self, sb):
+        super().__init__(sb)
+        self._loader = AsyncBatchLoader(lambda ids: self._fetch_in("orders", "order_id", ids), IN_CHUNK)
+
+    async def place_order(self, cust_id: int, items: List[Dict], warehouses: List[int] | None = None) -> Dict:
+        lines = [{"prod_id": i["prod_id"], "quantity": i["quantity"]} for i in items]
+        invalidate("products", [l["prod_id"] for l in lines])
+        invalidate("availability", [l["prod_id"] for l in lines])
+        params = {"p_cust_id": cust_id, "p_items": lines}
+        if warehouses is not None:
+            params["p_warehouses"] = warehouses
+        resp = await self._execute(self.sb.rpc("place_order", params))
+        return resp.data or {}
+
+    async def cancel_order(self, order_id: int) -> Dict:
+        result = (await self._execute(self.sb.rpc("cancel_order", {"p_order_id": order_id}))).data or {}
+        StockDAO.invalidate([i["prod_id"] for i in result.get("items") or []])
+        return result
+
+    async def complete_orders(self, order_ids: List[int]) -> Dict:
+        if not order_ids:
+            return {"completed": [], "skipped": []}
+        resp = await self._execute(self.sb.rpc("complete_orders", {"p_order_ids": list(order_ids)}))
+        return resp.data or {"completed": [], "skipped": []}
+
+    async def get_order_by_id(self, order_id: int) -> Optional[Dict]:
+        row = await self._loader.load(order_id)
+        return dict(row) if row else None
+
+    async def get_many(self, order_ids: List[int]) -> List[Optional[Dict]]:
+        return list(await asyncio.gather(*(self.get_order_by_id(oid) for oid in order_ids)))
+
+    async def update_order_status(self, order_id: int, status: str,
+                                  from_status: str | None = None) -> Optional[Dict]:
+        match = {"order_id": order_id}
+        if from_status:
+            match["status"] = from_status
+        rows = await self._update("orders", {"status": status}, **match)
+        return rows[0] if rows else None
+
+    async def list_orders_by_customer(self, cust_id: int, limit: int = DEFAULT_PAGE_SIZE,
+                                      after: int | None = None) -> List[Dict]:
+        q = self.sb.table("orders").select("*").eq("cust_id", cust_id).order("order_id", desc=False).limit(limit)
+        if after is not None:
+            q = q.gt("order_id", after)
+        return await self._all(q)
+
+    async def get_order_items(self, order_id: int) -> List[Dict]:
+        return await self._all(self.sb.table("order_items").select("*").eq("order_id", order_id))
+
+
+class AsyncStockDAO(AsyncBaseDAO):
+    async def warehouses(self, active_only: bool = True) -> List[Dict]:
+        q = self.sb.table("warehouses").select("*")
+        if active_only:
+            q = q.eq("active", True)
+        return await self._all(q.order("priority").order("warehouse_id"))
+
+    async def reserve(self, items: List[Dict]) -> Dict:
+        StockDAO.invalidate([i["prod_id"] for i in items])
+        return (await self._execute(self.sb.rpc("reserve_stock", {"p_items": items}))).data or {}
+
+    async def release(self, items: List[Dict]) -> Dict:
+        StockDAO.invalidate([i["prod_id"] for i in items])
+        return (await self._execute(self.sb.rpc("release_stock", {"p_items": items}))).data or {}
+
+
+class AsyncReportDAO(AsyncBaseDAO):
+    async def top_selling_products(self, limit: int = 5) -> List[Dict]:
+        return await self._all(self.sb.rpc("report_top_selling_products", {"p_limit": limit}))
+
+    async def daily_revenue(self, start, end) -> List[Dict]:
+        return await self._all(
+            self.sb.table("sales_daily_revenue")
+            .select("day,revenue,orders_count")
+            .gte("day", start.isoformat())
+            .lt("day", end.isoformat())
+            .order("day", desc=False)
+        )
+
+    async def revenue_between(self, start, end) -> float:
+        resp = await self._execute(self.sb.rpc("report_revenue_between",
+                                               {"p_from": start.isoformat(), "p_to": end.isoformat()}))
+        return float(resp.data or 0)
+
+    async def orders_by_customer_page(self, min_orders: int = 0, after: int | None = None,
+                                      limit: int = 1000) -> List[Dict]:
+        return await self._all(self.sb.rpc("report_orders_by_customer",
+                                           {"p_min_orders": min_orders, "p_after": after, "p_limit": limit}))
+
+    async def apply_order_event(self, order_id: int, event: str) -> bool:
+        resp = await self._execute(self.sb.rpc("rollup_apply_order_event",
+                                               {"p_order_id": order_id, "p_event": event}))
+        return bool(resp.data)
@@ -0,0 +1,179 @@
+# src/dao/base_dao.py
+import os
+import sys
+import time
+from typing import Optional, List, Dict, Callable, Iterator
+from src.config import SupabaseConfig
+from src.dao.cache import MISS, get_cache
+from src.dao.instrumentation import instrumentation
+from src.dao.loader import BatchLoader
+
+# Ask PostgREST to send the affected rows back with the write itself
+# (Prefer: return=representation) so no follow-up select is needed.
+RETURNING = "representation"
+RETURNING_MINIMAL = "minimal"
+
+DEFAULT_PAGE_SIZE = int(os.getenv("RETAIL_PAGE_SIZE", "1000"))
+
+# ids per `in_` filter; keeps the request URL well under proxy limits
+IN_CHUNK = int(os.getenv("RETAIL_IN_CHUNK", "200"))
+
+
+# Only these can be replayed safely after a dropped connection or timeout.
+IDEMPOTENT_METHODS = ("GET", "HEAD")
+
+
+def is_idempotent(query) -> bool:
+    return str(getattr(query, "http_method", "")).upper() in IDEMPOTENT_METHODS
+
+
+def is_transport_error(exc: BaseException) -> bool:
+    # httpx is only loaded once a Supabase client exists; if it never was,
+    # the error cannot have come from it
+    httpx = sys.modules.get("httpx")
+    return httpx is not None and isinstance(exc, httpx.TransportError)
+
+
+class BaseDAO:
+    """Shared query/write layer for the table DAOs."""
+
+    def __init__(self, sb=None):
+        self._sb = sb
+
+    @property
+    def sb(self):
+        # resolved per call so per-thread / post-fork clients are honoured
+        return self._sb if self._sb is not None else SupabaseConfig.get_client()
+
+    # ------------------ Reads ------------------
+    def _execute(self, query):
+        if not is_idempotent(query):
+            return instrumentation.execute(query)
+        retries = SupabaseConfig.read_retries()
+        for attempt in range(retries + 1):
+            try:
+                return instrumentation.execute(query)
+            except Exception as e:
+                if attempt == retries or not is_transport_error(e):
+                    raise
+                time.sleep(SupabaseConfig.backoff(attempt))
+
+    def _one(self, query) -> Optional[Dict]:
+        resp = self._execute(query)
+        return resp.data[0] if resp.data else None
+
+    def _all(self, query) -> List[Dict]:
+        return self._execute(query).data or []
+
+    def _iter_keyset(self, make_query: Callable, key: str,
+                     page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[Dict]:
+        """
+        Stream rows ordered by `key`, one page at a time, resuming each page
+        after the last key seen. `make_query()` must return a fresh select.
+        """
+        last = None
+        while True:
+            q = make_query().order(key, desc=False).limit(page_size)
+            if last is not None:
+                q = q.gt(key, last)
+            page = self._all(q)
+            yield from page
+            if len(page) < page_size:
+                return
+            last = page[-1][key]
+
+    def _fetch_in(self, table: str, key: str, ids: List, columns: str = "*") -> Dict:
+        """Rows whose `key` is in `ids` as {id: row}; one `in_` request per IN_CHUNK ids."""
+        ids = list(dict.fromkeys(ids))
+        found = {}
+        for start in range(0, len(ids), IN_CHUNK):
+            chunk = ids[start:start + IN_CHUNK]
+            for row in self._all(self.sb.table(table).select(columns).in_(key, chunk)):
+                found[row[key]] = row
+        return found
+
+    # ------------------ Writes ------------------
+    def _insert(self, table: str, payload: Dict | List[Dict]) -> List[Dict]:
+        return self._all(self.sb.table(table).insert(payload, returning=RETURNING))
+
+    def _upsert(self, table: str, rows: List[Dict], on_conflict: str,
+                returning: str = RETURNING) -> List[Dict]:
+        return self._all(self.sb.table(table).upsert(rows, on_conflict=on_conflict, returning=returning))
+
+    def _update(self, table: str, fields: Dict, **match) -> List[Dict]:
+        q = self.sb.table(table).update(fields, returning=RETURNING)
+        for col, val in match.items():
+            q = q.eq(col, val)
+        return self._all(q)
+
+    def _delete(self, table: str, **match) -> List[Dict]:
+        q = self.sb.table(table).delete(returning=RETURNING)
+        for col, val in match.items():
+            q = q.eq(col, val)
+        return self._all(q)
+
+
+class CachedDAO(BaseDAO):
+    """
+    BaseDAO with a shared read-through cache. Rows are cached under
+    ("id", pk); each unique column maps (column, value) -> pk so a single
+    invalidation by pk covers every lookup path.
+    """
+
+    table: str = ""
+    key: str = ""
+    unique: tuple = ()
+
+    def __init__(self, cache=None, sb=None):
+        super().__init__(sb)
+        self.cache = cache or get_cache(self.table)
+
+    def _remember(self, row: Optional[Dict]) -> Optional[Dict]:
+        if row:
+            self.cache.set(("id", row[self.key]), dict(row))
+            for col in self.unique:
+                if row.get(col) is not None:
+                    self.cache.set((col, row[col]), row[self.key])
+        return row
+
+    def _forget(self, *ids) -> None:
+        self.cache.delete(*[("id", i) for i in ids])
+
+    def _cached_by_id(self, pk, fetch: Callable, fresh: bool = False) -> Optional[Dict]:
+        if not fresh:
+            row = self.cache.get(("id", pk))
+            if row is not MISS:
+                return dict(row)
+        return self._remember(fetch())
+
+    def _cached_by(self, col: str, value, fetch: Callable, fresh: bool = False) -> Optional[Dict]:
+        if not fresh:
+            pk = self.cache.get((col, value))
+            if pk is not MISS:
+                row = self.cache.get(("id", pk))
+                if row is not MISS and row.get(col) == value:
+                    return dict(row)
+        return self._remember(fetch())
+
+    def get_many(self, ids: List, fresh: bool = False) -> List[Optional[Dict]]:
+        """
+        Rows for `ids` in request order (None where missing). Cached rows are
+        served directly; the rest are fetched together with one `in_` query
+        and repeated ids are fetched once.
+        """
+        rows = {}
+        if not fresh:
+            for pk in dict.fromkeys(ids):
+                row = self.cache.get(("id", pk))
+                if row is not MISS:
+                    rows[pk] = row
+        missing = [pk for pk in dict.fromkeys(ids) if pk not in rows]
+        if missing:
+            for pk, row in self._fetch_in(self.table, self.key, missing).items():
+                rows[pk] = self._remember(row)
+        return [dict(rows[pk]) if rows.get(pk) else None for pk in ids]
+
+    def loader(self, max_batch: int = IN_CHUNK) -> BatchLoader:
+        """A per-operation BatchLoader over this table (see src/dao/loader.py)."""
+        return BatchLoader(lambda ids: {pk: row for pk, row in zip(ids, self.get_many(ids)) if row},
+                           max_batch)
@@ -0,0 +1,112 @@
+# src/dao/cache.py
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable
+
+MISS = object()
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after `ttl` seconds."""
+
+    def __init__(self, max_size: int = 1024, ttl: float = 60.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return MISS
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, *keys: Hashable) -> None:
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "size": len(self._data), "max_size": self.max_size, "ttl": self.ttl}
+
+
+class NullCache:
+    """Cache that stores nothing; used when caching is disabled."""
+
+    hits = evictions = 0
+
+    def __init__(self):
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Any:
+        self.misses += 1
+        return MISS
+
+    def set(self, key: Hashable, value: Any) -> None:
+        pass
+
+    def delete(self, *keys: Hashable) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+    def stats(self) -> Dict:
+        return {"hits": 0, "misses": self.misses, "evictions": 0, "size": 0, "max_size": 0, "ttl": 0}
+
+
+# One shared cache per table so every DAO instance sees the same entries and
+# a write through any of them invalidates for all.
+_caches: Dict[str, Any] = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(name: str):
+    with _caches_lock:
+        if name not in _caches:
+            if os.getenv("RETAIL_CACHE", "on").lower() in ("off", "0", "false"):
+                _caches[name] = NullCache()
+            else:
+                _caches[name] = TTLCache(
+                    max_size=int(os.getenv("RETAIL_CACHE_SIZE", "10000")),
+                    ttl=float(os.getenv("RETAIL_CACHE_TTL", "30")),
+                )
+        return _caches[name]
+
+
+def set_cache(name: str, cache) -> None:
+    """Plug in a different cache implementation (anything with get/set/delete/clear/stats)."""
+    with _caches_lock:
+        _caches[name] = cache
+
+
+def invalidate(name: str, ids: Iterable) -> None:
+    get_cache(name).delete(*[("id", i) for i in ids])
+
+
+def cache_stats() -> Dict[str, Dict]:
+    with _caches_lock:
+        return {name: cache.stats() for name, cache in _caches.items()}
@@ -1,56 +1,77 @@
-from typing import Optional, List, Dict
-from src.config import SupabaseConfig
+from typing import Optional, List, Dict, Iterator
+from src.dao.base_dao import CachedDAO, DEFAULT_PAGE_SIZE
 
 
-class CustomerDAO:
+class CustomerDAO(CachedDAO):
     """Data-access object for customers table."""
 
-    def __init__(self):
-        self.sb = SupabaseConfig.get_client()
+    table = "customers"
+    key = "cust_id"
+    unique = ("email",)
 
     def create(self, name: str, email: str, phone: str, city: str | None = None) -> Optional[Dict]:
-        # Check uniqueness of email
-        if self.get_by_email(email):
-            return None
         payload = {"name": name, "email": email, "phone": phone}
         if city:
             payload["city"] = city
-        self.sb.table("customers").insert(payload).execute()
-        resp = self.sb.table("customers").select("*").eq("email", email).limit(1).execute()
-        return resp.data[0] if resp.data else None
+        rows = self._insert("customers", payload)
+        return self._remember(rows[0]) if rows else None
 
-    def get_by_id(self, cust_id: int) -> Optional[Dict]:
-        resp = self.sb.table("customers").select("*").eq("cust_id", cust_id).limit(1).execute()
-        return resp.data[0] if resp.data else None
+    def create_many(self, rows: List[Dict]) -> List[Dict]:
+        """Insert several customers in one request (a single statement, so all or nothing)."""
+        if not rows:
+            return []
+        return [self._remember(r) for r in self._insert("customers", rows)]
 
-    def get_by_email(self, email: str) -> Optional[Dict]:
-        resp = self.sb.table("customers").select("*").eq("email", email).limit(1).execute()
-        return resp.data[0] if resp.data else None
+    def existing_emails(self, emails: List[str]) -> List[str]:
+        if not emails:
+            return []
+        return [r["email"] for r in self._all(self.sb.table("customers").select("email").in_("email", emails))]
+
+    def get_by_id(self, cust_id: int, fresh: bool = False) -> Optional[Dict]:
+        return self._cached_by_id(cust_id, lambda: self._one(
+            self.sb.table("customers").select("*").eq("cust_id", cust_id).limit(1)), fresh)
+
+    def get_by_email(self, email: str, fresh: bool = False) -> Optional[Dict]:
+        return self._cached_by("email", email, lambda: self._one(
+            self.sb.table("customers").select("*").eq("email", email).limit(1)), fresh)
 
     def update(self, cust_id: int, fields: Dict) -> Optional[Dict]:
-        self.sb.table("customers").update(fields).eq("cust_id", cust_id).execute()
-        resp = self.sb.table("customers").select("*").eq("cust_id", cust_id).limit(1).execute()
-        return resp.data[0] if resp.data else None
+        self._forget(cust_id)
+        rows = self._update("customers", fields, cust_id=cust_id)
+        return self._remember(rows[0]) if rows else None
 
     def delete(self, cust_id: int) -> Optional[Dict]:
         # Check if customer has orders
-        orders = self.sb.table("orders").select("*").eq("cust_id", cust_id).execute()
-        if orders.data:
+        if self._one(self.sb.table("orders").select("order_id").eq("cust_id", cust_id).limit(1)):
             raise Exception("Cannot delete customer with existing orders")
-        before = self.sb.table("customers").select("*").eq("cust_id", cust_id).limit(1).execute()
-        row = before.data[0] if before.data else None
-        self.sb.table("customers").delete().eq("cust_id", cust_id).execute()
-        return row
+        self._forget(cust_id)
+        rows = self._delete("customers", cust_id=cust_id)
+        return rows[0] if rows else None
 
     def list(self, limit: int = 100) -> List[Dict]:
-        resp = self.sb.table("customers").select("*").order("cust_id", desc=False).limit(limit).execute()
-        return resp.data or []
+        return self._all(self.sb.table("customers").select("*").order("cust_id", desc=False).limit(limit))
+
+    def iter_all(self, page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[Dict]:
+        return self._iter_keyset(lambda: self.sb.table("customers").select("*"), "cust_id", page_size)
+
+    def iter_search(self, email: str | None = None, city: str | None = None,
+                    page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[Dict]:
+        def query():
+            q = self.sb.table("customers").select("*")
+            if email:
+                q = q.eq("email", email)
+            if city:
+                q = q.eq("city", city)
+            return q
+        return self._iter_keyset(query, "cust_id", page_size)
 
     def search(self, email: str | None = None, city: str | None = None) -> List[Dict]:
-        q = self.sb.table("customers").select("*")
-        if email:
-            q = q.eq("email", email)
-        if city:
-            q = q.eq("city", city)
-        resp = q.execute()
-        return resp.data or []
+        return list(self.iter_search(email=email, city=city))
+
+    def search_ranked(self, criteria: Dict, limit: int = 20, after_score: float | None = None,
+                      after_id: int | None = None) -> List[Dict]:
+        """One page of ranked matches from search_customers (see sql/007_customer_search.sql)."""
+        params = {f"p_{k}": v for k, v in criteria.items() if v}
+        params.update({"p_after_score": after_score, "p_after_id": after_id, "p_limit": limit})
+        rows = self._all(self.sb.rpc("search_customers", params))
+        return [dict(r, score=float(r["score"])) for r in rows]
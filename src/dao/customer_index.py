@@ -0,0 +1,237 @@
+# src/dao/customer_index.py
+"""
+Ranked customer search: the matching rules shared by the server-side
+search_customers function (sql/007_customer_search.sql) and CustomerIndex,
+an in-memory index for offline use.
+
+Criteria are combined with AND:
+
+    name_prefix  lower(name) starts with the value
+    email        lower(email) equals the value
+    phone        the digits of phone contain the value's digits
+    city         lower(city) equals the value
+    text         fuzzy: trigram similarity >= SIMILARITY_THRESHOLD, or a
+                 substring, on name or email
+
+Results are ordered by score (highest first), then cust_id. Without `text`
+every score is 0. With it, the score is the best trigram similarity of name
+or email to the text, plus 1 when the name starts with it. Similarity
+follows pg_trgm, so both implementations rank the same rows the same way.
+Pages continue from a cursor, "<score>:<cust_id>" of the last row seen.
+"""
+import json
+import re
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+SIMILARITY_THRESHOLD = 0.3  # pg_trgm.similarity_threshold default
+CRITERIA = ("name_prefix", "email", "phone", "city", "text")
+
+_WORD = re.compile(r"[^\W_]+")
+_NON_DIGIT = re.compile(r"\D")
+
+
+def trigrams(value: str) -> Set[str]:
+    """pg_trgm's trigram set: per lower-cased word, padded with two leading and one trailing space."""
+    grams = set()
+    for word in _WORD.findall(value.lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def similarity(a: str, b: str) -> float:
+    ta, tb = trigrams(a), trigrams(b)
+    if not ta or not tb:
+        return 0.0
+    return len(ta & tb) / len(ta | tb)
+
+
+def digits(value: Optional[str]) -> str:
+    return _NON_DIGIT.sub("", value or "")
+
+
+def score(row: Dict, text: Optional[str]) -> float:
+    if not text:
+        return 0.0
+    text = text.lower()
+    name, email = (row.get("name") or "").lower(), (row.get("email") or "").lower()
+    best = max(similarity(name, text), similarity(email, text))
+    return round(best + (1 if name.startswith(text) else 0), 4)
+
+
+def matches(row: Dict, criteria: Dict) -> bool:
+    name, email = (row.get("name") or "").lower(), (row.get("email") or "").lower()
+    if criteria.get("name_prefix") and not name.startswith(criteria["name_prefix"].lower()):
+        return False
+    if criteria.get("email") and email != criteria["email"].lower():
+        return False
+    if criteria.get("phone") and digits(criteria["phone"]) not in digits(row.get("phone")):
+        return False
+    if criteria.get("city") and (row.get("city") or "").lower() != criteria["city"].lower():
+        return False
+    text = (criteria.get("text") or "").lower()
+    if text and not (text in name or text in email
+                     or similarity(name, text) >= SIMILARITY_THRESHOLD
+                     or similarity(email, text) >= SIMILARITY_THRESHOLD):
+        return False
+    return True
+
+
+def parse_cursor(cursor: Optional[str]) -> Tuple[Optional[float], Optional[int]]:
+    if not cursor:
+        return None, None
+    try:
+        s, cust_id = cursor.rsplit(":", 1)
+        return float(s), int(cust_id)
+    except ValueError:
+        raise ValueError(f"invalid cursor: {cursor}") from None
+
+
+def make_cursor(row: Dict) -> str:
+    return f"{float(row['score']):.4f}:{row['cust_id']}"
+
+
+def rank(rows: Iterable[Dict], criteria: Dict, limit: int,
+         after_score: Optional[float] = None, after_id: Optional[int] = None) -> List[Dict]:
+    """Filter, score and order `rows`, returning the page after (after_score, after_id)."""
+    ranked = []
+    for row in rows:
+        if not matches(row, criteria):
+            continue
+        s = score(row, criteria.get("text"))
+        if after_id is not None and not (s < after_score or (s == after_score and row["cust_id"] > after_id)):
+            continue
+        ranked.append(dict(row, score=s))
+    ranked.sort(key=lambda r: (-r["score"], r["cust_id"]))
+    return ranked[:limit]
+
+
+class CustomerIndex:
+    """
+    In-memory customer search over the same rules as search_customers.
+
+    Columns are held per customer in cust_id order. Email and city lookups
+    are dict hits, name prefixes a bisect over sorted names; trigram
+    postings for fuzzy text and partial phone numbers are built on first
+    use. Each query starts from its most selective criterion and checks
+    the others row by row.
+    """
+
+    def __init__(self, rows: Iterable[Dict] = ()):
+        self.cust_id = array("q")
+        self.name: List[str] = []
+        self.email: List[str] = []
+        self.phone: List[Optional[str]] = []
+        self.city: List[Optional[str]] = []
+        for row in sorted(rows, key=lambda r: r["cust_id"]):
+            self.cust_id.append(row["cust_id"])
+            self.name.append(row["name"])
+            self.email.append(row["email"])
+            self.phone.append(row.get("phone"))
+            self.city.append(row.get("city"))
+        self._by_email = {e.lower(): i for i, e in enumerate(self.email)}
+        self._by_city: Dict[str, List[int]] = {}
+        for i, c in enumerate(self.city):
+            if c:
+                self._by_city.setdefault(c.lower(), []).append(i)
+        self._names = sorted((n.lower(), i) for i, n in enumerate(self.name))
+        self._text_grams: Dict[str, array] | None = None
+        self._phone_grams: Dict[str, array] | None = None
+
+    @classmethod
+    def load(cls, dao=None, page_size: int = 5000) -> "CustomerIndex":
+        if dao is None:
+            from src.dao.customer_dao import CustomerDAO
+            dao = CustomerDAO()
+        return cls(dao.iter_all(page_size=page_size))
+
+    @classmethod
+    def from_file(cls, path: str) -> "CustomerIndex":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.loads(line) for line in f if line.strip())
+
+    def save(self, path: str) -> int:
+        """Write the indexed customers as JSON lines, for from_file() offline."""
+        with open(path, "w", encoding="utf-8") as f:
+            for i in range(len(self)):
+                f.write(json.dumps(self._row(i)) + "\n")
+        return len(self)
+
+    def __len__(self) -> int:
+        return len(self.cust_id)
+
+    def _row(self, i: int) -> Dict:
+        return {"cust_id": self.cust_id[i], "name": self.name[i], "email": self.email[i],
+                "phone": self.phone[i], "city": self.city[i]}
+
+    # ------------------ Candidates ------------------
+    def _prefix(self, prefix: str) -> List[int]:
+        prefix = prefix.lower()
+        lo = bisect_left(self._names, (prefix,))
+        hi = bisect_left(self._names, (prefix + "\U0010ffff",))
+        return [i for _, i in self._names[lo:hi]]
+
+    def _phone_candidates(self, wanted: str) -> Optional[Set[int]]:
+        if len(wanted) < 3:
+            return None
+        if self._phone_grams is None:
+            self._phone_grams = self._postings(
+                {d[j:j + 3] for j in range(len(d) - 2)} for d in map(digits, self.phone))
+        found: Optional[Set[int]] = None
+        for gram in {wanted[j:j + 3] for j in range(len(wanted) - 2)}:
+            hits = set(self._phone_grams.get(gram, ()))
+            found = hits if found is None else found & hits
+            if not found:
+                return set()
+        return found
+
+    def _text_candidates(self, text: str) -> Optional[Set[int]]:
+        inner = _inner(text)
+        if not inner:
+            return None  # no word of 3+ characters to narrow a substring match down by; check every row
+        if self._text_grams is None:
+            # substrings of a word share its inner trigrams, so index those too
+            self._text_grams = self._postings(
+                trigrams(n) | trigrams(e) | _inner(n) | _inner(e) for n, e in zip(self.name, self.email))
+        found: Set[int] = set()
+        for gram in trigrams(text) | inner:
+            found.update(self._text_grams.get(gram, ()))
+        return found
+
+    @staticmethod
+    def _postings(gram_sets: Iterable[Set[str]]) -> Dict[str, array]:
+        postings: Dict[str, array] = {}
+        for i, grams in enumerate(gram_sets):
+            for gram in grams:
+                postings.setdefault(gram, array("i")).append(i)
+        return postings
+
+    def _candidates(self, criteria: Dict) -> Iterable[int]:
+        if criteria.get("email"):
+            i = self._by_email.get(criteria["email"].lower())
+            return [] if i is None else [i]
+        options = []
+        if criteria.get("name_prefix"):
+            options.append(self._prefix(criteria["name_prefix"]))
+        if criteria.get("city"):
+            options.append(self._by_city.get(criteria["city"].lower(), []))
+        if criteria.get("phone"):
+            options.append(self._phone_candidates(digits(criteria["phone"])))
+        if criteria.get("text"):
+            options.append(self._text_candidates(criteria["text"].lower()))
+        options = [o for o in options if o is not None]
+        return min(options, key=len) if options else range(len(self))
+
+    # ------------------ Queries ------------------
+    def search(self, criteria: Dict, limit: int = 20, cursor: Optional[str] = None) -> List[Dict]:
+        return rank((self._row(i) for i in self._candidates(criteria)), criteria, limit, *parse_cursor(cursor))
+
+
+def _inner(value: str) -> Set[str]:
+    """Unpadded trigrams inside each word (what a substring of a word must contain)."""
+    grams = set()
+    for word in _WORD.findall(value.lower()):
+        grams.update(word[i:i + 3] for i in range(len(word) - 2))
+    return grams
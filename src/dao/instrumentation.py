@@ -0,0 +1,253 @@
+# src/dao/instrumentation.py
+"""
+Per-query instrumentation for the DAO layer.
+
+When enabled (RETAIL_INSTRUMENT=1, `--profile` on the CLI, or
+`instrumentation.enable()`), every request issued through BaseDAO /
+AsyncBaseDAO is recorded with its table, operation, filters, latency, row
+count and payload size. Latencies go into per-(table, operation)
+histograms, round trips are counted per active scope (service call or CLI
+command), and queries slower than RETAIL_SLOW_QUERY_MS are appended as JSON
+lines to RETAIL_SLOW_QUERY_LOG. Snapshots export as JSON or Prometheus text.
+"""
+import contextvars
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+# upper bounds in seconds, Prometheus-style
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_OPS = {"GET": "select", "HEAD": "select", "PATCH": "update", "DELETE": "delete"}
+
+_scopes: contextvars.ContextVar[Tuple[str, ...]] = contextvars.ContextVar("dao_scopes", default=())
+
+
+def describe(query) -> Tuple[str, str, str]:
+    """(table, operation, filters) for a postgrest or SQLite request builder."""
+    path = str(getattr(query, "path", "") or "")
+    method = str(getattr(query, "http_method", "") or "").upper()
+    params = getattr(query, "params", None)
+    filters = str(params) if params else ""
+    if path.startswith("/rpc/"):
+        return path[len("/rpc/"):], "rpc", json.dumps(getattr(query, "json", None), default=str)[:500]
+    op = _OPS.get(method, "insert")
+    headers = getattr(query, "headers", None) or {}
+    if op == "insert" and "merge-duplicates" in str(headers.get("Prefer", "")):
+        op = "upsert"
+    return path.lstrip("/"), op, filters[:500]
+
+
+class _Histogram:
+    __slots__ = ("counts", "count", "total", "rows", "bytes", "errors", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.rows = 0
+        self.bytes = 0
+        self.errors = 0
+        self.max = 0.0
+
+    def observe(self, seconds: float, rows: int, size: int, error: bool) -> None:
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.count += 1
+        self.total += seconds
+        self.rows += rows
+        self.bytes += size
+        self.errors += error
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q: float) -> float:
+        """Bucket upper bound holding the q-th observation (an upper estimate)."""
+        target, seen = q * self.count, 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= target and n:
+                return min(BUCKETS[i], self.max) if i < len(BUCKETS) else self.max
+        return self.max
+
+
+class Instrumentation:
+    """Process-wide collector; cheap no-op while disabled."""
+
+    def __init__(self):
+        self.enabled = os.getenv("RETAIL_INSTRUMENT", "0").lower() in ("1", "true", "on")
+        self.slow_ms = float(os.getenv("RETAIL_SLOW_QUERY_MS", "200"))
+        self.slow_log = os.getenv("RETAIL_SLOW_QUERY_LOG")
+        self._lock = threading.Lock()
+        self.reset()
+
+    def enable(self, slow_ms: float | None = None, slow_log: str | None = None) -> None:
+        self.enabled = True
+        if slow_ms is not None:
+            self.slow_ms = slow_ms
+        if slow_log is not None:
+            self.slow_log = slow_log
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def reset(self) -> None:
+        with self._lock:
+            self.histograms: Dict[Tuple[str, str], _Histogram] = {}
+            self.scope_round_trips: Dict[str, int] = {}
+            self.slow_queries: List[Dict] = []
+
+    # ------------------ Scopes ------------------
+    @contextmanager
+    def scope(self, name: str):
+        token = _scopes.set(_scopes.get() + (name,))
+        try:
+            yield
+        finally:
+            _scopes.reset(token)
+
+    # ------------------ Recording ------------------
+    def record(self, query, seconds: float, data, error: bool = False) -> None:
+        table, op, filters = describe(query)
+        rows = len(data) if isinstance(data, list) else int(data is not None)
+        size = len(json.dumps(data, default=str)) if data is not None else 0
+        request = getattr(query, "json", None)
+        if request:
+            size += len(json.dumps(request, default=str))
+        scopes = _scopes.get()
+        with self._lock:
+            hist = self.histograms.get((table, op))
+            if hist is None:
+                hist = self.histograms[(table, op)] = _Histogram()
+            hist.observe(seconds, rows, size, error)
+            for s in scopes:
+                self.scope_round_trips[s] = self.scope_round_trips.get(s, 0) + 1
+        if seconds * 1000 >= self.slow_ms:
+            self._log_slow({"ts": time.time(), "table": table, "op": op, "filters": filters,
+                            "ms": round(seconds * 1000, 3), "rows": rows, "bytes": size,
+                            "scope": "/".join(scopes), "error": error})
+
+    def _log_slow(self, entry: Dict) -> None:
+        with self._lock:
+            self.slow_queries.append(entry)
+            del self.slow_queries[:-1000]
+        if self.slow_log:
+            with self._lock, open(self.slow_log, "a", encoding="utf-8") as fh:
+                fh.write(json.dumps(entry) + "\n")
+
+    def execute(self, query):
+        if not self.enabled:
+            return query.execute()
+        start = time.perf_counter()
+        try:
+            resp = query.execute()
+        except Exception:
+            self.record(query, time.perf_counter() - start, None, error=True)
+            raise
+        self.record(query, time.perf_counter() - start, resp.data)
+        return resp
+
+    async def execute_async(self, query):
+        if not self.enabled:
+            return await query.execute()
+        start = time.perf_counter()
+        try:
+            resp = await query.execute()
+        except Exception:
+            self.record(query, time.perf_counter() - start, None, error=True)
+            raise
+        self.record(query, time.perf_counter() - start, resp.data)
+        return resp
+
+    # ------------------ Export ------------------
+    def snapshot(self) -> Dict:
+        with self._lock:
+            queries = [{
+                "table": table, "op": op, "calls": h.count, "errors": h.errors,
+                "total_ms": round(h.total * 1000, 3),
+                "mean_ms": round(h.total * 1000 / h.count, 3) if h.count else 0,
+                "p50_ms": round(h.quantile(0.5) * 1000, 3),
+                "p95_ms": round(h.quantile(0.95) * 1000, 3),
+                "max_ms": round(h.max * 1000, 3),
+                "rows": h.rows, "bytes": h.bytes,
+                "buckets": dict(zip([str(b) for b in BUCKETS] + ["+Inf"], h.counts)),
+            } for (table, op), h in sorted(self.histograms.items())]
+            return {"queries": queries, "round_trips": dict(self.scope_round_trips),
+                    "slow_queries": list(self.slow_queries)}
+
+    def to_prometheus(self) -> str:
+        lines = ["# HELP retail_dao_query_seconds DAO request latency.",
+                 "# TYPE retail_dao_query_seconds histogram"]
+        with self._lock:
+            items = sorted(self.histograms.items())
+            for (table, op), h in items:
+                labels = f'table="{table}",op="{op}"'
+                cumulative = 0
+                for bound, n in zip([str(b) for b in BUCKETS] + ["+Inf"], h.counts):
+                    cumulative += n
+                    lines.append(f'retail_dao_query_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f"retail_dao_query_seconds_sum{{{labels}}} {h.total}")
+                lines.append(f"retail_dao_query_seconds_count{{{labels}}} {h.count}")
+            lines += ["# HELP retail_dao_rows_total Rows returned by DAO requests.",
+                      "# TYPE retail_dao_rows_total counter"]
+            lines += [f'retail_dao_rows_total{{table="{t}",op="{o}"}} {h.rows}' for (t, o), h in items]
+            lines += ["# HELP retail_dao_errors_total Failed DAO requests.",
+                      "# TYPE retail_dao_errors_total counter"]
+            lines += [f'retail_dao_errors_total{{table="{t}",op="{o}"}} {h.errors}' for (t, o), h in items]
+            lines += ["# HELP retail_dao_round_trips_total DAO round trips per scope.",
+                      "# TYPE retail_dao_round_trips_total counter"]
+            lines += [f'retail_dao_round_trips_total{{scope="{s}"}} {n}'
+                      for s, n in sorted(self.scope_round_trips.items())]
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: str, fmt: str | None = None) -> None:
+        fmt = fmt or ("prometheus" if path.endswith((".prom", ".txt")) else "json")
+        with open(path, "w", encoding="utf-8") as fh:
+            if fmt == "prometheus":
+                fh.write(self.to_prometheus())
+            else:
+                json.dump(self.snapshot(), fh, indent=2)
+
+    def report(self) -> str:
+        """Human-readable per-query breakdown for `--profile`."""
+        snap = self.snapshot()
+        lines = [f"{'table':<28} {'op':<7} {'calls':>6} {'total ms':>10} {'p50 ms':>8} {'max ms':>8} {'rows':>7}"]
+        for q in sorted(snap["queries"], key=lambda q: -q["total_ms"]):
+            lines.append(f"{q['table']:<28} {q['op']:<7} {q['calls']:>6} {q['total_ms']:>10.3f} "
+                         f"{q['p50_ms']:>8.3f} {q['max_ms']:>8.3f} {q['rows']:>7}")
+        for scope, n in snap["round_trips"].items():
+            lines.append(f"round trips [{scope}]: {n}")
+        if snap["slow_queries"]:
+            lines.append(f"slow queries (>= {self.slow_ms:g} ms): {len(snap['slow_queries'])}")
+        return "\n".join(lines)
+
+
+instrumentation = Instrumentation()
+
+
+def traced(cls):
+    """Class decorator: run each public method inside an instrumentation scope."""
+    for name, fn in list(vars(cls).items()):
+        if name.startswith("_") or not inspect.isfunction(fn):
+            continue
+        scope = f"{cls.__name__}.{name}"
+        if inspect.isgeneratorfunction(fn):
+            continue  # a context var cannot span the caller's iteration safely
+        if inspect.iscoroutinefunction(fn):
+            async def wrapper(*args, _fn=fn, _scope=scope, **kwargs):
+                with instrumentation.scope(_scope):
+                    return await _fn(*args, **kwargs)
+        else:
+            def wrapper(*args, _fn=fn, _scope=scope, **kwargs):
+                with instrumentation.scope(_scope):
+                    return _fn(*args, **kwargs)
+        setattr(cls, name, functools.wraps(fn)(wrapper))
+    return cls
@@ -0,0 +1,114 @@
+# src/dao/loader.py
+"""
+DataLoader-style batching of id lookups.
+
+A loader wraps a `fetch_many(keys) -> {key: row}` function. Keys asked for
+during one operation are collected, deduplicated and fetched with a single
+call (one `in_` query), and every caller gets its row back in the order it
+asked, None for ids that do not exist.
+
+BatchLoader is the sync form: `prime()` queues ids an operation is about to
+need and the first `load()` / `load_many()` fetches everything queued so
+far in one go; rows stay memoized for the loader's lifetime, so create one
+per operation. AsyncBatchLoader coalesces concurrent `await load(key)`
+calls made in the same event-loop tick, so an asyncio.gather over
+get_by_id sends one request instead of one per id.
+"""
+from typing import Callable, Awaitable, Dict, Hashable, Iterable, List, Optional
+
+DEFAULT_MAX_BATCH = 200
+
+
+class BatchLoader:
+    """Collects ids within one operation and resolves them with batched fetches."""
+
+    def __init__(self, fetch_many: Callable[[List], Dict], max_batch: int = DEFAULT_MAX_BATCH):
+        self.fetch_many = fetch_many
+        self.max_batch = max_batch
+        self._rows: Dict[Hashable, Optional[Dict]] = {}
+        self._pending: Dict[Hashable, None] = {}
+
+    def prime(self, keys: Iterable[Hashable]) -> "BatchLoader":
+        """Queue ids to be fetched with the next load."""
+        for key in keys:
+            if key not in self._rows:
+                self._pending[key] = None
+        return self
+
+    def load(self, key: Hashable) -> Optional[Dict]:
+        return self.load_many([key])[0]
+
+    def load_many(self, keys: Iterable[Hashable]) -> List[Optional[Dict]]:
+        keys = list(keys)
+        self.prime(keys)
+        self.dispatch()
+        return [dict(self._rows[k]) if self._rows.get(k) else None for k in keys]
+
+    def dispatch(self) -> None:
+        pending = list(self._pending)
+        self._pending.clear()
+        for start in range(0, len(pending), self.max_batch):
+            chunk = pending[start:start + self.max_batch]
+            found = self.fetch_many(chunk)
+            for key in chunk:
+                self._rows[key] = found.get(key)
+
+    def clear(self, *keys: Hashable) -> None:
+        """Forget memoized rows (all of them without arguments), e.g. after a write."""
+        if not keys:
+            self._rows.clear()
+        for key in keys:
+            self._rows.pop(key, None)
+
+
+class AsyncBatchLoader:
+    """
+    Coalesces `await load(key)` calls issued in the same event-loop tick.
+
+    asyncio is imported on use: base_dao imports this module, and sync-only
+    commands should not pay for loading asyncio.
+    """
+
+    def __init__(self, fetch_many: Callable[[List], Awaitable[Dict]], max_batch: int = DEFAULT_MAX_BATCH):
+        self.fetch_many = fetch_many
+        self.max_batch = max_batch
+        self._waiting: Dict[Hashable, "asyncio.Future"] = {}
+        self._scheduled = False
+        self._tasks: set = set()
+
+    def load(self, key: Hashable) -> Awaitable[Optional[Dict]]:
+        future = self._waiting.get(key)
+        if future is None:
+            import asyncio
+            loop = asyncio.get_running_loop()
+            future = self._waiting[key] = loop.create_future()
+            if not self._scheduled:
+                # runs after every coroutine already scheduled has had its turn
+                self._scheduled = True
+                loop.call_soon(self._start, loop)
+        return future
+
+    def _start(self, loop) -> None:
+        task = loop.create_task(self._dispatch())
+        self._tasks.add(task)  # the loop only keeps a weak reference
+        task.add_done_callback(self._tasks.discard)
+
+    async def load_many(self, keys: Iterable[Hashable]) -> List[Optional[Dict]]:
+        import asyncio
+        return list(await asyncio.gather(*(self.load(k) for k in keys)))
+
+    async def _dispatch(self) -> None:
+        import asyncio
+        waiting, self._waiting, self._scheduled = self._waiting, {}, False
+        keys = list(waiting)
+        chunks = [keys[i:i + self.max_batch] for i in range(0, len(keys), self.max_batch)]
+        results = await asyncio.gather(*(self.fetch_many(c) for c in chunks), return_exceptions=True)
+        for chunk, found in zip(chunks, results):
+            for key in chunk:
+                future = waiting[key]
+                if future.done():
+                    continue
+                if isinstance(found, BaseException):
+                    future.set_exception(found)
+                else:
+                    future.set_result(found.get(key))
@@ -1,53 +1,112 @@
 # src/dao/order_dao.py
-from typing import Optional, List, Dict
-from src.config import SupabaseConfig
+from typing import Optional, List, Dict, Iterator
+from src.dao.base_dao import BaseDAO, RETURNING, DEFAULT_PAGE_SIZE, IN_CHUNK
+from src.dao.loader import BatchLoader
+from src.dao.cache import invalidate
 
-class OrderDAO:
+class OrderDAO(BaseDAO):
     """Data Access Object for orders and order_items."""
 
-    def __init__(self):
-        self.sb = SupabaseConfig.get_client()
-
     # ------------------ Orders ------------------
     def create_order(self, cust_id: int, total_amount: float) -> Dict:
-        payload = {"cust_id": cust_id, "total_amount": total_amount}
-        self.sb.table("orders").insert(payload).execute()
-        resp = (
-            self.sb.table("orders")
-            .select("*")
-            .eq("cust_id", cust_id)
-            .order("order_id", desc=True)
-            .limit(1)
-            .execute()
-        )
-        return resp.data[0] if resp.data else None
+        rows = self._insert("orders", {"cust_id": cust_id, "total_amount": total_amount})
+        return rows[0] if rows else None
+
+    def place_order(self, cust_id: int, items: List[Dict], warehouses: List[int] | None = None) -> Dict:
+        """
+        Validate stock, reserve it and insert the order with all its items in
+        one server-side call (see sql/001_place_order.sql). Stock is taken
+        from `warehouses` in that order (default: by warehouse priority),
+        then from the central pool (sql/010_warehouse_stock.sql).
+        """
+        lines = [{"prod_id": i["prod_id"], "quantity": i["quantity"]} for i in items]
+        invalidate("products", [l["prod_id"] for l in lines])
+        invalidate("availability", [l["prod_id"] for l in lines])
+        params = {"p_cust_id": cust_id, "p_items": lines}
+        if warehouses is not None:
+            params["p_warehouses"] = warehouses
+        resp = self._execute(self.sb.rpc("place_order", params))
+        return resp.data or {}
+
+    def cancel_order(self, order_id: int) -> Dict:
+        """
+        Cancel a PLACED order, return its stock to where it was taken from and
+        apply its rollup event in one server-side call (sql/011_cancel_order.sql).
+        """
+        result = self._execute(self.sb.rpc("cancel_order", {"p_order_id": order_id})).data or {}
+        prod_ids = [i["prod_id"] for i in result.get("items") or []]
+        invalidate("products", prod_ids)
+        invalidate("availability", prod_ids)
+        return result
+
+    def complete_orders(self, order_ids: List[int]) -> Dict:
+        """
+        Complete the listed orders that are still PLACED and apply their
+        rollup events in one server-side call (sql/012_complete_orders.sql).
+        Returns the completed rows and, for the rest, their current status.
+        """
+        if not order_ids:
+            return {"completed": [], "skipped": []}
+        resp = self._execute(self.sb.rpc("complete_orders", {"p_order_ids": list(order_ids)}))
+        return resp.data or {"completed": [], "skipped": []}
 
     def get_order_by_id(self, order_id: int) -> Optional[Dict]:
-        resp = self.sb.table("orders").select("*").eq("order_id", order_id).limit(1).execute()
-        return resp.data[0] if resp.data else None
+        return self._one(self.sb.table("orders").select("*").eq("order_id", order_id).limit(1))
+
+    def update_order_status(self, order_id: int, status: str,
+                            from_status: str | None = None) -> Optional[Dict]:
+        """Set the status; with `from_status` only if the order is still in it."""
+        match = {"order_id": order_id}
+        if from_status:
+            match["status"] = from_status
+        rows = self._update("orders", {"status": status}, **match)
+        return rows[0] if rows else None
 
-    def update_order_status(self, order_id: int, status: str) -> Optional[Dict]:
-        self.sb.table("orders").update({"status": status}).eq("order_id", order_id).execute()
-        return self.get_order_by_id(order_id)
+    def get_orders_by_ids(self, order_ids: List[int]) -> List[Dict]:
+        if not order_ids:
+            return []
+        return self._all(self.sb.table("orders").select("*").in_("order_id", order_ids))
+
+    def get_many(self, order_ids: List[int]) -> List[Optional[Dict]]:
+        """Orders for `order_ids` in request order (None where missing), in one `in_` query."""
+        found = self._fetch_in("orders", "order_id", order_ids)
+        return [found.get(oid) for oid in order_ids]
+
+    def loader(self) -> BatchLoader:
+        return BatchLoader(lambda ids: self._fetch_in("orders", "order_id", ids), IN_CHUNK)
+
+    def update_status_many(self, order_ids: List[int], status: str,
+                           from_status: str | None = None) -> List[Dict]:
+        """Bulk form of update_order_status; returns only the rows that changed."""
+        if not order_ids:
+            return []
+        q = self.sb.table("orders").update({"status": status}, returning=RETURNING).in_("order_id", order_ids)
+        if from_status:
+            q = q.eq("status", from_status)
+        return self._all(q)
+
+    def iter_orders_by_customer(self, cust_id: int, page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[Dict]:
+        return self._iter_keyset(lambda: self.sb.table("orders").select("*").eq("cust_id", cust_id),
+                                 "order_id", page_size)
 
     def list_orders_by_customer(self, cust_id: int) -> List[Dict]:
-        resp = self.sb.table("orders").select("*").eq("cust_id", cust_id).execute()
-        return resp.data or []
+        return list(self.iter_orders_by_customer(cust_id))
 
     # ------------------ Order Items ------------------
     def create_order_item(self, order_id: int, prod_id: int, quantity: int, price: float) -> Dict:
         payload = {"order_id": order_id, "prod_id": prod_id, "quantity": quantity, "price": price}
-        self.sb.table("order_items").insert(payload).execute()
-        resp = (
-            self.sb.table("order_items")
-            .select("*")
-            .eq("order_id", order_id)
-            .eq("prod_id", prod_id)
-            .limit(1)
-            .execute()
-        )
-        return resp.data[0] if resp.data else None
+        rows = self._insert("order_items", payload)
+        return rows[0] if rows else None
 
     def get_order_items(self, order_id: int) -> List[Dict]:
-        resp = self.sb.table("order_items").select("*").eq("order_id", order_id).execute()
-        return resp.data or []
+        return self._all(self.sb.table("order_items").select("*").eq("order_id", order_id))
+
+    def get_items_by_orders(self, order_ids: List[int]) -> Dict[int, List[Dict]]:
+        """Items of several orders at once, grouped by order_id."""
+        grouped: Dict[int, List[Dict]] = {oid: [] for oid in order_ids}
+        ids = list(grouped)
+        for start in range(0, len(ids), IN_CHUNK):
+            q = self.sb.table("order_items").select("*").in_("order_id", ids[start:start + IN_CHUNK]).order("item_id")
+            for item in self._all(q):
+                grouped[item["order_id"]].append(item)
+        return grouped
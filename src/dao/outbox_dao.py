@@ -0,0 +1,128 @@
+# src/dao/outbox_dao.py
+"""
+Durable local outbox for follow-up writes (refunds, order completion).
+
+Entries live in a SQLite file next to the CLI (RETAIL_OUTBOX_PATH), not in
+the main database, so queuing one never adds a network round trip. Each
+entry has an idempotency key; queuing the same key twice is a no-op.
+
+An entry is staged before the primary write it depends on and released
+once that write has succeeded, or discarded if it failed. A staged entry
+left behind by a crash becomes due after a grace period; the effect's
+handler then checks whether the primary write actually happened.
+"""
+import json
+import os
+import time
+from typing import Dict, List
+
+from src.dao.sqlite_backend import SQLiteDatabase
+
+OUTBOX_SCHEMA = """
+create table if not exists outbox (
+  id           integer primary key autoincrement,
+  key          text unique not null,
+  effect       text not null,
+  payload      text not null,
+  status       text not null default 'staged'
+               check (status in ('staged', 'pending', 'done', 'skipped', 'dead')),
+  attempts     integer not null default 0,
+  next_at      real not null,
+  lease_until  real,
+  last_error   text,
+  created_at   real not null,
+  updated_at   real not null
+);
+create index if not exists outbox_due_idx on outbox (status, next_at);
+"""
+
+
+def default_path() -> str:
+    return os.getenv("RETAIL_OUTBOX_PATH", os.path.expanduser("~/.retail_outbox.db"))
+
+
+class OutboxDAO:
+    """SQLite-backed outbox entries; safe to share across threads and processes."""
+
+    def __init__(self, path: str | None = None, staged_grace: float | None = None):
+        self.db = SQLiteDatabase(path or default_path(), schema=OUTBOX_SCHEMA)
+        self.staged_grace = staged_grace if staged_grace is not None else \
+            float(os.getenv("RETAIL_OUTBOX_STAGED_GRACE", "60"))
+
+    # ------------------ Producers ------------------
+    def stage(self, effect: str, key: str, payload: Dict) -> bool:
+        """Record an effect ahead of its primary write; False if the key already exists."""
+        now = time.time()
+        with self.db.transaction() as tx:
+            return bool(tx.run(
+                "insert or ignore into outbox (key, effect, payload, next_at, created_at, updated_at) "
+                "values (?, ?, ?, ?, ?, ?)",
+                (key, effect, json.dumps(payload), now + self.staged_grace, now, now)))
+
+    def release(self, key: str) -> None:
+        """The primary write succeeded; make the entry due now."""
+        now = time.time()
+        with self.db.transaction() as tx:
+            tx.run("update outbox set status = 'pending', next_at = ?, updated_at = ? "
+                   "where key = ? and status = 'staged'", (now, now, key))
+
+    def discard(self, key: str) -> None:
+        """The primary write failed; the effect must not run."""
+        with self.db.transaction() as tx:
+            tx.run("delete from outbox where key = ? and status = 'staged'", (key,))
+
+    def enqueue(self, effect: str, key: str, payload: Dict) -> bool:
+        created = self.stage(effect, key, payload)
+        self.release(key)
+        return created
+
+    # ------------------ Consumers ------------------
+    def claim(self, limit: int, lease: float = 60.0) -> List[Dict]:
+        """Lease up to `limit` due entries (oldest first) so no other drainer takes them."""
+        now = time.time()
+        with self.db.transaction() as tx:
+            rows = tx.all("select * from outbox where status in ('pending', 'staged') and next_at <= ? "
+                          "and (lease_until is null or lease_until < ?) order by id limit ?",
+                          (now, now, limit))
+            if rows:
+                ids = [r["id"] for r in rows]
+                tx.run(f"update outbox set lease_until = ? where id in ({','.join('?' * len(ids))})",
+                       [now + lease] + ids)
+        for r in rows:
+            r["payload"] = json.loads(r["payload"])
+        return rows
+
+    def finish(self, ids: List[int], status: str = "done", note: str | None = None) -> None:
+        if not ids:
+            return
+        now = time.time()
+        with self.db.transaction() as tx:
+            tx.run(f"update outbox set status = ?, last_error = ?, lease_until = null, updated_at = ? "
+                   f"where id in ({','.join('?' * len(ids))})", [status, note, now] + list(ids))
+
+    def retry(self, entry: Dict, error: str, delay: float, max_attempts: int) -> str:
+        """Schedule another attempt, or dead-letter the entry once attempts run out."""
+        attempts = entry["attempts"] + 1
+        status = "dead" if attempts >= max_attempts else "pending"
+        now = time.time()
+        with self.db.transaction() as tx:
+            tx.run("update outbox set status = ?, attempts = ?, next_at = ?, last_error = ?, "
+                   "lease_until = null, updated_at = ? where id = ?",
+                   (status, attempts, now + delay, error[:1000], now, entry["id"]))
+        return status
+
+    # ------------------ Inspection ------------------
+    def counts(self) -> Dict[str, int]:
+        with self.db.transaction() as tx:
+            return {r["status"]: r["n"] for r in
+                    tx.all("select status, count(*) as n from outbox group by status")}
+
+    def list(self, status: str, limit: int = 100) -> List[Dict]:
+        with self.db.transaction() as tx:
+            rows = tx.all("select * from outbox where status = ? order by id limit ?", (status, limit))
+        for r in rows:
+            r["payload"] = json.loads(r["payload"])
+        return rows
+
+    def close(self) -> None:
+        self.db.close()
@@ -1,29 +1,50 @@
-from typing import Optional, Dict, List
-from src.config import SupabaseConfig
+from typing import Optional, Dict, List, Iterator
+from src.dao.base_dao import BaseDAO, RETURNING, DEFAULT_PAGE_SIZE
 
-class PaymentDAO:
+class PaymentDAO(BaseDAO):
     """Data-Access Object for payments table."""
 
-    def __init__(self):
-        self.sb = SupabaseConfig.get_client()
-
     def create_pending(self, order_id: int, amount: float) -> Optional[Dict]:
         payload = {"order_id": order_id, "amount": amount, "status": "PENDING", "method": None}
-        self.sb.table("payments").insert(payload).execute()
-        resp = self.sb.table("payments").select("*").eq("order_id", order_id).limit(1).execute()
-        return resp.data[0] if resp.data else None
+        rows = self._insert("payments", payload)
+        return rows[0] if rows else None
 
     def get_by_order(self, order_id: int) -> Optional[Dict]:
-        resp = self.sb.table("payments").select("*").eq("order_id", order_id).limit(1).execute()
-        return resp.data[0] if resp.data else None
+        return self._one(self.sb.table("payments").select("*").eq("order_id", order_id).limit(1))
+
+    def get_by_orders(self, order_ids: List[int]) -> List[Dict]:
+        if not order_ids:
+            return []
+        return self._all(self.sb.table("payments").select("*").in_("order_id", order_ids))
+
+    def settle(self, lines: List[Dict]) -> Dict:
+        """
+        Mark PENDING payments PAID and complete their PLACED orders in one
+        transaction (sql/006_settle_payments.sql). Returns the settled order
+        ids and, for the rest, their current payment/order statuses.
+        """
+        if not lines:
+            return {"settled": [], "skipped": []}
+        resp = self._execute(self.sb.rpc("settle_payments", {"p_lines": lines}))
+        return resp.data or {"settled": [], "skipped": []}
 
     def update_status(self, order_id: int, status: str, method: str | None = None) -> Optional[Dict]:
         fields = {"status": status}
         if method:
             fields["method"] = method
-        self.sb.table("payments").update(fields).eq("order_id", order_id).execute()
-        return self.get_by_order(order_id)
+        rows = self._update("payments", fields, order_id=order_id)
+        return rows[0] if rows else None
+
+    def update_status_many(self, order_ids: List[int], status: str) -> List[Dict]:
+        if not order_ids:
+            return []
+        return self._all(self.sb.table("payments").update({"status": status}, returning=RETURNING)
+                         .in_("order_id", order_ids))
+
+    def iter_by_status(self, status: str, page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[Dict]:
+        # one payment per order, so order_id is a stable keyset key
+        return self._iter_keyset(lambda: self.sb.table("payments").select("*").eq("status", status),
+                                 "order_id", page_size)
 
     def list_by_status(self, status: str) -> List[Dict]:
-        resp = self.sb.table("payments").select("*").eq("status", status).execute()
-        return resp.data or []
+        return list(self.iter_by_status(status))
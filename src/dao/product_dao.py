@@ -50,77 +50,242 @@ def list_products(limit: int = 100, category: str | None = None) -> List[Dict]:
     return resp.data or []
  '''
 # src/dao/product_dao.py
-from typing import Optional, List, Dict
-from src.config import SupabaseConfig
+import copy
+from typing import Optional, List, Dict, Iterator, Tuple
+from src.dao.base_dao import CachedDAO, RETURNING_MINIMAL, DEFAULT_PAGE_SIZE
+from src.dao.cache import get_cache, invalidate
+from src.dao import product_fields
 
 
-class ProductDAO:
-    """Data-Access object for products table."""
+class ProductQuery:
+    """
+    Composable catalog query; every filter, the sort and the column list
+    are sent to the backend. Each method returns a new query:
+
+        ProductQuery().categories("pens", "ink").stock_below(5).order_by("stock").select("sku", "stock")
+
+    Pages are ordered by the sort column, then prod_id, and resume from the
+    last row's (sort value, prod_id), so deep pages cost the same as the
+    first (see sql/008_product_catalog_indexes.sql).
+    """
+
+    COLUMNS = product_fields.COLUMNS
+    SORTABLE = product_fields.SORTABLE
 
     def __init__(self):
-        self.sb = SupabaseConfig.get_client()
+        self.filters: List[Tuple[str, str, object]] = []  # (builder method, column, value)
+        self.columns: Tuple[str, ...] = self.COLUMNS
+        self.sort, self.desc = "prod_id", False
+
+    @classmethod
+    def of(cls, categories: List[str] | None = None, min_price: float | None = None,
+           max_price: float | None = None, stock_below: int | None = None, min_stock: int | None = None,
+           name: str | None = None, sku_prefix: str | None = None, sort: str = "prod_id",
+           desc: bool = False, fields: List[str] | None = None) -> "ProductQuery":
+        """Build a query from optional filter values (None means no filter)."""
+        q = (cls().categories(*(categories or []))
+             .price_between(min_price, max_price)
+             .name_contains(name)
+             .sku_prefix(sku_prefix)
+             .order_by(sort, desc))
+        if stock_below is not None:
+            q = q.stock_below(stock_below)
+        if min_stock is not None:
+            q = q.stock_at_least(min_stock)
+        return q.select(*fields) if fields else q
+
+    def _with(self, method: str, col: str, value) -> "ProductQuery":
+        q = copy.copy(self)
+        q.filters = self.filters + [(method, col, value)]
+        return q
+
+    # ------------------ Filters ------------------
+    def categories(self, *names: str) -> "ProductQuery":
+        names = [n for n in names if n]
+        if not names:
+            return self
+        return self._with("eq", "category", names[0]) if len(names) == 1 else self._with("in_", "category", names)
+
+    def price_between(self, low: float | None = None, high: float | None = None) -> "ProductQuery":
+        q = self
+        if low is not None:
+            q = q._with("gte", "price", low)
+        if high is not None:
+            q = q._with("lte", "price", high)
+        return q
+
+    def stock_below(self, threshold: int) -> "ProductQuery":
+        return self._with("lt", "stock", threshold)
+
+    def stock_at_least(self, minimum: int) -> "ProductQuery":
+        return self._with("gte", "stock", minimum)
+
+    def name_contains(self, text: str) -> "ProductQuery":
+        return self._with("ilike", "name", f"%{_like_literal(text)}%") if text else self
+
+    def sku_prefix(self, prefix: str) -> "ProductQuery":
+        return self._with("like", "sku", f"{_like_literal(prefix)}%") if prefix else self
+
+    # ------------------ Shape ------------------
+    def order_by(self, col: str, desc: bool = False) -> "ProductQuery":
+        if col not in self.SORTABLE:
+            raise ValueError(f"cannot sort by {col!r}; choose from {', '.join(self.SORTABLE)}")
+        q = copy.copy(self)
+        q.sort, q.desc = col, desc
+        return q
+
+    def select(self, *cols: str) -> "ProductQuery":
+        unknown = [c for c in cols if c not in self.COLUMNS]
+        if unknown:
+            raise ValueError(f"unknown column(s): {', '.join(unknown)}")
+        q = copy.copy(self)
+        q.columns = tuple(dict.fromkeys(cols)) if cols else self.COLUMNS
+        return q
+
+    # ------------------ Building ------------------
+    def build(self, table, limit: int, after: Tuple | None = None):
+        """Apply this query to `table` (a fresh builder) for one page after `after`."""
+        # prod_id and the sort column are needed to resume the next page
+        cols = dict.fromkeys(("prod_id", self.sort) + self.columns)
+        q = table.select(",".join(cols))
+        for method, col, value in self.filters:
+            q = getattr(q, method)(col, value)
+        if after is not None:
+            value, prod_id = after
+            if self.sort == "prod_id":
+                q = q.lt("prod_id", prod_id) if self.desc else q.gt("prod_id", prod_id)
+            else:
+                op = "lt" if self.desc else "gt"
+                v = _quote(value)
+                q = q.or_(f"{self.sort}.{op}.{v},and({self.sort}.eq.{v},prod_id.gt.{prod_id})")
+        q = q.order(self.sort, desc=self.desc)
+        if self.sort != "prod_id":
+            q = q.order("prod_id", desc=False)
+        return q.limit(limit)
+
+    def cursor_of(self, row: Dict) -> Tuple:
+        return row[self.sort], row["prod_id"]
+
+    def format_cursor(self, row: Dict) -> str:
+        return f"{row[self.sort]}:{row['prod_id']}"
+
+    def parse_cursor(self, cursor: str) -> Tuple:
+        try:
+            value, prod_id = cursor.rsplit(":", 1)
+            convert = {"prod_id": int, "stock": int, "price": float}.get(self.sort, str)
+            return convert(value), int(prod_id)
+        except ValueError:
+            raise ValueError(f"invalid cursor for sort {self.sort!r}: {cursor}") from None
+
+    def project(self, row: Dict) -> Dict:
+        return {c: row[c] for c in self.columns}
+
+
+def _like_literal(value: str) -> str:
+    """
+    Escape LIKE wildcards so `value` only matches itself (backslash is the
+    default LIKE escape, as in like_escape() in sql/007_customer_search.sql).
+    PostgREST turns every `*` into `%` before Postgres sees the pattern, so
+    a literal `*` cannot be expressed and is rejected.
+    """
+    if "*" in value:
+        raise ValueError("'*' is not supported in name or SKU filters")
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _quote(value) -> str:
+    """Quote a value for a PostgREST logic filter (commas and parentheses are reserved)."""
+    if isinstance(value, (int, float)):
+        return str(value)
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+class ProductDAO(CachedDAO):
+    """Data-Access object for products table."""
+
+    table = "products"
+    key = "prod_id"
+    unique = ("sku",)
 
     def create(self, name: str, sku: str, price: float,
                stock: int = 0, category: str | None = None) -> Optional[Dict]:
         payload = {"name": name, "sku": sku, "price": price, "stock": stock}
         if category:
             payload["category"] = category
+        rows = self._insert("products", payload)
+        return self._remember(rows[0]) if rows else None
 
-        self.sb.table("products").insert(payload).execute()
-        resp = (
-            self.sb.table("products")
-            .select("*")
-            .eq("sku", sku)
-            .limit(1)
-            .execute()
-        )
-        return resp.data[0] if resp.data else None
+    def create_many(self, rows: List[Dict]) -> List[Dict]:
+        """Insert several products in one request (a single statement, so all or nothing)."""
+        if not rows:
+            return []
+        return [self._remember(r) for r in self._insert("products", rows)]
+
+    def existing_skus(self, skus: List[str]) -> List[str]:
+        if not skus:
+            return []
+        return [r["sku"] for r in self._all(self.sb.table("products").select("sku").in_("sku", skus))]
 
-    def get_by_id(self, prod_id: int) -> Optional[Dict]:
-        resp = (
+    def upsert_many(self, rows: List[Dict]) -> int:
+        """Insert or update a batch of products keyed by sku in one request."""
+        if not rows:
+            return 0
+        self._upsert("products", rows, on_conflict="sku", returning=RETURNING_MINIMAL)
+        # ids of upserted rows are not returned; drop the whole catalog cache
+        self.cache.clear()
+        get_cache("availability").clear()
+        return len(rows)
+
+    def get_by_id(self, prod_id: int, fresh: bool = False) -> Optional[Dict]:
+        return self._cached_by_id(prod_id, lambda: self._one(
             self.sb.table("products")
             .select("*")
             .eq("prod_id", prod_id)
             .limit(1)
-            .execute()
-        )
-        return resp.data[0] if resp.data else None
+        ), fresh)
 
-    def get_by_sku(self, sku: str) -> Optional[Dict]:
-        resp = (
+    def get_by_sku(self, sku: str, fresh: bool = False) -> Optional[Dict]:
+        return self._cached_by("sku", sku, lambda: self._one(
             self.sb.table("products")
             .select("*")
             .eq("sku", sku)
             .limit(1)
-            .execute()
-        )
-        return resp.data[0] if resp.data else None
+        ), fresh)
 
     def update(self, prod_id: int, fields: Dict) -> Optional[Dict]:
-        self.sb.table("products").update(fields).eq("prod_id", prod_id).execute()
-        resp = (
-            self.sb.table("products")
-            .select("*")
-            .eq("prod_id", prod_id)
-            .limit(1)
-            .execute()
-        )
-        return resp.data[0] if resp.data else None
+        self._forget(prod_id)
+        if "stock" in fields:
+            invalidate("availability", [prod_id])
+        rows = self._update("products", fields, prod_id=prod_id)
+        return self._remember(rows[0]) if rows else None
 
     def delete(self, prod_id: int) -> Optional[Dict]:
-        before = (
-            self.sb.table("products")
-            .select("*")
-            .eq("prod_id", prod_id)
-            .limit(1)
-            .execute()
-        )
-        row = before.data[0] if before.data else None
-        self.sb.table("products").delete().eq("prod_id", prod_id).execute()
-        return row
+        self._forget(prod_id)
+        invalidate("availability", [prod_id])
+        rows = self._delete("products", prod_id=prod_id)
+        return rows[0] if rows else None
 
     def list(self, limit: int = 100, category: str | None = None) -> List[Dict]:
         q = self.sb.table("products").select("*").order("prod_id", desc=False).limit(limit)
         if category:
             q = q.eq("category", category)
-        return q.execute().data or []
+        return self._all(q)
+
+    def query(self, query: ProductQuery, limit: int = 100, after: Tuple | None = None) -> List[Dict]:
+        """One page of `query`, resuming after a (sort value, prod_id) cursor."""
+        return self._all(query.build(self.sb.table("products"), limit, after))
+
+    def iter_query(self, query: ProductQuery, page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[Dict]:
+        after = None
+        while True:
+            page = self.query(query, page_size, after)
+            yield from (query.project(r) for r in page)
+            if len(page) < page_size:
+                return
+            after = query.cursor_of(page[-1])
+
+    def iter_all(self, page_size: int = DEFAULT_PAGE_SIZE, category: str | None = None) -> Iterator[Dict]:
+        def query():
+            q = self.sb.table("products").select("*")
+            return q.eq("category", category) if category else q
+        return self._iter_keyset(query, "prod_id", page_size)
@@ -0,0 +1,5 @@
+# src/dao/product_fields.py
+# Product column names for ProductQuery. Kept free of imports so the CLI
+# parser can offer them without loading the DAO layer.
+COLUMNS = ("prod_id", "name", "sku", "price", "stock", "category")
+SORTABLE = ("prod_id", "name", "sku", "price", "stock")
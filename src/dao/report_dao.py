@@ -0,0 +1,63 @@
+# src/dao/report_dao.py
+from datetime import date, datetime
+from typing import List, Dict, Iterator
+from src.dao.base_dao import BaseDAO
+
+
+class ReportDAO(BaseDAO):
+    """Server-side report aggregations (see sql/003_report_functions.sql)."""
+
+    def top_selling_products(self, limit: int = 5) -> List[Dict]:
+        return self._all(self.sb.rpc("report_top_selling_products", {"p_limit": limit}))
+
+    def orders_by_customer_page(self, min_orders: int = 0, after: int | None = None,
+                                limit: int = 1000) -> List[Dict]:
+        return self._all(self.sb.rpc("report_orders_by_customer",
+                                     {"p_min_orders": min_orders, "p_after": after, "p_limit": limit}))
+
+    def iter_orders_by_customer(self, min_orders: int = 0, page_size: int = 1000) -> Iterator[Dict]:
+        after = None
+        while True:
+            page = self.orders_by_customer_page(min_orders, after, page_size)
+            yield from page
+            if len(page) < page_size:
+                return
+            after = page[-1]["cust_id"]
+
+    def product_velocity_page(self, since: date, after: int | None = None, limit: int = 1000) -> List[Dict]:
+        return self._all(self.sb.rpc("report_product_velocity",
+                                     {"p_since": since.isoformat(), "p_after": after, "p_limit": limit}))
+
+    def iter_product_velocity(self, since: date, page_size: int = 1000) -> Iterator[Dict]:
+        """Units sold since `since` and current stock, for SKUs that sold or are out of stock."""
+        after = None
+        while True:
+            page = self.product_velocity_page(since, after, page_size)
+            yield from page
+            if len(page) < page_size:
+                return
+            after = page[-1]["prod_id"]
+
+    def daily_revenue(self, start: date, end: date) -> List[Dict]:
+        """Pre-aggregated revenue rows for start <= day < end."""
+        return self._all(
+            self.sb.table("sales_daily_revenue")
+            .select("day,revenue,orders_count")
+            .gte("day", start.isoformat())
+            .lt("day", end.isoformat())
+            .order("day", desc=False)
+        )
+
+    def apply_order_event(self, order_id: int, event: str) -> bool:
+        resp = self._execute(self.sb.rpc("rollup_apply_order_event",
+                                         {"p_order_id": order_id, "p_event": event}))
+        return bool(resp.data)
+
+    def refresh(self, full: bool = False, batch_size: int = 10000) -> Dict:
+        resp = self._execute(self.sb.rpc("rollup_refresh", {"p_full": full, "p_batch": batch_size}))
+        return resp.data or {}
+
+    def revenue_between(self, start: datetime, end: datetime) -> float:
+        resp = self._execute(self.sb.rpc("report_revenue_between",
+                                         {"p_from": start.isoformat(), "p_to": end.isoformat()}))
+        return float(resp.data or 0)
@@ -0,0 +1,247 @@
+# src/dao/snapshot.py
+"""
+Column-oriented in-memory snapshot of the catalog and order history.
+
+CatalogSnapshot.load() streams products, customers, orders and order_items
+page by page (keyset) into typed `array` columns: ids, quantities, prices
+and timestamps take 4-8 bytes per value instead of a dict per row, and
+categories are stored as small integer codes into one interned list. The
+report methods run as NumPy vector operations when NumPy is installed and
+fall back to plain loops over the same arrays otherwise.
+"""
+import sys
+import time
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List
+from src.dao.base_dao import BaseDAO, DEFAULT_PAGE_SIZE
+
+try:
+    import numpy as np
+except ImportError:  # optional; the pure-Python paths below cover it
+    np = None
+
+STATUSES = ("PLACED", "COMPLETED", "CANCELLED")
+CANCELLED = STATUSES.index("CANCELLED")
+
+_NP_TYPES = {"q": "int64", "i": "int32", "b": "int8", "d": "float64"}
+
+
+def _epoch(value) -> int:
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    return int(datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp())
+
+
+class SnapshotDAO(BaseDAO):
+    """Keyset-paged column reads for CatalogSnapshot."""
+
+    def iter_products(self, page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[Dict]:
+        return self._iter_keyset(lambda: self.sb.table("products").select("prod_id,name,sku,price,stock,category"),
+                                 "prod_id", page_size)
+
+    def iter_customers(self, page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[Dict]:
+        return self._iter_keyset(lambda: self.sb.table("customers").select("cust_id,name"), "cust_id", page_size)
+
+    def iter_orders(self, page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[Dict]:
+        return self._iter_keyset(
+            lambda: self.sb.table("orders").select("order_id,cust_id,total_amount,status,created_at"),
+            "order_id", page_size)
+
+    def iter_order_items(self, page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[Dict]:
+        return self._iter_keyset(lambda: self.sb.table("order_items").select("item_id,order_id,prod_id,quantity,price"),
+                                 "item_id", page_size)
+
+
+class CatalogSnapshot:
+    """Typed columns for products, customers, orders and order items."""
+
+    def __init__(self):
+        # products, ordered by prod_id
+        self.prod_id = array("q")
+        self.price = array("d")
+        self.stock = array("q")
+        self.category = array("i")  # index into self.categories, -1 for none
+        self.sku: List[str] = []
+        self.name: List[str] = []
+        self.categories: List[str] = []
+        self._category_codes: Dict[str, int] = {}
+        # customers, ordered by cust_id
+        self.cust_id = array("q")
+        self.cust_name: List[str] = []
+        # orders, ordered by order_id
+        self.order_id = array("q")
+        self.order_cust = array("q")
+        self.order_total = array("d")
+        self.order_status = array("b")  # index into STATUSES
+        self.order_created = array("q")  # epoch seconds
+        # order items, in item_id order
+        self.item_order = array("q")
+        self.item_prod = array("q")
+        self.item_qty = array("i")
+        self.item_price = array("d")
+        self.loaded_at: float | None = None
+
+    # ------------------ Loading ------------------
+    @classmethod
+    def load(cls, dao: SnapshotDAO | None = None, page_size: int = DEFAULT_PAGE_SIZE) -> "CatalogSnapshot":
+        dao = dao or SnapshotDAO()
+        snap = cls()
+        for row in dao.iter_products(page_size):
+            snap.add_product(row)
+        for row in dao.iter_customers(page_size):
+            snap.cust_id.append(row["cust_id"])
+            snap.cust_name.append(row["name"])
+        for row in dao.iter_orders(page_size):
+            snap.add_order(row)
+        # items of orders placed while loading would point past the last order
+        last_order = snap.order_id[-1] if snap.order_id else 0
+        for row in dao.iter_order_items(page_size):
+            if row["order_id"] <= last_order:
+                snap.add_item(row)
+        snap.loaded_at = time.time()
+        return snap
+
+    def add_product(self, row: Dict) -> None:
+        self.prod_id.append(row["prod_id"])
+        self.price.append(float(row["price"]))
+        self.stock.append(int(row.get("stock") or 0))
+        self.category.append(self._category_code(row.get("category")))
+        self.sku.append(sys.intern(row["sku"]))
+        self.name.append(row["name"])
+
+    def add_order(self, row: Dict) -> None:
+        self.order_id.append(row["order_id"])
+        self.order_cust.append(row["cust_id"])
+        self.order_total.append(float(row["total_amount"] or 0))
+        self.order_status.append(STATUSES.index(row["status"]))
+        self.order_created.append(_epoch(row["created_at"]))
+
+    def add_item(self, row: Dict) -> None:
+        self.item_order.append(row["order_id"])
+        self.item_prod.append(row["prod_id"])
+        self.item_qty.append(row["quantity"])
+        self.item_price.append(float(row["price"]))
+
+    def _category_code(self, category: str | None) -> int:
+        if not category:
+            return -1
+        code = self._category_codes.get(category)
+        if code is None:
+            code = self._category_codes[category] = len(self.categories)
+            self.categories.append(sys.intern(category))
+        return code
+
+    def nbytes(self) -> Dict[str, int]:
+        """Approximate memory held by each table's columns."""
+        def size(*cols):
+            total = 0
+            for c in cols:
+                if isinstance(c, array):
+                    total += c.itemsize * len(c)
+                else:
+                    total += sys.getsizeof(c) + sum(sys.getsizeof(s) for s in c)
+            return total
+        return {
+            "products": size(self.prod_id, self.price, self.stock, self.category, self.sku, self.name),
+            "customers": size(self.cust_id, self.cust_name),
+            "orders": size(self.order_id, self.order_cust, self.order_total, self.order_status, self.order_created),
+            "order_items": size(self.item_order, self.item_prod, self.item_qty, self.item_price),
+        }
+
+    def counts(self) -> Dict[str, int]:
+        return {"products": len(self.prod_id), "customers": len(self.cust_id),
+                "orders": len(self.order_id), "order_items": len(self.item_order)}
+
+    # ------------------ Reports ------------------
+    @staticmethod
+    def _np(col: array):
+        return np.frombuffer(col, dtype=_NP_TYPES[col.typecode]) if len(col) else np.zeros(0, _NP_TYPES[col.typecode])
+
+    def top_selling_products(self, limit: int = 5) -> List[Dict]:
+        """Units sold per product over non-cancelled orders, highest first."""
+        if np is not None:
+            units = self._units_np()
+            ranked = [int(i) for i in np.lexsort((self._np(self.prod_id), -units))[:limit]]
+        else:
+            units = self._units_py()
+            ranked = sorted(range(len(units)), key=lambda i: (-units[i], self.prod_id[i]))[:limit]
+        return [{"prod_id": self.prod_id[i], "product": self.name[i], "quantity_sold": int(units[i])}
+                for i in ranked if units[i] > 0]
+
+    def _units_np(self):
+        order_ids = self._np(self.order_id)
+        prod_ids = self._np(self.prod_id)
+        items_order = self._np(self.item_order)
+        items_prod = self._np(self.item_prod)
+        qty = self._np(self.item_qty)
+        if not len(items_order) or not len(prod_ids):
+            return np.zeros(len(prod_ids), dtype=np.int64)
+        status = self._np(self.order_status)[np.searchsorted(order_ids, items_order)]
+        live = status != CANCELLED
+        p_idx = np.searchsorted(prod_ids, items_prod[live])
+        p_idx_clipped = np.minimum(p_idx, len(prod_ids) - 1)
+        known = prod_ids[p_idx_clipped] == items_prod[live]
+        return np.bincount(p_idx_clipped[known], weights=qty[live][known],
+                           minlength=len(prod_ids)).astype(np.int64)
+
+    def _units_py(self) -> List[int]:
+        status_of = dict(zip(self.order_id, self.order_status))
+        position = {pid: i for i, pid in enumerate(self.prod_id)}
+        units = [0] * len(self.prod_id)
+        for oid, pid, qty in zip(self.item_order, self.item_prod, self.item_qty):
+            i = position.get(pid)
+            if i is not None and status_of.get(oid) != CANCELLED:
+                units[i] += qty
+        return units
+
+    def revenue_by_window(self, start: datetime, end: datetime, window_seconds: int = 86400) -> List[Dict]:
+        """Revenue and order count of non-cancelled orders per window in [start, end)."""
+        lo, hi = _epoch(start), _epoch(end)
+        n = max(0, -(-(hi - lo) // window_seconds))
+        if np is not None:
+            created = self._np(self.order_created)
+            mask = (created >= lo) & (created < hi) & (self._np(self.order_status) != CANCELLED)
+            bucket = (created[mask] - lo) // window_seconds
+            revenue = np.bincount(bucket, weights=self._np(self.order_total)[mask], minlength=n)
+            orders = np.bincount(bucket, minlength=n)
+        else:
+            revenue, orders = [0.0] * n, [0] * n
+            for ts, total, status in zip(self.order_created, self.order_total, self.order_status):
+                if lo <= ts < hi and status != CANCELLED:
+                    b = (ts - lo) // window_seconds
+                    revenue[b] += total
+                    orders[b] += 1
+        return [{"start": datetime.fromtimestamp(lo + b * window_seconds, timezone.utc).isoformat(),
+                 "revenue": round(float(revenue[b]), 2), "orders": int(orders[b])} for b in range(n)]
+
+    def revenue_between(self, start: datetime, end: datetime) -> float:
+        lo, hi = _epoch(start), _epoch(end)
+        if np is not None:
+            created = self._np(self.order_created)
+            mask = (created >= lo) & (created < hi) & (self._np(self.order_status) != CANCELLED)
+            return float(self._np(self.order_total)[mask].sum())
+        return float(sum(total for ts, total, status in zip(self.order_created, self.order_total, self.order_status)
+                         if lo <= ts < hi and status != CANCELLED))
+
+    def orders_by_customer(self, min_orders: int = 0) -> List[Dict]:
+        """Orders per customer (cancelled included, as in the rollups), by cust_id."""
+        if not self.cust_id:
+            return []
+        if np is not None:
+            cust_ids = self._np(self.cust_id)
+            order_cust = self._np(self.order_cust)
+            idx = np.minimum(np.searchsorted(cust_ids, order_cust), len(cust_ids) - 1)
+            known = cust_ids[idx] == order_cust
+            counts = np.bincount(idx[known], minlength=len(cust_ids))
+        else:
+            counts = [0] * len(self.cust_id)
+            for cust in self.order_cust:
+                i = bisect_left(self.cust_id, cust)
+                if i < len(self.cust_id) and self.cust_id[i] == cust:
+                    counts[i] += 1
+        return [{"cust_id": self.cust_id[i], "customer": self.cust_name[i], "orders_count": int(counts[i])}
+                for i in range(len(self.cust_id)) if counts[i] >= min_orders]
@@ -0,0 +1,878 @@
+# src/dao/sqlite_backend.py
+"""
+In-process SQLite storage backend.
+
+SQLiteClient implements the slice of the supabase client API the DAOs use
+(`table(...)` query builders and `rpc(...)`), backed by a local SQLite
+database with the same tables, indexes and server-side functions as the
+Postgres schema in sql/. Select it with RETAIL_BACKEND=sqlite and
+RETAIL_SQLITE_PATH (default ":memory:").
+"""
+import asyncio
+import random
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+from src.dao import customer_index
+
+SCHEMA = """
+create table if not exists products (
+  prod_id  integer primary key autoincrement,
+  name     text not null,
+  sku      text not null unique,
+  price    real not null,
+  stock    integer not null default 0,
+  category text
+);
+create index if not exists products_category_idx on products (category, prod_id);
+create index if not exists products_price_idx on products (price, prod_id);
+create index if not exists products_stock_idx on products (stock, prod_id);
+create index if not exists products_name_idx on products (name, prod_id);
+
+create table if not exists customers (
+  cust_id integer primary key autoincrement,
+  name    text not null,
+  email   text not null unique,
+  phone   text,
+  city    text
+);
+create index if not exists customers_city_idx on customers (city);
+
+create table if not exists orders (
+  order_id     integer primary key autoincrement,
+  cust_id      integer not null references customers (cust_id),
+  total_amount real not null default 0,
+  status       text not null default 'PLACED',
+  created_at   text not null default (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+create index if not exists orders_cust_id_idx on orders (cust_id);
+create index if not exists orders_created_at_idx on orders (created_at);
+create index if not exists orders_status_idx on orders (status);
+
+create table if not exists order_items (
+  item_id  integer primary key autoincrement,
+  order_id integer not null references orders (order_id),
+  prod_id  integer not null references products (prod_id),
+  quantity integer not null,
+  price    real not null
+);
+create index if not exists order_items_order_id_idx on order_items (order_id);
+create index if not exists order_items_prod_id_idx on order_items (prod_id);
+
+create table if not exists payments (
+  payment_id integer primary key autoincrement,
+  order_id   integer not null unique references orders (order_id),
+  amount     real not null,
+  status     text not null default 'PENDING',
+  method     text,
+  created_at text not null default (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+create index if not exists payments_status_idx on payments (status, order_id);
+
+create table if not exists sales_daily_revenue (
+  day             text primary key,
+  revenue         real not null default 0,
+  orders_count    integer not null default 0,
+  completed_count integer not null default 0
+);
+create table if not exists sales_product_daily (
+  day     text not null,
+  prod_id integer not null,
+  units   integer not null default 0,
+  revenue real not null default 0,
+  primary key (day, prod_id)
+);
+create table if not exists sales_product_totals (
+  prod_id integer primary key,
+  units   integer not null default 0,
+  revenue real not null default 0
+);
+create index if not exists sales_product_totals_units_idx on sales_product_totals (units desc);
+create index if not exists sales_product_daily_prod_day_idx on sales_product_daily (prod_id, day);
+create table if not exists sales_customer_orders (
+  cust_id         integer primary key,
+  orders_count    integer not null default 0,
+  cancelled_count integer not null default 0,
+  completed_count integer not null default 0
+);
+create table if not exists sales_rollup_events (
+  order_id integer not null,
+  event    text not null,
+  primary key (order_id, event)
+);
+create table if not exists rollup_watermark (
+  name          text primary key,
+  last_order_id integer not null default 0,
+  refreshed_at  text
+);
+insert or ignore into rollup_watermark (name) values ('sales');
+
+create table if not exists warehouses (
+  warehouse_id integer primary key autoincrement,
+  code         text not null unique,
+  name         text not null,
+  city         text,
+  priority     integer not null default 100,
+  active       integer not null default 1
+);
+create table if not exists stock_shards (
+  prod_id      integer not null references products (prod_id),
+  warehouse_id integer not null references warehouses (warehouse_id),
+  shard        integer not null,
+  quantity     integer not null default 0 check (quantity >= 0),
+  primary key (prod_id, warehouse_id, shard)
+);
+create table if not exists order_allocations (
+  allocation_id integer primary key autoincrement,
+  order_id      integer not null references orders (order_id),
+  prod_id       integer not null,
+  warehouse_id  integer references warehouses (warehouse_id),
+  shard         integer,
+  quantity      integer not null
+);
+create index if not exists order_allocations_order_idx on order_allocations (order_id);
+"""
+
+_IDENT = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def _ident(name: str) -> str:
+    if not _IDENT.match(name):
+        raise ValueError(f"Invalid identifier: {name!r}")
+    return name
+
+
+_LOGIC_OPS = {"eq": "=", "neq": "!=", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
+
+def _split_terms(text: str) -> List[str]:
+    """Split a PostgREST logic list on top-level commas (outside parentheses and quotes)."""
+    terms, depth, quoted, start, i = [], 0, False, 0, 0
+    while i < len(text):
+        ch = text[i]
+        if quoted and ch == "\\":
+            i += 1
+        elif ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == "(":
+            depth += 1
+        elif not quoted and ch == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and ch == ",":
+            terms.append(text[start:i])
+            start = i + 1
+        i += 1
+    terms.append(text[start:])
+    return [t.strip() for t in terms if t.strip()]
+
+
+def _logic_tree(kind: str, text: str) -> tuple:
+    """SQL for an `or=(...)` / `and(...)` filter tree of col.op.value terms."""
+    parts, params = [], []
+    for term in _split_terms(text):
+        nested = re.fullmatch(r"(and|or)\((.*)\)", term, re.S)
+        if nested:
+            clause, values = _logic_tree(nested.group(1), nested.group(2))
+        else:
+            col, op, value = term.split(".", 2)
+            if value.startswith('"') and value.endswith('"'):
+                value = re.sub(r"\\(.)", r"\1", value[1:-1])
+            if op not in _LOGIC_OPS:
+                raise ValueError(f"unsupported operator in logic filter: {op}")
+            clause, values = f"{_ident(col)} {_LOGIC_OPS[op]} ?", [value]
+        parts.append(clause)
+        params.extend(values)
+    return "(" + f" {kind} ".join(parts) + ")", params
+
+
+def _like_to_glob(pattern: str) -> str:
+    """
+    A PostgREST like pattern as a case-sensitive GLOB: `%` / `*` match any
+    run, `_` one character, backslash escapes; GLOB's own metacharacters
+    are bracketed so they match literally.
+    """
+    out, i = [], 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == "\\" and i + 1 < len(pattern):
+            i += 1
+            ch = pattern[i]
+            out.append(f"[{ch}]" if ch in "*?[" else ch)
+        elif ch in "%*":
+            out.append("*")
+        elif ch == "_":
+            out.append("?")
+        elif ch in "?[":
+            out.append(f"[{ch}]")
+        else:
+            out.append(ch)
+        i += 1
+    return "".join(out)
+
+
+class Response:
+    def __init__(self, data: Any, count: int | None = None):
+        self.data = data
+        self.count = count
+
+
+class SQLiteDatabase:
+    """One SQLite connection shared by every thread, serialized like a single-writer database."""
+
+    def __init__(self, path: str = ":memory:", schema: str = SCHEMA):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("pragma foreign_keys = on")
+        if path != ":memory:":
+            self.conn.execute("pragma journal_mode = wal")
+            self.conn.execute("pragma busy_timeout = 5000")
+        self.lock = threading.RLock()
+        self.conn.executescript(schema)
+
+    @contextmanager
+    def transaction(self):
+        with self.lock:
+            self.conn.execute("begin immediate")
+            try:
+                yield Tx(self.conn)
+            except BaseException:
+                self.conn.execute("rollback")
+                raise
+            self.conn.execute("commit")
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+class Tx:
+    """Small helper over a cursor inside a transaction."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def all(self, sql: str, params=()) -> List[Dict]:
+        return [dict(r) for r in self.conn.execute(sql, params).fetchall()]
+
+    def one(self, sql: str, params=()) -> Optional[Dict]:
+        row = self.conn.execute(sql, params).fetchone()
+        return dict(row) if row else None
+
+    def scalar(self, sql: str, params=()):
+        row = self.conn.execute(sql, params).fetchone()
+        return row[0] if row else None
+
+    def run(self, sql: str, params=()) -> int:
+        return self.conn.execute(sql, params).rowcount
+
+
+# ------------------ Query builder ------------------
+class SQLiteQuery:
+    """Mimics the postgrest request builder for one table."""
+
+    def __init__(self, db: SQLiteDatabase, table: str):
+        self.db = db
+        self.table = _ident(table)
+        self.path = f"/{table}"
+        self.http_method = "GET"
+        self._op = "select"
+        self._columns = "*"
+        self._count = None
+        self._filters: List[tuple] = []
+        self._order: List[tuple] = []
+        self._limit: int | None = None
+        self._offset: int | None = None
+        self._payload: Any = None
+        self._returning = True
+        self._on_conflict: str | None = None
+
+    # -------- operations --------
+    def select(self, *columns: str, count: str | None = None):
+        cols = ",".join(columns) if columns else "*"
+        if cols.strip() != "*":
+            cols = ", ".join(_ident(c.strip()) for c in cols.split(","))
+        self._columns = cols
+        self._count = count
+        return self
+
+    def insert(self, payload, *, count=None, returning="representation", upsert=False,
+               default_to_null=True, on_conflict: str | None = None):
+        self._op, self.http_method, self._payload = "insert", "POST", payload
+        self._returning = str(returning).endswith("representation")
+        if upsert:
+            self._on_conflict = on_conflict or "id"
+        return self
+
+    def upsert(self, payload, *, count=None, returning="representation", ignore_duplicates=False,
+               on_conflict: str = "", default_to_null=True):
+        return self.insert(payload, returning=returning, upsert=True, on_conflict=on_conflict)
+
+    def update(self, fields: Dict, *, count=None, returning="representation"):
+        self._op, self.http_method, self._payload = "update", "PATCH", fields
+        self._returning = str(returning).endswith("representation")
+        return self
+
+    def delete(self, *, count=None, returning="representation"):
+        self._op, self.http_method = "delete", "DELETE"
+        self._returning = str(returning).endswith("representation")
+        return self
+
+    # -------- filters --------
+    def _filter(self, col: str, op: str, value):
+        self._filters.append((_ident(col), op, value))
+        return self
+
+    def eq(self, col, value): return self._filter(col, "=", value)
+    def neq(self, col, value): return self._filter(col, "!=", value)
+    def gt(self, col, value): return self._filter(col, ">", value)
+    def gte(self, col, value): return self._filter(col, ">=", value)
+    def lt(self, col, value): return self._filter(col, "<", value)
+    def lte(self, col, value): return self._filter(col, "<=", value)
+    def in_(self, col, values): return self._filter(col, "in", list(values))
+    def like(self, col, pattern): return self._filter(col, "like", pattern)
+    def ilike(self, col, pattern): return self._filter(col, "ilike", pattern)
+
+    def is_(self, col, value):
+        return self._filter(col, "is", value)
+
+    def or_(self, filters: str, reference_table: str | None = None):
+        self._filters.append(("or", "or", filters))
+        return self
+
+    def order(self, col: str, *, desc: bool = False, nullsfirst: bool = False, **_):
+        self._order.append((_ident(col), desc))
+        return self
+
+    def limit(self, n: int, **_):
+        self._limit = n
+        return self
+
+    def range(self, start: int, end: int, **_):
+        self._offset, self._limit = start, end - start + 1
+        return self
+
+    # -------- introspection (mirrors postgrest builder attributes) --------
+    @property
+    def params(self) -> str:
+        return "&".join(f"or=({value})" if op == "or" else f"{col}={op}.{value}"
+                        for col, op, value in self._filters)
+
+    @property
+    def json(self):
+        return self._payload
+
+    @property
+    def headers(self) -> Dict:
+        return {"Prefer": "resolution=merge-duplicates"} if self._on_conflict else {}
+
+    # -------- execution --------
+    def _where(self) -> tuple[str, list]:
+        clauses, params = [], []
+        for col, op, value in self._filters:
+            if op == "in":
+                if not value:
+                    clauses.append("0")
+                    continue
+                clauses.append(f"{col} in ({','.join('?' * len(value))})")
+                params.extend(value)
+            elif op == "like":
+                clauses.append(f"{col} glob ?")
+                params.append(_like_to_glob(value))
+            elif op == "ilike":
+                clauses.append(f"lower({col}) like lower(?) escape '\\'")
+                params.append(value.replace("*", "%"))
+            elif op == "is":
+                clauses.append(f"{col} is " + ("null" if value in (None, "null") else "not null"))
+            elif op == "or":
+                clause, values = _logic_tree("or", value)
+                clauses.append(clause)
+                params.extend(values)
+            else:
+                clauses.append(f"{col} {op} ?")
+                params.append(value)
+        return (" where " + " and ".join(clauses)) if clauses else "", params
+
+    def _returning_sql(self) -> str:
+        return " returning *" if self._returning else ""
+
+    def execute(self) -> Response:
+        with self.db.transaction() as tx:
+            return getattr(self, f"_run_{self._op}")(tx)
+
+    def _run_select(self, tx: Tx) -> Response:
+        where, params = self._where()
+        sql = f"select {self._columns} from {self.table}{where}"
+        if self._order:
+            sql += " order by " + ", ".join(f"{c} {'desc' if d else 'asc'}" for c, d in self._order)
+        if self._limit is not None:
+            sql += f" limit {int(self._limit)}"
+            if self._offset:
+                sql += f" offset {int(self._offset)}"
+        count = tx.scalar(f"select count(*) from {self.table}{where}", params) if self._count else None
+        return Response(tx.all(sql, params), count)
+
+    def _run_insert(self, tx: Tx) -> Response:
+        rows = self._payload if isinstance(self._payload, list) else [self._payload]
+        data = []
+        for row in rows:
+            cols = [_ident(c) for c in row]
+            sql = (f"insert into {self.table} ({', '.join(cols)}) "
+                   f"values ({', '.join('?' * len(cols))})")
+            if self._on_conflict:
+                target = ", ".join(_ident(c.strip()) for c in self._on_conflict.split(","))
+                updates = ", ".join(f"{c} = excluded.{c}" for c in cols)
+                sql += f" on conflict ({target}) do update set {updates}"
+            data.extend(tx.all(sql + self._returning_sql(), list(row.values())))
+        return Response(data if self._returning else [], len(rows))
+
+    def _run_update(self, tx: Tx) -> Response:
+        where, params = self._where()
+        sets = ", ".join(f"{_ident(c)} = ?" for c in self._payload)
+        sql = f"update {self.table} set {sets}{where}{self._returning_sql()}"
+        return Response(tx.all(sql, list(self._payload.values()) + params))
+
+    def _run_delete(self, tx: Tx) -> Response:
+        where, params = self._where()
+        return Response(tx.all(f"delete from {self.table}{where}{self._returning_sql()}", params))
+
+
+class SQLiteRPC:
+    """Mimics a postgrest rpc() call by dispatching to a Python implementation."""
+
+    def __init__(self, db: SQLiteDatabase, name: str, params: Dict):
+        if name not in RPC_FUNCTIONS:
+            raise ValueError(f"Unknown function: {name}")
+        self.db = db
+        self.name = name
+        self.params = params or {}
+        self.path = f"/rpc/{name}"
+        self.http_method = "POST"
+        self.json = self.params
+
+    def execute(self) -> Response:
+        with self.db.transaction() as tx:
+            return Response(RPC_FUNCTIONS[self.name](tx, **self.params))
+
+
+class SQLiteClient:
+    """Drop-in stand-in for supabase.Client over a local SQLite database."""
+
+    def __init__(self, path: str = ":memory:"):
+        self.db = SQLiteDatabase(path)
+
+    def table(self, name: str) -> SQLiteQuery:
+        return SQLiteQuery(self.db, name)
+
+    def from_(self, name: str) -> SQLiteQuery:
+        return self.table(name)
+
+    def rpc(self, name: str, params: Dict | None = None) -> SQLiteRPC:
+        return SQLiteRPC(self.db, name, params or {})
+
+    def as_async(self) -> "AsyncSQLiteClient":
+        return AsyncSQLiteClient(self)
+
+    def close(self) -> None:
+        self.db.close()
+
+
+class _AsyncQuery:
+    """Wraps a sync builder so `await q.execute()` runs it off the event loop."""
+
+    def __init__(self, query):
+        self._query = query
+
+    def __getattr__(self, name):
+        attr = getattr(self._query, name)
+        if not callable(attr):
+            return attr
+
+        def chained(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            return self if result is self._query else result
+        return chained
+
+    async def execute(self) -> Response:
+        return await asyncio.to_thread(self._query.execute)
+
+
+class AsyncSQLiteClient:
+    """AsyncClient-compatible view over a SQLiteClient."""
+
+    def __init__(self, client: SQLiteClient):
+        self.client = client
+
+    def table(self, name: str) -> _AsyncQuery:
+        return _AsyncQuery(self.client.table(name))
+
+    def rpc(self, name: str, params: Dict | None = None) -> _AsyncQuery:
+        return _AsyncQuery(self.client.rpc(name, params))
+
+
+# ------------------ Server-side functions ------------------
+# Python ports of the functions in sql/, each run inside one transaction.
+RPC_FUNCTIONS: Dict[str, Callable] = {}
+
+
+def rpc(name: str):
+    def register(fn: Callable) -> Callable:
+        RPC_FUNCTIONS[name] = fn
+        return fn
+    return register
+
+
+def _collapse(items: List[Dict]) -> Dict[int, int]:
+    totals: Dict[int, int] = {}
+    for e in items:
+        totals[int(e["prod_id"])] = totals.get(int(e["prod_id"]), 0) + int(e["quantity"])
+    return dict(sorted(totals.items()))
+
+
+def _products(tx: Tx, ids) -> Dict[int, Dict]:
+    ids = list(ids)
+    if not ids:
+        return {}
+    rows = tx.all(f"select * from products where prod_id in ({','.join('?' * len(ids))})", ids)
+    return {r["prod_id"]: r for r in rows}
+
+
+def _located(tx: Tx, ids, warehouses=None) -> Dict[int, Dict[int, int]]:
+    """Units per warehouse (summed over its shards) for each product, optionally only in `warehouses`."""
+    ids = list(ids)
+    if not ids:
+        return {}
+    rows = tx.all("select prod_id, warehouse_id, sum(quantity) as quantity from stock_shards "
+                  f"where prod_id in ({','.join('?' * len(ids))}) group by prod_id, warehouse_id", ids)
+    located: Dict[int, Dict[int, int]] = {}
+    for r in rows:
+        if warehouses is None or r["warehouse_id"] in warehouses:
+            located.setdefault(r["prod_id"], {})[r["warehouse_id"]] = r["quantity"]
+    return located
+
+
+def _failed_lines(req: Dict[int, int], prods: Dict[int, Dict],
+                  located: Dict[int, Dict[int, int]] | None = None) -> List[Dict]:
+    failed = []
+    for pid, qty in req.items():
+        p = prods.get(pid)
+        available = p["stock"] + sum((located or {}).get(pid, {}).values()) if p else 0
+        if p is None or available < qty:
+            failed.append({"prod_id": pid, "name": p["name"] if p else None, "requested": qty,
+                           "available": available,
+                           "reason": "not_found" if p is None else "insufficient_stock"})
+    return failed
+
+
+def _warehouse_preference(tx: Tx, warehouses: Optional[List[int]]) -> List[int]:
+    if warehouses is not None:
+        return [int(w) for w in warehouses]
+    return [r["warehouse_id"] for r in
+            tx.all("select warehouse_id from warehouses where active order by priority, warehouse_id")]
+
+
+@rpc("place_order")
+def place_order(tx: Tx, p_cust_id: int, p_items: List[Dict], p_warehouses: Optional[List[int]] = None) -> Dict:
+    customer = tx.one("select * from customers where cust_id = ?", (p_cust_id,))
+    if not customer:
+        return {"ok": False, "error": "customer_not_found", "failed": []}
+    req = _collapse(p_items)
+    prods = _products(tx, req)
+    pref = _warehouse_preference(tx, p_warehouses)
+    located = _located(tx, req, set(pref))
+    failed = _failed_lines(req, prods, located)
+    if failed:
+        return {"ok": False, "error": "lines_failed", "failed": failed}
+    # one warehouse that can ship the whole order goes first
+    home = next((w for w in pref if all(located.get(pid, {}).get(w, 0) >= qty for pid, qty in req.items())), None)
+    if home is not None:
+        pref = [home] + [w for w in pref if w != home]
+    rank = {w: i for i, w in enumerate(pref)}
+    total = sum(prods[pid]["price"] * qty for pid, qty in req.items())
+    order = tx.one("insert into orders (cust_id, total_amount) values (?, ?) returning *", (p_cust_id, total))
+    items, allocations = [], []
+    for pid, qty in req.items():
+        left = qty
+        shards = [s for s in tx.all("select warehouse_id, shard, quantity from stock_shards "
+                                    "where prod_id = ? and quantity > 0", (pid,))
+                  if s["warehouse_id"] in rank]
+        random.shuffle(shards)
+        shards.sort(key=lambda s: rank[s["warehouse_id"]])
+        for s in shards:
+            if not left:
+                break
+            take = min(left, s["quantity"])
+            tx.run("update stock_shards set quantity = quantity - ? "
+                   "where prod_id = ? and warehouse_id = ? and shard = ?", (take, pid, s["warehouse_id"], s["shard"]))
+            allocations.append({"order_id": order["order_id"], "prod_id": pid, "warehouse_id": s["warehouse_id"],
+                                "shard": s["shard"], "quantity": take})
+            left -= take
+        if left:
+            tx.run("update products set stock = stock - ? where prod_id = ?", (left, pid))
+            allocations.append({"order_id": order["order_id"], "prod_id": pid, "warehouse_id": None,
+                                "shard": None, "quantity": left})
+        items.append(tx.one("insert into order_items (order_id, prod_id, quantity, price) "
+                            "values (?, ?, ?, ?) returning *", (order["order_id"], pid, qty, prods[pid]["price"])))
+    for a in allocations:
+        tx.run("insert into order_allocations (order_id, prod_id, warehouse_id, shard, quantity) "
+               "values (?, ?, ?, ?, ?)", (a["order_id"], a["prod_id"], a["warehouse_id"], a["shard"], a["quantity"]))
+    rollup_apply_order_event(tx, order["order_id"], "CREATED")
+    return {"ok": True, "order": order, "customer": customer, "items": items,
+            "allocations": allocations, "failed": []}
+
+
+@rpc("release_order_stock")
+def release_order_stock(tx: Tx, p_order_id: int) -> Dict:
+    released, to_shards = 0, {}
+    for a in tx.all("select prod_id, warehouse_id, shard, sum(quantity) as quantity from order_allocations "
+                    "where order_id = ? and warehouse_id is not null "
+                    "group by prod_id, warehouse_id, shard", (p_order_id,)):
+        released += tx.run("update stock_shards set quantity = quantity + ? "
+                           "where prod_id = ? and warehouse_id = ? and shard = ?",
+                           (a["quantity"], a["prod_id"], a["warehouse_id"], a["shard"]))
+        to_shards[a["prod_id"]] = to_shards.get(a["prod_id"], 0) + a["quantity"]
+    # the rest (central allocations, or orders placed before allocations existed) goes to products.stock
+    for i in tx.all("select prod_id, sum(quantity) as quantity from order_items "
+                    "where order_id = ? group by prod_id", (p_order_id,)):
+        back = i["quantity"] - to_shards.get(i["prod_id"], 0)
+        if back > 0:
+            tx.run("update products set stock = stock + ? where prod_id = ?", (back, i["prod_id"]))
+    return {"ok": True, "released_shards": released}
+
+
+@rpc("cancel_order")
+def cancel_order(tx: Tx, p_order_id: int) -> Dict:
+    order = tx.one("update orders set status = 'CANCELLED' where order_id = ? and status = 'PLACED' returning *",
+                   (p_order_id,))
+    if not order:
+        current = tx.one("select status from orders where order_id = ?", (p_order_id,))
+        return {"ok": False, "error": "not_placed" if current else "not_found",
+                "status": current["status"] if current else None}
+    release_order_stock(tx, p_order_id)
+    rollup_apply_order_event(tx, p_order_id, "CANCELLED")
+    return {"ok": True, "order": order,
+            "items": tx.all("select * from order_items where order_id = ? order by item_id", (p_order_id,))}
+
+
+@rpc("assign_stock")
+def assign_stock(tx: Tx, p_prod_id: int, p_warehouse_id: int, p_quantity: int,
+                 p_shards: int = 1, p_from_central: bool = True) -> Dict:
+    if p_quantity <= 0 or p_shards <= 0:
+        return {"ok": False, "error": "invalid_quantity"}
+    if not tx.one("select 1 from warehouses where warehouse_id = ?", (p_warehouse_id,)):
+        return {"ok": False, "error": "warehouse_not_found"}
+    if p_from_central:
+        if not tx.run("update products set stock = stock - ? where prod_id = ? and stock >= ?",
+                      (p_quantity, p_prod_id, p_quantity)):
+            return {"ok": False, "error": "insufficient_central_stock"}
+    elif not tx.one("select 1 from products where prod_id = ?", (p_prod_id,)):
+        return {"ok": False, "error": "product_not_found"}
+    shards = max(p_shards, tx.scalar("select count(*) from stock_shards where prod_id = ? and warehouse_id = ?",
+                                     (p_prod_id, p_warehouse_id)))
+    for shard in range(shards):
+        qty = p_quantity // shards + (1 if shard < p_quantity % shards else 0)
+        tx.run("insert into stock_shards (prod_id, warehouse_id, shard, quantity) values (?, ?, ?, ?) "
+               "on conflict (prod_id, warehouse_id, shard) do update set quantity = quantity + excluded.quantity",
+               (p_prod_id, p_warehouse_id, shard, qty))
+    return {"ok": True, "shards": shards}
+
+
+@rpc("product_availability")
+def product_availability(tx: Tx, p_ids: List[int]) -> List[Dict]:
+    prods = _products(tx, p_ids)
+    located = _located(tx, prods)
+    rows = []
+    for pid in sorted(prods):
+        by_warehouse = located.get(pid, {})
+        rows.append({"prod_id": pid, "central": prods[pid]["stock"], "located": sum(by_warehouse.values()),
+                     "total": prods[pid]["stock"] + sum(by_warehouse.values()),
+                     "warehouses": {str(w): q for w, q in sorted(by_warehouse.items())}})
+    return rows
+
+
+@rpc("reserve_stock")
+def reserve_stock(tx: Tx, p_items: List[Dict]) -> Dict:
+    req = _collapse(p_items)
+    failed = _failed_lines(req, _products(tx, req))
+    if failed:
+        return {"ok": False, "failed": failed}
+    for pid, qty in req.items():
+        tx.run("update products set stock = stock - ? where prod_id = ? and stock >= ?", (qty, pid, qty))
+    return {"ok": True, "failed": []}
+
+
+@rpc("release_stock")
+def release_stock(tx: Tx, p_items: List[Dict]) -> Dict:
+    released = 0
+    for pid, qty in _collapse(p_items).items():
+        released += tx.run("update products set stock = stock + ? where prod_id = ?", (qty, pid))
+    return {"ok": True, "released": released}
+
+
+@rpc("report_top_selling_products")
+def report_top_selling_products(tx: Tx, p_limit: int = 5) -> List[Dict]:
+    return tx.all("select t.prod_id, p.name as product, t.units as quantity_sold "
+                  "from sales_product_totals t join products p on p.prod_id = t.prod_id "
+                  "where t.units > 0 order by t.units desc, t.prod_id limit ?", (p_limit,))
+
+
+@rpc("report_revenue_between")
+def report_revenue_between(tx: Tx, p_from: str, p_to: str) -> float:
+    return tx.scalar("select coalesce(sum(total_amount), 0) from orders "
+                     "where created_at >= ? and created_at < ? and status <> 'CANCELLED'", (p_from, p_to))
+
+
+@rpc("report_orders_by_customer")
+def report_orders_by_customer(tx: Tx, p_min_orders: int = 0, p_after: int | None = None,
+                              p_limit: int = 1000) -> List[Dict]:
+    return tx.all("select c.cust_id, c.name as customer, coalesce(s.orders_count, 0) as orders_count "
+                  "from customers c left join sales_customer_orders s on s.cust_id = c.cust_id "
+                  "where (? is null or c.cust_id > ?) and coalesce(s.orders_count, 0) >= ? "
+                  "order by c.cust_id limit ?", (p_after, p_after, p_min_orders, p_limit))
+
+
+@rpc("report_product_velocity")
+def report_product_velocity(tx: Tx, p_since: str, p_after: int | None = None,
+                            p_limit: int = 1000) -> List[Dict]:
+    return tx.all("select prod_id, sku, name, available as stock, units from (select p.prod_id, p.sku, p.name, "
+                  "p.stock + coalesce((select sum(s.quantity) from stock_shards s "
+                  "                    where s.prod_id = p.prod_id), 0) as available, "
+                  "coalesce((select sum(d.units) from sales_product_daily d "
+                  "          where d.prod_id = p.prod_id and d.day >= ?), 0) as units "
+                  "from products p where ? is null or p.prod_id > ?) v "
+                  "where units > 0 or available <= 0 order by prod_id limit ?", (p_since, p_after, p_after, p_limit))
+
+
+@rpc("rollup_apply_order_event")
+def rollup_apply_order_event(tx: Tx, p_order_id: int, p_event: str) -> bool:
+    if not tx.run("insert or ignore into sales_rollup_events (order_id, event) values (?, ?)",
+                  (p_order_id, p_event)):
+        return False
+    order = tx.one("select * from orders where order_id = ?", (p_order_id,))
+    if not order:
+        return False
+    day = order["created_at"][:10]
+
+    if p_event == "COMPLETED":
+        tx.run("insert into sales_daily_revenue (day, completed_count) values (?, 1) "
+               "on conflict (day) do update set completed_count = completed_count + 1", (day,))
+        tx.run("insert into sales_customer_orders (cust_id, completed_count) values (?, 1) "
+               "on conflict (cust_id) do update set completed_count = completed_count + 1", (order["cust_id"],))
+        return True
+
+    sign = {"CREATED": 1, "CANCELLED": -1}.get(p_event)
+    if sign is None:
+        raise ValueError(f"unknown rollup event {p_event}")
+    tx.run("insert into sales_daily_revenue (day, revenue, orders_count) values (?, ?, ?) "
+           "on conflict (day) do update set revenue = revenue + excluded.revenue, "
+           "orders_count = orders_count + excluded.orders_count",
+           (day, sign * order["total_amount"], sign))
+    lines = tx.all("select prod_id, sum(quantity) as units, sum(quantity * price) as revenue "
+                   "from order_items where order_id = ? group by prod_id", (p_order_id,))
+    for line in lines:
+        tx.run("insert into sales_product_daily (day, prod_id, units, revenue) values (?, ?, ?, ?) "
+               "on conflict (day, prod_id) do update set units = units + excluded.units, "
+               "revenue = revenue + excluded.revenue",
+               (day, line["prod_id"], sign * line["units"], sign * line["revenue"]))
+        tx.run("insert into sales_product_totals (prod_id, units, revenue) values (?, ?, ?) "
+               "on conflict (prod_id) do update set units = units + excluded.units, "
+               "revenue = revenue + excluded.revenue",
+               (line["prod_id"], sign * line["units"], sign * line["revenue"]))
+    column = "orders_count" if sign == 1 else "cancelled_count"
+    tx.run(f"insert into sales_customer_orders (cust_id, {column}) values (?, 1) "
+           f"on conflict (cust_id) do update set {column} = {column} + 1", (order["cust_id"],))
+    return True
+
+
+@rpc("rollup_refresh")
+def rollup_refresh(tx: Tx, p_full: bool = False, p_batch: int = 10000) -> Dict:
+    now = "strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')"
+    if p_full:
+        for table in ("sales_daily_revenue", "sales_product_daily", "sales_product_totals",
+                      "sales_customer_orders", "sales_rollup_events"):
+            tx.run(f"delete from {table}")
+        tx.run("insert into sales_daily_revenue (day, revenue, orders_count, completed_count) "
+               "select substr(created_at, 1, 10), "
+               "coalesce(sum(case when status <> 'CANCELLED' then total_amount end), 0), "
+               "sum(status <> 'CANCELLED'), sum(status = 'COMPLETED') from orders group by 1")
+        tx.run("insert into sales_product_daily (day, prod_id, units, revenue) "
+               "select substr(o.created_at, 1, 10), oi.prod_id, sum(oi.quantity), sum(oi.quantity * oi.price) "
+               "from order_items oi join orders o on o.order_id = oi.order_id "
+               "where o.status <> 'CANCELLED' group by 1, 2")
+        tx.run("insert into sales_product_totals (prod_id, units, revenue) "
+               "select prod_id, sum(units), sum(revenue) from sales_product_daily group by prod_id")
+        tx.run("insert into sales_customer_orders (cust_id, orders_count, cancelled_count, completed_count) "
+               "select cust_id, count(*), sum(status = 'CANCELLED'), sum(status = 'COMPLETED') "
+               "from orders group by cust_id")
+        tx.run("insert into sales_rollup_events (order_id, event) "
+               "select order_id, 'CREATED' from orders "
+               "union all select order_id, 'CANCELLED' from orders where status = 'CANCELLED' "
+               "union all select order_id, 'COMPLETED' from orders where status = 'COMPLETED'")
+        watermark = tx.scalar("select coalesce(max(order_id), 0) from orders")
+        tx.run(f"update rollup_watermark set last_order_id = ?, refreshed_at = {now} where name = 'sales'",
+               (watermark,))
+        return {"mode": "full", "watermark": watermark, "remaining": False}
+
+    watermark = tx.scalar("select last_order_id from rollup_watermark where name = 'sales'")
+    applied = 0
+    for r in tx.all("select order_id, status from orders where order_id > ? order by order_id limit ?",
+                    (watermark, p_batch)):
+        applied += rollup_apply_order_event(tx, r["order_id"], "CREATED")
+        if r["status"] in ("CANCELLED", "COMPLETED"):
+            applied += rollup_apply_order_event(tx, r["order_id"], r["status"])
+        watermark = r["order_id"]
+    tx.run(f"update rollup_watermark set last_order_id = ?, refreshed_at = {now} where name = 'sales'",
+           (watermark,))
+    remaining = tx.scalar("select exists (select 1 from orders where order_id > ?)", (watermark,))
+    return {"mode": "incremental", "applied": applied, "watermark": watermark, "remaining": bool(remaining)}
+
+
+@rpc("settle_payments")
+def settle_payments(tx: Tx, p_lines: List[Dict]) -> Dict:
+    methods = {int(e["order_id"]): e.get("method") for e in p_lines}
+    ids = sorted(methods)
+    marks = ",".join("?" * len(ids))
+    rows = tx.all(f"select o.order_id, o.status as order_status, p.status as payment_status "
+                  f"from orders o left join payments p on p.order_id = o.order_id "
+                  f"where o.order_id in ({marks})", ids) if ids else []
+    found = {r["order_id"]: r for r in rows}
+    settled, skipped = [], []
+    for oid in ids:
+        r = found.get(oid)
+        if r and r["payment_status"] == "PENDING" and r["order_status"] == "PLACED":
+            tx.run("update payments set status = 'PAID', method = ? where order_id = ?", (methods[oid], oid))
+            tx.run("update orders set status = 'COMPLETED' where order_id = ?", (oid,))
+            rollup_apply_order_event(tx, oid, "COMPLETED")
+            settled.append(oid)
+        else:
+            skipped.append({"order_id": oid, "payment_status": r["payment_status"] if r else None,
+                            "order_status": r["order_status"] if r else None})
+    return {"settled": settled, "skipped": skipped}
+
+
+@rpc("complete_orders")
+def complete_orders(tx: Tx, p_order_ids: List[int]) -> Dict:
+    completed, skipped = [], []
+    for oid in sorted(set(int(i) for i in p_order_ids)):
+        order = tx.one("update orders set status = 'COMPLETED' where order_id = ? and status = 'PLACED' "
+                       "returning *", (oid,))
+        if order:
+            rollup_apply_order_event(tx, oid, "COMPLETED")
+            completed.append(order)
+        else:
+            current = tx.one("select status from orders where order_id = ?", (oid,))
+            skipped.append({"order_id": oid, "status": current["status"] if current else None})
+    return {"completed": completed, "skipped": skipped}
+
+
+@rpc("search_customers")
+def search_customers(tx: Tx, p_name_prefix: str | None = None, p_email: str | None = None,
+                     p_phone: str | None = None, p_city: str | None = None, p_text: str | None = None,
+                     p_after_score: float | None = None, p_after_id: int | None = None,
+                     p_limit: int = 20) -> List[Dict]:
+    criteria = {"name_prefix": p_name_prefix, "email": p_email, "phone": p_phone,
+                "city": p_city, "text": p_text}
+    rows = tx.all("select cust_id, name, email, phone, city from customers order by cust_id")
+    return customer_index.rank(rows, criteria, p_limit, p_after_score, p_after_id)
@@ -0,0 +1,75 @@
+# src/dao/stock_dao.py
+from typing import List, Dict
+from src.dao.base_dao import BaseDAO, IN_CHUNK
+from src.dao.cache import MISS, get_cache, invalidate
+
+
+class StockDAO(BaseDAO):
+    """
+    Atomic stock primitives backed by sql/002_stock_reservation.sql, and
+    warehouse stock (sql/010_warehouse_stock.sql).
+
+    reserve / release work on products.stock, the central pool that has
+    not been assigned to a warehouse.
+    """
+
+    def reserve(self, items: List[Dict]) -> Dict:
+        """Decrement every line only if stock >= quantity; all-or-nothing."""
+        self.invalidate([i["prod_id"] for i in items])
+        resp = self._execute(self.sb.rpc("reserve_stock", {"p_items": items}))
+        return resp.data or {}
+
+    def release(self, items: List[Dict]) -> Dict:
+        self.invalidate([i["prod_id"] for i in items])
+        resp = self._execute(self.sb.rpc("release_stock", {"p_items": items}))
+        return resp.data or {}
+
+    @staticmethod
+    def invalidate(prod_ids: List[int]) -> None:
+        invalidate("products", prod_ids)
+        invalidate("availability", prod_ids)
+
+    # ------------------ Warehouses ------------------
+    def warehouses(self, active_only: bool = True) -> List[Dict]:
+        q = self.sb.table("warehouses").select("*")
+        if active_only:
+            q = q.eq("active", True)
+        return self._all(q.order("priority").order("warehouse_id"))
+
+    def add_warehouse(self, code: str, name: str, city: str | None = None, priority: int = 100) -> Dict:
+        rows = self._insert("warehouses", {"code": code, "name": name, "city": city, "priority": priority})
+        return rows[0] if rows else None
+
+    def get_warehouse_by_code(self, code: str) -> Dict | None:
+        return self._one(self.sb.table("warehouses").select("*").eq("code", code).limit(1))
+
+    def assign(self, prod_id: int, warehouse_id: int, quantity: int, shards: int = 1,
+               from_central: bool = True) -> Dict:
+        """Move `quantity` units of a product into a warehouse, spread over `shards` counters."""
+        self.invalidate([prod_id])
+        resp = self._execute(self.sb.rpc("assign_stock", {
+            "p_prod_id": prod_id, "p_warehouse_id": warehouse_id, "p_quantity": quantity,
+            "p_shards": shards, "p_from_central": from_central}))
+        return resp.data or {}
+
+    # ------------------ Availability ------------------
+    def availability(self, prod_ids: List[int], fresh: bool = False) -> Dict[int, Dict]:
+        """
+        Central, located and total units per product, with a per-warehouse
+        breakdown; one aggregate call per IN_CHUNK ids that are not cached.
+        """
+        cache = get_cache("availability")
+        found: Dict[int, Dict] = {}
+        missing = []
+        for pid in dict.fromkeys(prod_ids):
+            row = MISS if fresh else cache.get(("id", pid))
+            if row is MISS:
+                missing.append(pid)
+            else:
+                found[pid] = row
+        for start in range(0, len(missing), IN_CHUNK):
+            resp = self._execute(self.sb.rpc("product_availability", {"p_ids": missing[start:start + IN_CHUNK]}))
+            for row in resp.data or []:
+                cache.set(("id", row["prod_id"]), row)
+                found[row["prod_id"]] = row
+        return found
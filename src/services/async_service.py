@@ -0,0 +1,189 @@
+# src/services/async_service.py
+"""
+asyncio versions of ProductService, OrderService and ReportService.
+
+Business rules and error types are shared with the sync services;
+independent fetches run concurrently with asyncio.gather, bounded by the
+DAO layer's concurrency limit (RETAIL_ASYNC_CONCURRENCY).
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict
+from src.dao.async_dao import (AsyncProductDAO, AsyncCustomerDAO, AsyncOrderDAO,
+                               AsyncStockDAO, AsyncReportDAO)
+from src.dao.instrumentation import traced
+from src.services.customer_service import CustomerError
+from src.services.product_service import ProductService, ProductError
+from src.services.order_service import (OrderError, OrderEvents, check_items, raise_place_error,
+                                        raise_transition_error)
+from src.services.stock_service import StockService
+
+
+def _midnight(day) -> datetime:
+    return datetime.combine(day, datetime.min.time(), timezone.utc)
+
+
+@traced
+class AsyncProductService:
+    """Async business logic for products."""
+
+    def __init__(self, repo: AsyncProductDAO):
+        self.repo = repo
+
+    @classmethod
+    async def create(cls):
+        return cls(await AsyncProductDAO.create())
+
+    async def add(self, name: str, sku: str, price: float,
+                  stock: int = 0, category: str | None = None) -> Dict:
+        ProductService._check_price(price)
+        if await self.repo.get_by_sku(sku):
+            raise ProductError(f"SKU already exists: {sku}")
+        return await self.repo.insert(name, sku, price, stock, category)
+
+    async def list(self, limit: int = 100, category: str | None = None) -> List[Dict]:
+        return await self.repo.list(limit, category)
+
+    async def update(self, prod_id: int, **fields) -> Dict:
+        if "price" in fields:
+            ProductService._check_price(fields["price"])
+        if not fields:
+            return await self.get_by_id(prod_id)
+        updated = await self.repo.update(prod_id, fields)
+        if not updated:
+            raise ProductError("Product not found")
+        return updated
+
+    async def get_by_id(self, prod_id: int, fresh: bool = False) -> Dict:
+        prod = await self.repo.get_by_id(prod_id, fresh=fresh)
+        if not prod:
+            raise ProductError(f"Product not found: {prod_id}")
+        return prod
+
+    async def get_many(self, prod_ids: List[int]) -> List[Dict]:
+        return list(await asyncio.gather(*(self.get_by_id(pid) for pid in prod_ids)))
+
+
+@traced
+class AsyncOrderService(OrderEvents):
+    """
+    Async business logic for orders. Allocation strategies and the
+    warehouse cache come from `stock_service`; listeners are called as in
+    OrderService.
+    """
+
+    def __init__(self, repo: AsyncOrderDAO, customers: AsyncCustomerDAO,
+                 stock: AsyncStockDAO, reports: AsyncReportDAO, outbox=None,
+                 stock_service: StockService | None = None):
+        self.repo = repo
+        self.customers = customers
+        self.stock = stock
+        self.report_dao = reports
+        self.stock_service = stock_service or StockService()
+        self._init_events(outbox)
+
+    @classmethod
+    async def create(cls):
+        return cls(*await asyncio.gather(AsyncOrderDAO.create(), AsyncCustomerDAO.create(),
+                                         AsyncStockDAO.create(), AsyncReportDAO.create()))
+
+    async def create_order(self, cust_id: int, items: List[Dict], allocation: str | None = None) -> Dict:
+        # see OrderService.create_order
+        check_items(items)
+
+        result = await self.repo.place_order(cust_id, items, await self._warehouse_preference(cust_id, allocation))
+        if not result.get("ok"):
+            raise_place_error(cust_id, result)
+
+        # place_order applied the CREATED rollup event in the same transaction
+        self._notify_listeners(result["order"]["order_id"], "CREATED", result["items"])
+        return {"order": result["order"], "customer": result["customer"], "items": result["items"],
+                "allocations": result.get("allocations") or []}
+
+    async def _warehouse_preference(self, cust_id: int, allocation: str | None) -> List[int] | None:
+        strategy = self.stock_service.allocation(allocation)
+        warehouses = self.stock_service.cached_warehouses()
+        if warehouses is None:
+            warehouses = self.stock_service.remember_warehouses(await self.stock.warehouses())
+        if not warehouses:
+            return None  # everything is in the central pool
+        customer = None
+        if strategy.uses_customer:
+            customer = await self.customers.get_by_id(cust_id)
+            if not customer:
+                raise CustomerError(f"Customer not found: {cust_id}")
+        return strategy.rank(warehouses, customer)
+
+    async def get_order_details(self, order_id: int) -> Dict:
+        order, items = await asyncio.gather(self.repo.get_order_by_id(order_id),
+                                            self.repo.get_order_items(order_id))
+        if not order:
+            raise OrderError("Order not found")
+        customer = await self.customers.get_by_id(order["cust_id"])
+        if not customer:
+            raise CustomerError(f"Customer not found: {order['cust_id']}")
+        return {"order": order, "customer": customer, "items": items}
+
+    async def list_orders_by_customer(self, cust_id: int) -> List[Dict]:
+        return await self.repo.list_orders_by_customer(cust_id)
+
+    async def cancel_order(self, order_id: int) -> Dict:
+        # see OrderService.cancel_order
+        result = await self.repo.cancel_order(order_id)
+        if not result.get("ok"):
+            raise_transition_error(result.get("status"), "cancelled")
+        self._notify_listeners(order_id, "CANCELLED", result["items"])
+        return result["order"]
+
+    async def complete_order(self, order_id: int) -> Dict:
+        # see OrderService.complete_order
+        result = await self.repo.complete_orders([order_id])
+        if not result.get("completed"):
+            raise_transition_error((result.get("skipped") or [{}])[0].get("status"), "completed")
+        self._notify_listeners(order_id, "COMPLETED", None)
+        return result["completed"][0]
+
+
+@traced
+class AsyncReportService:
+    """Async sales reports."""
+
+    def __init__(self, report_dao: AsyncReportDAO):
+        self.report_dao = report_dao
+
+    @classmethod
+    async def create(cls):
+        return cls(await AsyncReportDAO.create())
+
+    async def top_selling_products(self, top_n: int = 5) -> List[Dict]:
+        rows = await self.report_dao.top_selling_products(top_n)
+        return [{"product": r["product"], "quantity_sold": r["quantity_sold"]} for r in rows]
+
+    async def total_revenue_last_month(self) -> float:
+        # see ReportService.total_revenue_last_month
+        now = datetime.now(timezone.utc)
+        start = now - timedelta(days=30)
+        first, today = start.date() + timedelta(days=1), now.date()
+        rows, head, tail = await asyncio.gather(
+            self.report_dao.daily_revenue(first, today),
+            self.report_dao.revenue_between(start, _midnight(first)),
+            self.report_dao.revenue_between(_midnight(today), now))
+        return float(sum(float(r["revenue"]) for r in rows)) + head + tail
+
+    async def orders_by_customer(self, min_orders: int = 0, page_size: int = 1000) -> List[Dict]:
+        result, after = [], None
+        while True:
+            page = await self.report_dao.orders_by_customer_page(min_orders, after, page_size)
+            result.extend({"cust_id": r["cust_id"], "customer": r["customer"],
+                           "orders_count": r["orders_count"]} for r in page)
+            if len(page) < page_size:
+                return result
+            after = page[-1]["cust_id"]
+
+    async def frequent_customers(self, min_orders: int = 2) -> List[Dict]:
+        return await self.orders_by_customer(min_orders=min_orders + 1)
+
+    async def summary(self, top_n: int = 5) -> Dict:
+        top, revenue = await asyncio.gather(self.top_selling_products(top_n),
+                                            self.total_revenue_last_month())
+        return {"top_selling_products": top, "revenue_last_30_days": revenue}
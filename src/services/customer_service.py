@@ -1,43 +1,122 @@
-from typing import List, Dict
+from typing import List, Dict, Iterator
 from src.dao.customer_dao import CustomerDAO
+from src.dao.customer_index import CRITERIA, CustomerIndex, digits, make_cursor, parse_cursor
+from src.dao.instrumentation import traced
 
 class CustomerError(Exception):
     pass
 
+@traced
 class CustomerService:
     """Business logic for customers."""
 
-    def __init__(self):
+    def __init__(self, index: CustomerIndex | None = None):
         self.repo = CustomerDAO()
+        # when set, search_page(local=True) answers from memory instead of the database
+        self.index = index
+
+    def load_index(self, path: str | None = None, page_size: int = 5000) -> CustomerIndex:
+        """Build the local search index from the database, or from a file written by CustomerIndex.save."""
+        self.index = CustomerIndex.from_file(path) if path else CustomerIndex.load(self.repo, page_size)
+        return self.index
 
     def add(self, name: str, email: str, phone: str, city: str | None = None) -> Dict:
-        if self.repo.get_by_email(email):
+        if self.repo.get_by_email(email, fresh=True):
             raise CustomerError(f"Email already exists: {email}")
         return self.repo.create(name, email, phone, city)
 
+    def add_many(self, rows: List[Dict]) -> List[Dict]:
+        """
+        Add several new customers with one email check and one insert.
+        Fails as a whole if any email is repeated or already registered.
+        """
+        emails = [row["email"] for row in rows]
+        if len(set(emails)) != len(emails):
+            raise CustomerError("Duplicate email in batch")
+        taken = self.repo.existing_emails(emails)
+        if taken:
+            raise CustomerError(f"Email already exists: {', '.join(sorted(taken))}")
+        return self.repo.create_many([
+            {"name": r["name"], "email": r["email"], "phone": r["phone"], "city": r.get("city")}
+            for r in rows])
+
     def list(self, limit: int = 100) -> List[Dict]:
         return self.repo.list(limit)
 
+    def iter_all(self, page_size: int = 1000) -> Iterator[Dict]:
+        return self.repo.iter_all(page_size=page_size)
+
     def update(self, cust_id: int, phone: str | None = None, city: str | None = None) -> Dict:
-        existing = self.repo.get_by_id(cust_id)
-        if not existing:
-            raise CustomerError("Customer not found")
         fields = {}
         if phone: fields["phone"] = phone
         if city: fields["city"] = city
-        return self.repo.update(cust_id, fields)
+        if not fields:
+            return self.get_by_id(cust_id)
+        updated = self.repo.update(cust_id, fields)
+        if not updated:
+            raise CustomerError("Customer not found")
+        return updated
 
     def delete(self, cust_id: int) -> Dict:
-        existing = self.repo.get_by_id(cust_id)
-        if not existing:
+        deleted = self.repo.delete(cust_id)
+        if not deleted:
             raise CustomerError("Customer not found")
-        return self.repo.delete(cust_id)
+        return deleted
 
     def search(self, email: str | None = None, city: str | None = None) -> List[Dict]:
         return self.repo.search(email=email, city=city)
 
-    def get_by_id(self, cust_id: int) -> dict:
-        customer = self.repo.get_by_id(cust_id)
+    def iter_search(self, email: str | None = None, city: str | None = None,
+                    page_size: int = 1000) -> Iterator[Dict]:
+        return self.repo.iter_search(email=email, city=city, page_size=page_size)
+
+    def search_page(self, limit: int = 20, cursor: str | None = None, local: bool = False, **criteria) -> Dict:
+        """
+        One page of ranked matches for name_prefix / email / phone / city /
+        text (see src/dao/customer_index.py); pass `next_cursor` back as
+        `cursor` for the following page.
+        """
+        unknown = set(criteria) - set(CRITERIA)
+        if unknown:
+            raise CustomerError(f"Unknown search criteria: {', '.join(sorted(unknown))}")
+        criteria = {k: v.strip() for k, v in criteria.items() if v and v.strip()}
+        if not criteria:
+            raise CustomerError("At least one search criterion is required")
+        if "phone" in criteria and len(digits(criteria["phone"])) < 3:
+            raise CustomerError("Phone search needs at least 3 digits")
+        if limit <= 0:
+            raise CustomerError("limit must be greater than 0")
+        try:
+            after = parse_cursor(cursor)
+        except ValueError as e:
+            raise CustomerError(str(e))
+        if local:
+            if self.index is None:
+                self.load_index()
+            rows = self.index.search(criteria, limit, cursor)
+        else:
+            rows = self.repo.search_ranked(criteria, limit, *after)
+        return {"results": rows, "next_cursor": make_cursor(rows[-1]) if len(rows) == limit else None}
+
+    def iter_search_ranked(self, page_size: int = 100, local: bool = False, **criteria) -> Iterator[Dict]:
+        cursor = None
+        while True:
+            page = self.search_page(limit=page_size, cursor=cursor, local=local, **criteria)
+            yield from page["results"]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return
+
+    def get_by_id(self, cust_id: int, fresh: bool = False) -> dict:
+        customer = self.repo.get_by_id(cust_id, fresh=fresh)
         if not customer:
             raise CustomerError(f"Customer not found: {cust_id}")
         return customer
+
+    def get_many(self, cust_ids: List[int], fresh: bool = False) -> List[Dict]:
+        """Customers in request order, fetched with one query; fails if any id is unknown."""
+        customers = self.repo.get_many(cust_ids, fresh=fresh)
+        missing = [cid for cid, c in zip(cust_ids, customers) if c is None]
+        if missing:
+            raise CustomerError(f"Customer not found: {', '.join(map(str, dict.fromkeys(missing)))}")
+        return customers
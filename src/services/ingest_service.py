@@ -0,0 +1,121 @@
+import queue
+import threading
+from typing import List, Dict, Iterable, Iterator
+from src.dao.instrumentation import traced
+from src.services.order_service import OrderService
+
+_DONE = object()
+
+
+@traced
+class IngestService:
+    """
+    Parallel order ingestion on a pool of worker threads.
+
+    Every SKU has an owning worker (prod_id % workers) and each order is
+    routed to the owner of most of its units, so orders contending on the
+    same SKU run one after another on one worker while orders on disjoint
+    SKUs run side by side. Worker queues are bounded, so a fast producer
+    blocks instead of buffering the whole stream, and one result is
+    reported per request as workers finish them.
+    """
+
+    def __init__(self, order_service: OrderService | None = None,
+                 workers: int = 4, queue_size: int = 100):
+        if workers <= 0 or queue_size <= 0:
+            raise ValueError("workers and queue_size must be greater than 0")
+        self.order_service = order_service or OrderService()
+        self.workers = workers
+        self.queue_size = queue_size
+
+    def route(self, items: List[Dict]) -> int:
+        """Worker index owning the largest share of the order's units."""
+        units: Dict[int, int] = {}
+        for item in items:
+            owner = int(item["prod_id"]) % self.workers
+            units[owner] = units.get(owner, 0) + int(item["quantity"])
+        # ties go to the lowest worker so routing stays deterministic
+        return max(sorted(units), key=units.get) if units else 0
+
+    def ingest(self, requests: Iterable[Dict]) -> Iterator[Dict]:
+        """
+        Place every {ref, cust_id, items} request and yield one result each,
+        in completion order: {"ref", "ok": True, "order", "worker"} or
+        {"ref", "ok": False, "error", "failed_lines", "worker"}.
+        """
+        inboxes = [queue.Queue(maxsize=self.queue_size) for _ in range(self.workers)]
+        results: queue.Queue = queue.Queue(maxsize=self.queue_size * self.workers)
+        stop = threading.Event()
+
+        def put(q: queue.Queue, item) -> bool:
+            while not stop.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def feed():
+            try:
+                for n, request in enumerate(requests, start=1):
+                    ref = request.get("ref", n) if isinstance(request, dict) else n
+                    try:
+                        cust_id = int(request.get("cust_id", request.get("customer")))
+                        items = [{"prod_id": int(i["prod_id"]), "quantity": int(i["quantity"])}
+                                 for i in request["items"]]
+                        target = self.route(items)
+                    except Exception as e:
+                        if not put(results, {"ref": ref, "ok": False, "error": f"invalid request: {e}",
+                                             "failed_lines": [], "worker": None}):
+                            return
+                        continue
+                    if not put(inboxes[target], (ref, cust_id, items)):
+                        return
+            except Exception as e:
+                put(results, {"ref": None, "ok": False, "error": f"request stream failed: {e}",
+                              "failed_lines": [], "worker": None})
+            finally:
+                for inbox in inboxes:
+                    put(inbox, _DONE)
+
+        def work(index: int):
+            inbox = inboxes[index]
+            while not stop.is_set():
+                try:
+                    job = inbox.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if job is _DONE:
+                    break
+                ref, cust_id, items = job
+                try:
+                    placed = self.order_service.create_order(cust_id, items)
+                    result = {"ref": ref, "ok": True, "order": placed["order"], "worker": index}
+                except Exception as e:
+                    result = {"ref": ref, "ok": False, "error": str(e),
+                              "failed_lines": getattr(e, "failed_lines", []), "worker": index}
+                if not put(results, result):
+                    return
+            put(results, _DONE)
+
+        feeder = threading.Thread(target=feed, name="ingest-feed", daemon=True)
+        workers = [threading.Thread(target=work, args=(i,), name=f"ingest-{i}", daemon=True)
+                   for i in range(self.workers)]
+        feeder.start()
+        for t in workers:
+            t.start()
+        try:
+            running = self.workers
+            while running:
+                result = results.get()
+                if result is _DONE:
+                    running -= 1
+                else:
+                    yield result
+        finally:
+            # also reached when the caller stops iterating early; the feeder
+            # may be blocked reading its input, so only the workers are joined
+            stop.set()
+            for t in workers:
+                t.join()
@@ -1,42 +1,144 @@
-from typing import List, Dict
+import logging
+from typing import Callable, List, Dict, Iterator
 from src.dao.order_dao import OrderDAO
-from src.services.customer_service import CustomerService
+from src.dao.report_dao import ReportDAO
+from src.dao.instrumentation import traced
+from src.services.customer_service import CustomerService, CustomerError
 from src.services.product_service import ProductService
+from src.services.stock_service import StockService
+
+logger = logging.getLogger(__name__)
+
+# outbox effects (applied by OutboxService) that apply one sales rollup event; the order RPCs
+# now apply their own events, so these only drain entries queued by older versions
+ROLLUP_EFFECTS = {event: f"apply_rollup_{event.lower()}" for event in ("CREATED", "CANCELLED", "COMPLETED")}
+# ... and for listener calls that raised: "notify:<listener qualname>:<event>"
+LISTENER_EFFECT = "notify"
+
+
+def listener_name(listener: Callable) -> str:
+    return getattr(listener, "__qualname__", None) or type(listener).__qualname__
 
 class OrderError(Exception):
-    pass
+    def __init__(self, message: str, failed_lines: List[Dict] | None = None):
+        super().__init__(message)
+        self.failed_lines = failed_lines or []
+
+
+# ------------------ Rules shared with AsyncOrderService ------------------
+def check_items(items: List[Dict]) -> None:
+    if not items:
+        raise OrderError("Order must contain at least one item")
+    for item in items:
+        if item["quantity"] <= 0:
+            raise OrderError(f"Quantity must be greater than 0 (product {item['prod_id']})")
+
+
+def describe_failure(line: Dict) -> str:
+    if line.get("reason") == "not_found":
+        return f"Product not found: {line['prod_id']}"
+    return f"Not enough stock for {line['name']} (available: {line['available']})"
+
+
+def raise_place_error(cust_id: int, result: Dict) -> None:
+    """Raise the error for a place_order result that is not ok."""
+    if result.get("error") == "customer_not_found":
+        raise CustomerError(f"Customer not found: {cust_id}")
+    failed = result.get("failed") or []
+    raise OrderError("Cannot place order: " + "; ".join(describe_failure(f) for f in failed),
+                     failed_lines=failed)
+
+
+def raise_transition_error(status: str | None, verb: str) -> None:
+    """Raise the error for an order (currently in `status`, None if missing) that was not PLACED."""
+    if status is None:
+        raise OrderError("Order not found")
+    raise OrderError(f"Only orders with status PLACED can be {verb}")
+
+
+class OrderEvents:
+    """
+    Listener notification shared by OrderService and AsyncOrderService.
+
+    Listeners are callables (event, items) told about CREATED, CANCELLED and
+    COMPLETED orders, e.g. the replenishment planner. The order write has
+    already succeeded when they run, so a listener that raises is logged and
+    queued in the outbox (OutboxService redelivers it) instead of failing the
+    call.
+    """
+
+    def _init_events(self, outbox=None) -> None:
+        self._outbox = outbox  # OutboxDAO, opened on first use
+        self.queued = 0  # follow-ups queued in the outbox by this instance
+        self.listeners: List[Callable[[str, List[Dict]], None]] = []
+
+    @property
+    def outbox(self):
+        if self._outbox is None:
+            from src.dao.outbox_dao import OutboxDAO
+            self._outbox = OutboxDAO()
+        return self._outbox
 
-class OrderService:
+    def _notify_listeners(self, order_id: int, event: str, items: List[Dict] | None) -> None:
+        for listener in self.listeners:
+            try:
+                listener(event, items or [])
+            except Exception:
+                self._defer_listener(listener, order_id, event)
+                self.queued += 1
+
+    def _defer_listener(self, listener: Callable, order_id: int, event: str) -> None:
+        name = listener_name(listener)
+        logger.exception("Order listener %s failed on %s for order %s; queued in the outbox",
+                         name, event, order_id)
+        effect = f"{LISTENER_EFFECT}:{name}:{event}"
+        try:
+            self.outbox.enqueue(effect, f"{effect}:{order_id}", {"order_id": order_id})
+        except Exception:
+            logger.exception("Could not queue listener %s for order %s", name, order_id)
+
+
+@traced
+class OrderService(OrderEvents):
     """Business logic for orders."""
 
-    def __init__(self):
+    def __init__(self, customer_service: CustomerService | None = None,
+                 product_service: ProductService | None = None,
+                 stock_service: StockService | None = None,
+                 report_dao: ReportDAO | None = None, outbox=None):
         self.repo = OrderDAO()
-        self.customer_service = CustomerService()
-        self.product_service = ProductService()
+        self.customer_service = customer_service or CustomerService()
+        self.product_service = product_service or ProductService()
+        self.stock_service = stock_service or StockService()
+        self.report_dao = report_dao or ReportDAO()
+        self._init_events(outbox)
         # PaymentService is NOT imported here to avoid circular imports
 
-    def create_order(self, cust_id: int, items: List[Dict]) -> Dict:
-        # Check customer exists
-        customer = self.customer_service.get_by_id(cust_id)
-
-        # Check product stock & calculate total
-        total_amount = 0
-        for item in items:
-            prod = self.product_service.get_by_id(item["prod_id"])
-            if prod["stock"] < item["quantity"]:
-                raise OrderError(f"Not enough stock for {prod['name']} (available: {prod['stock']})")
-            total_amount += prod["price"] * item["quantity"]
+    def create_order(self, cust_id: int, items: List[Dict], allocation: str | None = None) -> Dict:
+        """
+        Place an order. `allocation` names the strategy that orders the
+        warehouses stock is taken from (see StockService; default
+        RETAIL_ALLOCATION); the central pool is used after them.
+        """
+        check_items(items)
 
-        # Create order
-        order = self.repo.create_order(cust_id, total_amount)
+        # Validate, reserve stock, insert order + items and apply the CREATED
+        # rollup event in one round trip
+        result = self.repo.place_order(cust_id, items, self._warehouse_preference(cust_id, allocation))
+        if not result.get("ok"):
+            raise_place_error(cust_id, result)
 
-        # Deduct stock and create order_items
-        for item in items:
-            prod = self.product_service.get_by_id(item["prod_id"])
-            self.product_service.update(prod["prod_id"], stock=prod["stock"] - item["quantity"])
-            self.repo.create_order_item(order["order_id"], prod["prod_id"], item["quantity"], prod["price"])
+        self._notify_listeners(result["order"]["order_id"], "CREATED", result["items"])
+        return {"order": result["order"], "customer": result["customer"], "items": result["items"],
+                "allocations": result.get("allocations") or []}
 
-        return self.get_order_details(order["order_id"])
+    def _warehouse_preference(self, cust_id: int, allocation: str | None) -> List[int] | None:
+        strategy = self.stock_service.allocation(allocation)
+        warehouses = self.stock_service.warehouses()
+        if not warehouses:
+            return None  # everything is in the central pool
+        customer = self.customer_service.get_by_id(cust_id) if strategy.uses_customer else None
+        return strategy.rank(warehouses, customer)
 
     def get_order_details(self, order_id: int) -> Dict:
         order = self.repo.get_order_by_id(order_id)
@@ -46,29 +148,46 @@ class OrderService:
         items = self.repo.get_order_items(order_id)
         return {"order": order, "customer": customer, "items": items}
 
+    def get_orders_details(self, order_ids: List[int]) -> List[Dict | None]:
+        """
+        get_order_details for several orders in three queries (orders, their
+        items, their customers) instead of three per order. Results follow
+        `order_ids`; unknown orders come back as None.
+        """
+        orders = self.repo.get_many(order_ids)
+        found = [o["order_id"] for o in orders if o]
+        items = self.repo.get_items_by_orders(found)
+        customers = self.customer_service.repo.loader().prime(o["cust_id"] for o in orders if o)
+        return [{"order": o, "customer": customers.load(o["cust_id"]), "items": list(items[o["order_id"]])}
+                if o else None for o in orders]
+
     def list_orders_by_customer(self, cust_id: int) -> List[Dict]:
         return self.repo.list_orders_by_customer(cust_id)
 
-    def cancel_order(self, order_id: int) -> Dict:
-        order = self.repo.get_order_by_id(order_id)
-        if not order:
-            raise OrderError("Order not found")
-        if order["status"] != "PLACED":
-            raise OrderError("Only orders with status PLACED can be cancelled")
-
-        # Restore stock
-        items = self.repo.get_order_items(order_id)
-        for item in items:
-            prod = self.product_service.get_by_id(item["prod_id"])
-            self.product_service.update(prod["prod_id"], stock=prod["stock"] + item["quantity"])
+    def iter_orders_by_customer(self, cust_id: int, page_size: int = 1000) -> Iterator[Dict]:
+        return self.repo.iter_orders_by_customer(cust_id, page_size=page_size)
 
-        # Update order status
-        return self.repo.update_order_status(order_id, "CANCELLED")
+    def cancel_order(self, order_id: int) -> Dict:
+        # The PLACED -> CANCELLED transition, the stock release and the rollup
+        # event commit together, so a failure cannot leave a cancelled order
+        # holding stock and two concurrent cancels cannot both restore it.
+        result = self.repo.cancel_order(order_id)
+        if not result.get("ok"):
+            raise_transition_error(result.get("status"), "cancelled")
+        self._notify_listeners(order_id, "CANCELLED", result["items"])
+        return result["order"]
 
     def complete_order(self, order_id: int) -> Dict:
-        order = self.repo.get_order_by_id(order_id)
-        if not order:
-            raise OrderError("Order not found")
-        if order["status"] != "PLACED":
-            raise OrderError("Only orders with status PLACED can be completed")
-        return self.repo.update_order_status(order_id, "COMPLETED")
+        # the status change and the COMPLETED rollup event commit together
+        result = self.repo.complete_orders([order_id])
+        if not result.get("completed"):
+            raise_transition_error((result.get("skipped") or [{}])[0].get("status"), "completed")
+        self._notify_listeners(order_id, "COMPLETED", None)
+        return result["completed"][0]
+
+    def complete_orders(self, order_ids: List[int]) -> List[Dict]:
+        """Complete every listed order that is still PLACED in one call; returns those completed."""
+        completed = self.repo.complete_orders(order_ids)["completed"]
+        for order in completed:
+            self._notify_listeners(order["order_id"], "COMPLETED", None)
+        return completed
@@ -0,0 +1,186 @@
+import functools
+import logging
+import os
+import random
+from collections import defaultdict
+from typing import List, Dict, Tuple
+from src.dao.outbox_dao import OutboxDAO
+from src.dao.instrumentation import traced
+from src.services.order_service import (OrderService, OrderError, ROLLUP_EFFECTS, LISTENER_EFFECT,
+                                        listener_name)
+from src.services.payment_service import PaymentService, PaymentError
+
+logger = logging.getLogger(__name__)
+
+EFFECT_REFUND = "refund_payment"
+EFFECT_COMPLETE = "complete_order"
+
+
+class OutboxError(Exception):
+    pass
+
+
+@traced
+class OutboxService:
+    """
+    Write-behind for order side effects.
+
+    cancel_order and process_payment return after their primary write; the
+    refund or order completion that follows is recorded in the local outbox
+    and applied later by drain(), as are order listener calls that raised
+    (OrderEvents._notify_listeners). drain() coalesces due entries into one
+    bulk request per effect and retries failures with backoff until they are
+    dead-lettered. Handlers re-check the primary write before acting, so
+    replays and entries recovered after a crash are safe.
+    """
+
+    def __init__(self, order_service: OrderService | None = None,
+                 payment_service: PaymentService | None = None, store: OutboxDAO | None = None):
+        self.order_service = order_service or OrderService()
+        self.payment_service = payment_service or PaymentService(order_service=self.order_service)
+        self.store = store or OutboxDAO()
+        self.max_attempts = int(os.getenv("RETAIL_OUTBOX_MAX_ATTEMPTS", "8"))
+        self.handlers = {EFFECT_REFUND: self._apply_refunds, EFFECT_COMPLETE: self._apply_completions}
+        for event, effect in ROLLUP_EFFECTS.items():
+            self.handlers[effect] = functools.partial(self._apply_rollup_events, event)
+
+    # ------------------ Producers ------------------
+    def cancel_order(self, order_id: int) -> Dict:
+        """Cancel now; refund the payment from the outbox."""
+        key = f"{EFFECT_REFUND}:{order_id}"
+        self.store.stage(EFFECT_REFUND, key, {"order_id": order_id})
+        try:
+            cancelled = self.order_service.cancel_order(order_id)
+        except OrderError:
+            # rejected before anything was written
+            self.store.discard(key)
+            raise
+        self.store.release(key)
+        return cancelled
+
+    def process_payment(self, order_id: int, method: str) -> Dict:
+        """Mark the payment PAID now; complete the order from the outbox."""
+        key = f"{EFFECT_COMPLETE}:{order_id}"
+        self.store.stage(EFFECT_COMPLETE, key, {"order_id": order_id})
+        try:
+            paid = self.payment_service.process_payment(order_id, method, complete=False)
+        except PaymentError:
+            self.store.discard(key)
+            raise
+        self.store.release(key)
+        return paid
+
+    # ------------------ Drain ------------------
+    def drain(self, batch_size: int = 100, max_batches: int | None = None) -> Dict:
+        summary = {"batches": 0, "done": 0, "skipped": 0, "retried": 0, "dead": 0}
+        while max_batches is None or summary["batches"] < max_batches:
+            entries = self.store.claim(batch_size)
+            if not entries:
+                break
+            summary["batches"] += 1
+            by_effect: Dict[str, List[Dict]] = defaultdict(list)
+            for entry in entries:
+                by_effect[entry["effect"]].append(entry)
+            for effect, group in by_effect.items():
+                try:
+                    handler = self.handlers.get(effect) or self._listener_handler(effect)
+                    if handler is None:
+                        raise OutboxError(f"Unknown outbox effect: {effect}")
+                    outcomes = handler([e["payload"]["order_id"] for e in group])
+                except Exception as e:
+                    for entry in group:
+                        status = self.store.retry(entry, str(e), self._backoff(entry["attempts"]),
+                                                  self.max_attempts)
+                        summary["dead" if status == "dead" else "retried"] += 1
+                    continue
+                finished: Dict[Tuple[str, str | None], List[int]] = defaultdict(list)
+                for entry in group:
+                    status, note = outcomes[entry["payload"]["order_id"]]
+                    if status == "retry":
+                        status = self.store.retry(entry, note, self._backoff(entry["attempts"]), self.max_attempts)
+                        summary["dead" if status == "dead" else "retried"] += 1
+                        continue
+                    finished[(status, note)].append(entry["id"])
+                    summary[status] += 1
+                for (status, note), ids in finished.items():
+                    self.store.finish(ids, status, note)
+        return summary
+
+    def status(self, limit: int = 20) -> Dict:
+        return {"counts": self.store.counts(), "dead": self.store.list("dead", limit)}
+
+    @staticmethod
+    def _backoff(attempts: int) -> float:
+        base = float(os.getenv("RETAIL_OUTBOX_BACKOFF", "5"))
+        cap = float(os.getenv("RETAIL_OUTBOX_BACKOFF_MAX", "3600"))
+        return random.uniform(0.5, 1.0) * min(cap, base * 2 ** attempts)
+
+    def _listener_handler(self, effect: str):
+        prefix, _, rest = effect.partition(":")
+        name, _, event = rest.rpartition(":")
+        if prefix != LISTENER_EFFECT or not name:
+            return None
+        for listener in self.order_service.listeners:
+            if listener_name(listener) == name:
+                return functools.partial(self._notify_listener, listener, event)
+        # listeners keep in-process state; one built by another process reloads from the database
+        return lambda order_ids: {oid: ("skipped", f"listener {name} is not registered") for oid in order_ids}
+
+    # ------------------ Effects ------------------
+    # Each takes the batch's order ids and returns {order_id: (status, note)};
+    # status "retry" schedules that entry again with `note` as the error, and
+    # "dead" dead-letters it at once so it shows in `outbox status`.
+    def _apply_refunds(self, order_ids: List[int]) -> Dict[int, Tuple[str, str | None]]:
+        orders = {o["order_id"]: o for o in self.order_service.repo.get_orders_by_ids(order_ids)}
+        cancelled = [oid for oid in order_ids if orders.get(oid, {}).get("status") == "CANCELLED"]
+        refunded = {p["order_id"] for p in self.payment_service.repo.update_status_many(cancelled, "REFUNDED")}
+        outcomes = {}
+        for oid in order_ids:
+            if oid in refunded:
+                outcomes[oid] = ("done", None)
+            elif oid in cancelled:
+                # nothing to refund, but a cancelled order without a payment needs a look
+                outcomes[oid] = ("dead", "no payment record to refund")
+            else:
+                outcomes[oid] = ("skipped", f"order is {orders.get(oid, {}).get('status', 'missing')}")
+        return outcomes
+
+    def _apply_rollup_events(self, event: str, order_ids: List[int]) -> Dict[int, Tuple[str, str | None]]:
+        # one call per order; the rollup's event ledger makes a replay a no-op
+        apply = self.order_service.report_dao.apply_order_event
+        return {oid: ("done", None) if apply(oid, event) else ("skipped", "already applied or order missing")
+                for oid in dict.fromkeys(order_ids)}
+
+    def _notify_listener(self, listener, event: str, order_ids: List[int]) -> Dict[int, Tuple[str, str | None]]:
+        # per order, so an order the listener has taken is not replayed when a later one fails
+        items = self.order_service.repo.get_items_by_orders(order_ids)
+        outcomes = {}
+        for oid in dict.fromkeys(order_ids):
+            try:
+                listener(event, items.get(oid) or [])
+                outcomes[oid] = ("done", None)
+            except Exception as e:
+                logger.exception("Order listener %s failed again on %s for order %s", listener_name(listener),
+                                 event, oid)
+                outcomes[oid] = ("retry", f"{type(e).__name__}: {e}")
+        return outcomes
+
+    def _apply_completions(self, order_ids: List[int]) -> Dict[int, Tuple[str, str | None]]:
+        paid = sorted(p["order_id"] for p in self.payment_service.repo.get_by_orders(order_ids)
+                      if p["status"] == "PAID")
+        # one complete_orders call updates the statuses and applies the rollup events
+        completed = {o["order_id"] for o in self.order_service.complete_orders(paid)}
+        rest = [oid for oid in paid if oid not in completed]
+        orders = {o["order_id"]: o for o in self.order_service.repo.get_orders_by_ids(rest)}
+        outcomes = {}
+        for oid in order_ids:
+            status = orders.get(oid, {}).get("status", "missing")
+            if oid in completed:
+                outcomes[oid] = ("done", None)
+            elif oid not in paid:
+                outcomes[oid] = ("skipped", "payment is not PAID")
+            elif status == "COMPLETED":
+                outcomes[oid] = ("done", "already completed")
+            else:
+                outcomes[oid] = ("skipped", f"order is {status}")
+        return outcomes
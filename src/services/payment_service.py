@@ -1,20 +1,25 @@
+from typing import List, Dict, Iterable, Iterator
 from src.dao.payment_dao import PaymentDAO
+from src.dao.instrumentation import traced
 from src.services.order_service import OrderService
 
 class PaymentError(Exception):
     pass
 
+PAYMENT_METHODS = ("Cash", "Card", "UPI")
+
+@traced
 class PaymentService:
     """Handles payments for orders."""
 
-    def __init__(self):
+    def __init__(self, order_service: OrderService | None = None):
         self.repo = PaymentDAO()
-        self.order_service = OrderService()  # Only used for order status updates
+        self.order_service = order_service or OrderService()  # Only used for order status updates
 
     def create_pending_payment(self, order_id: int, amount: float):
-        return self.repo.create(order_id, amount)
+        return self.repo.create_pending(order_id, amount)
 
-    def process_payment(self, order_id: int, method: str):
+    def process_payment(self, order_id: int, method: str, complete: bool = True):
         payment = self.repo.get_by_order(order_id)
         if not payment:
             raise PaymentError("Payment record not found")
@@ -22,15 +27,92 @@ class PaymentService:
             raise PaymentError("Payment already processed")
 
         # Update payment
-        self.repo.update_status(order_id, "PAID", method)
+        paid = self.repo.update_status(order_id, "PAID", method)
+
+        # Complete order (the outbox passes complete=False and does it later)
+        if complete:
+            self.order_service.complete_order(order_id)
+        return paid
+
+    def settle(self, lines: Iterable[Dict], chunk_size: int = 500,
+               tolerance: float = 0.01) -> Iterator[Dict]:
+        """
+        Settle a stream of {order_id, amount, method} lines against PENDING
+        payments, one lookup and one settle_payments call per chunk.
+
+        Yields a reconciliation record per line, then one per PENDING payment
+        the lines never mentioned. `result` is one of: settled, invalid_line,
+        duplicate_line, unknown_order, amount_mismatch, order_not_placed,
+        already_<payment status> or unsettled.
+        """
+        if chunk_size <= 0:
+            raise PaymentError("Chunk size must be greater than 0")
+        seen = set()
+        chunk: List[Dict] = []
+        for line_no, raw in enumerate(lines, start=1):
+            try:
+                line = self._coerce_settlement(raw)
+            except (PaymentError, KeyError, TypeError, ValueError) as e:
+                order_id = raw.get("order_id") if isinstance(raw, dict) else None
+                yield {"line": line_no, "order_id": order_id, "result": "invalid_line", "error": str(e)}
+                continue
+            line["line"] = line_no
+            if line["order_id"] in seen:
+                yield {**line, "result": "duplicate_line"}
+                continue
+            seen.add(line["order_id"])
+            chunk.append(line)
+            if len(chunk) >= chunk_size:
+                yield from self._settle_chunk(chunk, tolerance)
+                chunk = []
+        yield from self._settle_chunk(chunk, tolerance)
+
+        # whatever is still PENDING and was not in the file is unsettled
+        for p in self.repo.iter_by_status("PENDING"):
+            if p["order_id"] not in seen:
+                yield {"order_id": p["order_id"], "result": "unsettled", "expected": p["amount"]}
 
-        # Complete order
-        self.order_service.complete_order(order_id)
-        return self.repo.get_by_order(order_id)
+    def _settle_chunk(self, chunk: List[Dict], tolerance: float) -> Iterator[Dict]:
+        if not chunk:
+            return
+        payments = {p["order_id"]: p for p in self.repo.get_by_orders([l["order_id"] for l in chunk])}
+        matched = []
+        for line in chunk:
+            payment = payments.get(line["order_id"])
+            record = {**line, "expected": payment["amount"] if payment else None}
+            if payment is None:
+                yield {**record, "result": "unknown_order"}
+            elif payment["status"] != "PENDING":
+                yield {**record, "result": f"already_{payment['status'].lower()}"}
+            elif abs(float(payment["amount"]) - line["amount"]) > tolerance:
+                yield {**record, "result": "amount_mismatch"}
+            else:
+                matched.append(record)
+
+        outcome = self.repo.settle([{"order_id": r["order_id"], "method": r["method"]} for r in matched])
+        settled = set(outcome.get("settled") or [])
+        skipped = {s["order_id"]: s for s in outcome.get("skipped") or []}
+        for record in matched:
+            if record["order_id"] in settled:
+                yield {**record, "result": "settled"}
+                continue
+            # the order is not PLACED, or the payment changed since the lookup
+            current = skipped.get(record["order_id"], {})
+            status = current.get("payment_status")
+            if status == "PENDING":
+                yield {**record, "result": "order_not_placed", "order_status": current.get("order_status")}
+            else:
+                yield {**record, "result": f"already_{(status or 'missing').lower()}"}
+
+    @staticmethod
+    def _coerce_settlement(raw: Dict) -> Dict:
+        method = str(raw["method"]).strip()
+        if method not in PAYMENT_METHODS:
+            raise PaymentError(f"Unknown payment method: {method}")
+        return {"order_id": int(raw["order_id"]), "amount": float(raw["amount"]), "method": method}
 
     def refund_payment(self, order_id: int):
-        payment = self.repo.get_by_order(order_id)
-        if not payment:
+        refunded = self.repo.update_status(order_id, "REFUNDED")
+        if not refunded:
             raise PaymentError("Payment record not found")
-        self.repo.update_status(order_id, "REFUNDED")
-        return payment
+        return refunded
@@ -1,42 +1,186 @@
-from typing import List, Dict
-from src.dao.product_dao import ProductDAO
+import math
+from itertools import islice
+from typing import List, Dict, Iterable, Iterator
+from src.dao.base_dao import IN_CHUNK
+from src.dao.product_dao import ProductDAO, ProductQuery
+from src.dao.stock_dao import StockDAO
+from src.dao.instrumentation import traced
 
 class ProductError(Exception):
     pass
 
+@traced
 class ProductService:
     """Business logic for products."""
 
-    def __init__(self):
+    def __init__(self, stock_dao: StockDAO | None = None):
         self.repo = ProductDAO()
+        self.stock_repo = stock_dao or StockDAO()
 
     def add(self, name: str, sku: str, price: float,
             stock: int = 0, category: str | None = None) -> Dict:
-        if price <= 0:
-            raise ProductError("Price must be greater than 0")
-        if self.repo.get_by_sku(sku):
+        self._check_price(price)
+        if self.repo.get_by_sku(sku, fresh=True):
             raise ProductError(f"SKU already exists: {sku}")
         return self.repo.create(name, sku, price, stock, category)
 
-    def list(self, limit: int = 100) -> List[Dict]:
-        return self.repo.list(limit)
+    def add_many(self, rows: List[Dict]) -> List[Dict]:
+        """
+        Add several new products with one SKU check and one insert.
+        Fails as a whole if any row is invalid or any SKU is taken.
+        """
+        for row in rows:
+            self._check_price(row["price"])
+        skus = [row["sku"] for row in rows]
+        if len(set(skus)) != len(skus):
+            raise ProductError("Duplicate SKU in batch")
+        taken = self.repo.existing_skus(skus)
+        if taken:
+            raise ProductError(f"SKU already exists: {', '.join(sorted(taken))}")
+        return self.repo.create_many([
+            {"name": r["name"], "sku": r["sku"], "price": r["price"],
+             "stock": r.get("stock") or 0, "category": r.get("category")}
+            for r in rows])
+
+    def bulk_upsert(self, rows: Iterable[Dict], chunk_size: int = 500, max_errors: int = 100) -> Dict:
+        """
+        Validate and upsert products keyed by sku, one chunk per request.
+        Rows are consumed lazily so memory stays bounded by `chunk_size`
+        per column set; a SKU repeated before its chunk is sent keeps its
+        last occurrence. Only the columns a row carries are written, so a
+        row without stock or category leaves the stored value alone.
+        """
+        if chunk_size <= 0:
+            raise ProductError("Chunk size must be greater than 0")
+        summary = {"read": 0, "upserted": 0, "duplicates": 0, "rejected": 0, "batches": 0, "errors": []}
+        # one pending chunk per column set: a bulk upsert writes the same columns for every row
+        chunks: Dict[tuple, Dict[str, Dict]] = {}
+        pending: Dict[str, tuple] = {}  # sku -> column set of the chunk holding it
+
+        def flush(columns):
+            chunk = chunks.pop(columns, None)
+            if chunk:
+                summary["upserted"] += self.repo.upsert_many(list(chunk.values()))
+                summary["batches"] += 1
+                for sku in chunk:
+                    del pending[sku]
+
+        for line_no, raw in enumerate(rows, start=1):
+            summary["read"] += 1
+            try:
+                row = self._coerce_row(raw)
+            except (ProductError, KeyError, TypeError, ValueError) as e:
+                summary["rejected"] += 1
+                if len(summary["errors"]) < max_errors:
+                    summary["errors"].append({"line": line_no, "error": str(e),
+                                              "sku": raw.get("sku") if isinstance(raw, dict) else None})
+                continue
+            if row["sku"] in pending:
+                summary["duplicates"] += 1
+                del chunks[pending[row["sku"]]][row["sku"]]
+            columns = tuple(row)
+            chunks.setdefault(columns, {})[row["sku"]] = row
+            pending[row["sku"]] = columns
+            if len(chunks[columns]) >= chunk_size:
+                flush(columns)
+        for columns in list(chunks):
+            flush(columns)
+        return summary
+
+    def export(self, page_size: int = 1000) -> Iterator[Dict]:
+        return self.repo.iter_all(page_size=page_size)
+
+    def iter_all(self, page_size: int = 1000, category: str | None = None) -> Iterator[Dict]:
+        return self.repo.iter_all(page_size=page_size, category=category)
+
+    def list(self, limit: int = 100, category: str | None = None) -> List[Dict]:
+        return self.repo.list(limit, category)
+
+    def find(self, query: ProductQuery, limit: int = 100, cursor: str | None = None) -> Dict:
+        """One page of `query`; pass `next_cursor` back as `cursor` for the following page."""
+        if limit <= 0:
+            raise ProductError("limit must be greater than 0")
+        try:
+            rows = self.repo.query(query, limit, query.parse_cursor(cursor) if cursor else None)
+        except ValueError as e:
+            raise ProductError(str(e))
+        return {"results": [query.project(r) for r in rows],
+                "next_cursor": query.format_cursor(rows[-1]) if len(rows) == limit else None}
+
+    def iter_query(self, query: ProductQuery, page_size: int = 1000) -> Iterator[Dict]:
+        return self.repo.iter_query(query, page_size=page_size)
 
     def update(self, prod_id: int, **fields) -> Dict:
-        if "price" in fields and fields["price"] <= 0:
-            raise ProductError("Price must be greater than 0")
-        existing = self.repo.get_by_id(prod_id)
-        if not existing:
+        if "price" in fields:
+            self._check_price(fields["price"])
+        if not fields:
+            return self.get_by_id(prod_id)
+        updated = self.repo.update(prod_id, fields)
+        if not updated:
             raise ProductError("Product not found")
-        return self.repo.update(prod_id, fields)
+        return updated
 
     def delete(self, prod_id: int) -> Dict:
-        existing = self.repo.get_by_id(prod_id)
-        if not existing:
+        deleted = self.repo.delete(prod_id)
+        if not deleted:
             raise ProductError("Product not found")
-        return self.repo.delete(prod_id)
+        return deleted
+
+    @staticmethod
+    def _check_price(price: float) -> None:
+        if not math.isfinite(price):
+            raise ProductError(f"Price must be a finite number: {price}")
+        if price <= 0:
+            raise ProductError("Price must be greater than 0")
 
-    def get_by_id(self, prod_id: int) -> dict:
-        prod = self.repo.get_by_id(prod_id)
+    @classmethod
+    def _coerce_row(cls, raw: Dict) -> Dict:
+        if not isinstance(raw, dict):
+            raise ProductError(f"Expected an object, got {type(raw).__name__}")
+        name = (raw.get("name") or "").strip()
+        sku = (raw.get("sku") or "").strip()
+        if not name or not sku:
+            raise ProductError("name and sku are required")
+        price = float(raw["price"])
+        cls._check_price(price)
+        row = {"name": name, "sku": sku, "price": price}
+        # a missing or empty stock / category keeps the stored value (or the column default for new SKUs)
+        if raw.get("stock") not in (None, ""):
+            row["stock"] = int(raw["stock"])
+        if raw.get("category"):
+            row["category"] = raw["category"]
+        return row
+
+    def get_by_id(self, prod_id: int, fresh: bool = False) -> dict:
+        prod = self.repo.get_by_id(prod_id, fresh=fresh)
         if not prod:
             raise ProductError(f"Product not found: {prod_id}")
         return prod
+
+    def get_many(self, prod_ids: List[int], fresh: bool = False) -> List[Dict]:
+        """Products in request order, fetched with one query; fails if any id is unknown."""
+        prods = self.repo.get_many(prod_ids, fresh=fresh)
+        missing = [pid for pid, p in zip(prod_ids, prods) if p is None]
+        if missing:
+            raise ProductError(f"Product not found: {', '.join(map(str, dict.fromkeys(missing)))}")
+        return prods
+
+    def availability(self, prod_ids: List[int], fresh: bool = False) -> List[Dict]:
+        """
+        Units available per product across the central pool and every
+        warehouse, in request order: one aggregate query for the ids not
+        already cached. Fails if any id is unknown.
+        """
+        found = self.stock_repo.availability(prod_ids, fresh=fresh)
+        missing = [pid for pid in prod_ids if pid not in found]
+        if missing:
+            raise ProductError(f"Product not found: {', '.join(map(str, dict.fromkeys(missing)))}")
+        return [found[pid] for pid in prod_ids]
+
+    def with_availability(self, rows: Iterable[Dict], chunk_size: int = IN_CHUNK) -> Iterator[Dict]:
+        """Add `available` (total units) to each product row, looked up a chunk at a time."""
+        rows = iter(rows)
+        while chunk := list(islice(rows, chunk_size)):
+            found = self.stock_repo.availability([r["prod_id"] for r in chunk])
+            for r in chunk:
+                yield dict(r, available=found[r["prod_id"]]["total"] if r["prod_id"] in found else None)
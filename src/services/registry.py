@@ -0,0 +1,65 @@
+# src/services/registry.py
+from functools import cached_property
+
+
+class ServiceRegistry:
+    """
+    Builds services on first use and shares them.
+
+    Each property imports its service module only when accessed, so a
+    command that needs products never loads orders or payments. Services
+    that depend on others (orders, payments) are handed the shared
+    instances instead of building their own.
+    """
+
+    @cached_property
+    def product(self):
+        from src.services.product_service import ProductService
+        return ProductService()
+
+    @cached_property
+    def customer(self):
+        from src.services.customer_service import CustomerService
+        return CustomerService()
+
+    @cached_property
+    def stock(self):
+        from src.services.stock_service import StockService
+        return StockService()
+
+    @cached_property
+    def report(self):
+        from src.services.report_service import ReportService
+        return ReportService()
+
+    @cached_property
+    def order(self):
+        from src.services.order_service import OrderService
+        service = OrderService(customer_service=self.customer, product_service=self.product,
+                               stock_service=self.stock, report_dao=self.report.report_dao)
+        if self.loaded("replenishment"):
+            service.listeners.append(self.replenishment.on_order_event)
+        return service
+
+    @cached_property
+    def payment(self):
+        from src.services.payment_service import PaymentService
+        return PaymentService(order_service=self.order)
+
+    @cached_property
+    def outbox(self):
+        from src.services.outbox_service import OutboxService
+        return OutboxService(order_service=self.order, payment_service=self.payment)
+
+    @cached_property
+    def replenishment(self):
+        from src.services.replenishment_service import ReplenishmentService
+        service = ReplenishmentService(report_dao=self.report.report_dao, product_dao=self.product.repo,
+                                       stock_dao=self.stock.repo)
+        if self.loaded("order"):
+            self.order.listeners.append(service.on_order_event)
+        return service
+
+    def loaded(self, name: str) -> bool:
+        """True once the named service has been built."""
+        return name in self.__dict__
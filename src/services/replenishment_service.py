@@ -0,0 +1,180 @@
+import heapq
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict
+from src.dao.product_dao import ProductDAO
+from src.dao.report_dao import ReportDAO
+from src.dao.stock_dao import StockDAO
+from src.dao.instrumentation import traced
+
+
+@traced
+class ReplenishmentService:
+    """
+    Low-stock alerts and reorder plans from per-SKU sales velocity.
+
+    velocity = units sold over the last `window_days` / window_days, read
+    from the sales_product_daily rollup (sql/009_replenishment.sql), and
+    days of cover = stock / velocity, where stock is the central pool plus
+    every warehouse. Only SKUs that sold in the window or are out of stock
+    are loaded; the rest have unlimited cover. SKUs sit in a min-heap
+    keyed by days of cover, so the next to run out are read without
+    sorting the catalog. Orders placed or cancelled through
+    OrderService update the affected SKUs in place (on_order_event); the
+    state is reloaded once it is `max_age` seconds old or the day changes,
+    which also picks up restocks made outside orders.
+    """
+
+    def __init__(self, report_dao: ReportDAO | None = None, product_dao: ProductDAO | None = None,
+                 stock_dao: StockDAO | None = None, window_days: int = 28, lead_time_days: float = 7,
+                 safety_days: float = 3, max_age: float = 300):
+        if window_days <= 0:
+            raise ValueError("window_days must be greater than 0")
+        self.report_dao = report_dao or ReportDAO()
+        self.product_dao = product_dao or ProductDAO()
+        self.stock_dao = stock_dao or StockDAO()
+        self.window_days = window_days
+        self.lead_time_days = lead_time_days
+        self.safety_days = safety_days
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._skus: Dict[int, Dict] = {}
+        self._heap: List[tuple] = []  # (days_of_cover, prod_id, version); stale versions are skipped
+        self._loaded_at: float | None = None
+        self._loaded_day = None
+        self._unseen: Dict[int, int] = {}  # units sold by SKUs not loaded yet
+
+    def configure(self, window_days: int | None = None, lead_time_days: float | None = None,
+                  safety_days: float | None = None) -> None:
+        if window_days is not None and window_days != self.window_days:
+            if window_days <= 0:
+                raise ValueError("window_days must be greater than 0")
+            self.window_days = window_days
+            self._loaded_at = None  # velocities were summed over the old window
+        if lead_time_days is not None:
+            self.lead_time_days = lead_time_days
+        if safety_days is not None:
+            self.safety_days = safety_days
+
+    # ------------------ State ------------------
+    def load(self, page_size: int = 5000) -> int:
+        """(Re)load velocity and stock for every SKU that sold in the window or is out of stock."""
+        today = datetime.now(timezone.utc).date()
+        since = today - timedelta(days=self.window_days - 1)
+        skus = {}
+        for row in self.report_dao.iter_product_velocity(since, page_size=page_size):
+            skus[row["prod_id"]] = {"prod_id": row["prod_id"], "sku": row["sku"], "name": row["name"],
+                                    "stock": int(row["stock"]), "units": int(row["units"]), "version": 0}
+        heap = [(self._cover(s), pid, 0) for pid, s in skus.items()]
+        heapq.heapify(heap)
+        with self._lock:
+            self._skus, self._heap, self._unseen = skus, heap, {}
+            self._loaded_at, self._loaded_day = time.monotonic(), today
+        return len(skus)
+
+    def _ensure_loaded(self) -> None:
+        stale = (self._loaded_at is None
+                 or time.monotonic() - self._loaded_at > self.max_age
+                 or self._loaded_day != datetime.now(timezone.utc).date())
+        if stale:
+            self.load()
+        elif self._unseen:
+            self._add_unseen()
+
+    def _add_unseen(self) -> None:
+        with self._lock:
+            unseen, self._unseen = self._unseen, {}
+        ids = list(unseen)
+        # products.stock is only the central pool; cover is over every warehouse too
+        available = self.stock_dao.availability(ids, fresh=True)
+        for pid, prod in zip(ids, self.product_dao.get_many(ids, fresh=True)):
+            if prod and pid in available:
+                self._add_sku(dict(prod, stock=available[pid]["total"]), unseen[pid])
+
+    def _add_sku(self, prod: Dict, units: int) -> None:
+        with self._lock:
+            s = self._skus.setdefault(prod["prod_id"], {"prod_id": prod["prod_id"], "units": 0, "version": 0})
+            s.update(sku=prod["sku"], name=prod["name"], stock=int(prod["stock"]))
+            s["units"] = max(0, s["units"] + units)
+            s["version"] += 1
+            heapq.heappush(self._heap, (self._cover(s), s["prod_id"], s["version"]))
+
+    def on_order_event(self, event: str, items: List[Dict]) -> None:
+        """OrderService listener: a placed order sells and takes stock, a cancelled one gives both back."""
+        sign = {"CREATED": 1, "CANCELLED": -1}.get(event)
+        if not sign or self._loaded_at is None:
+            return
+        with self._lock:
+            for item in items:
+                s = self._skus.get(item["prod_id"])
+                if s is None:
+                    # first sale in the window: stock is fetched before the next read
+                    self._unseen[item["prod_id"]] = self._unseen.get(item["prod_id"], 0) + sign * item["quantity"]
+                    continue
+                s["units"] = max(0, s["units"] + sign * item["quantity"])
+                s["stock"] -= sign * item["quantity"]
+                s["version"] += 1
+                heapq.heappush(self._heap, (self._cover(s), s["prod_id"], s["version"]))
+            if len(self._heap) > 2 * len(self._skus) + 64:
+                self._heap = [(self._cover(s), pid, s["version"]) for pid, s in self._skus.items()]
+                heapq.heapify(self._heap)
+
+    def _cover(self, s: Dict) -> float:
+        if s["stock"] <= 0:
+            return 0.0
+        velocity = s["units"] / self.window_days
+        return s["stock"] / velocity if velocity > 0 else math.inf
+
+    def _soonest(self, limit: int, horizon: float) -> List[Dict]:
+        """Up to `limit` SKUs with cover under `horizon`, soonest first (O(limit log n))."""
+        with self._lock:
+            taken = []
+            while self._heap and len(taken) < limit:
+                entry = heapq.heappop(self._heap)
+                s = self._skus.get(entry[1])
+                if s is None or s["version"] != entry[2]:
+                    continue  # superseded by a later update
+                if entry[0] >= horizon:
+                    heapq.heappush(self._heap, entry)
+                    break
+                taken.append(entry)
+            for entry in taken:
+                heapq.heappush(self._heap, entry)
+            return [self._describe(self._skus[pid], cover) for cover, pid, _ in taken]
+
+    def _describe(self, s: Dict, cover: float) -> Dict:
+        velocity = s["units"] / self.window_days
+        return {"prod_id": s["prod_id"], "sku": s["sku"], "name": s["name"], "stock": s["stock"],
+                "units_sold": s["units"], "daily_velocity": round(velocity, 3),
+                "days_of_cover": round(cover, 1) if cover != math.inf else None}
+
+    # ------------------ Reports ------------------
+    def alerts(self, limit: int = 20, horizon_days: float | None = None) -> List[Dict]:
+        """SKUs that run out within `horizon_days` (default: lead time + safety days), soonest first."""
+        self._ensure_loaded()
+        horizon = horizon_days if horizon_days is not None else self.lead_time_days + self.safety_days
+        return self._soonest(limit, horizon)
+
+    def plan(self, limit: int = 100, target_days: float = 30) -> List[Dict]:
+        """
+        Reorder suggestions for SKUs at or below their reorder point (cover
+        under lead time + safety days): enough units to cover the lead time
+        plus `target_days` at the current velocity.
+        """
+        self._ensure_loaded()
+        plan = []
+        for row in self._soonest(limit, self.lead_time_days + self.safety_days):
+            velocity = row["units_sold"] / self.window_days
+            need = math.ceil(velocity * (self.lead_time_days + target_days)) - max(row["stock"], 0)
+            if need > 0:
+                plan.append(dict(row, reorder_quantity=need,
+                                 order_by_days=round(max(0.0, (row["days_of_cover"] or 0) - self.lead_time_days), 1)))
+        return plan
+
+    def status(self) -> Dict:
+        with self._lock:
+            return {"tracked_skus": len(self._skus), "heap_entries": len(self._heap),
+                    "window_days": self.window_days,
+                    "age_seconds": round(time.monotonic() - self._loaded_at, 1) if self._loaded_at else None}
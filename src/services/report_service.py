@@ -1,44 +1,90 @@
-from datetime import datetime, timedelta
-from typing import List, Dict
-from src.dao.order_dao import OrderDAO
-from src.dao.product_dao import ProductDAO
-from src.dao.customer_dao import CustomerDAO
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Iterator
+from src.dao.report_dao import ReportDAO
+from src.dao.snapshot import CatalogSnapshot
+from src.dao.instrumentation import traced
 
+def _midnight(day) -> datetime:
+    return datetime.combine(day, datetime.min.time(), timezone.utc)
+
+
+@traced
 class ReportService:
-    """Generate sales reports."""
+    """
+    Generate sales reports.
+
+    Reports read the server-side rollups unless a CatalogSnapshot has been
+    attached (load_snapshot), in which case they are computed in memory.
+    """
 
-    def __init__(self):
-        self.order_dao = OrderDAO()
-        self.product_dao = ProductDAO()
-        self.customer_dao = CustomerDAO()
+    def __init__(self, snapshot: CatalogSnapshot | None = None):
+        self.report_dao = ReportDAO()
+        self.snapshot = snapshot
+
+    def load_snapshot(self, page_size: int = 5000) -> CatalogSnapshot:
+        """Load (or reload) the in-memory snapshot the reports will use."""
+        self.snapshot = CatalogSnapshot.load(page_size=page_size)
+        return self.snapshot
 
     def top_selling_products(self, top_n: int = 5) -> List[Dict]:
-        items = self.order_dao.get_all_order_items()
-        counts = {}
-        for i in items:
-            counts[i["prod_id"]] = counts.get(i["prod_id"], 0) + i["quantity"]
-        top = sorted(counts.items(), key=lambda x: x[1], reverse=True)[:top_n]
-        result = []
-        for pid, qty in top:
-            prod = self.product_dao.get_by_id(pid)
-            result.append({"product": prod["name"], "quantity_sold": qty})
-        return result
+        if self.snapshot is not None:
+            rows = self.snapshot.top_selling_products(top_n)
+        else:
+            rows = self.report_dao.top_selling_products(top_n)
+        return [{"product": r["product"], "quantity_sold": r["quantity_sold"]} for r in rows]
 
     def total_revenue_last_month(self) -> float:
-        now = datetime.utcnow()
-        last_month = now - timedelta(days=30)
-        orders = self.order_dao.get_all_orders()
-        total = sum(o["total_amount"] for o in orders if o["created_at"] >= last_month.isoformat())
-        return total
-
-    def orders_by_customer(self) -> List[Dict]:
-        customers = self.customer_dao.list()
-        result = []
-        for c in customers:
-            orders = self.order_dao.list_orders_by_customer(c["cust_id"])
-            result.append({"customer": c["name"], "orders_count": len(orders)})
+        """Revenue over the rolling 30 days up to now."""
+        now = datetime.now(timezone.utc)
+        start = now - timedelta(days=30)
+        if self.snapshot is not None:
+            return self.snapshot.revenue_between(start, now)
+        # whole days from the daily rollup (29 rows); only the two partial days at the edges read orders
+        first, today = start.date() + timedelta(days=1), now.date()
+        rows = self.report_dao.daily_revenue(first, today)
+        return (float(sum(float(r["revenue"]) for r in rows))
+                + self.report_dao.revenue_between(start, _midnight(first))
+                + self.report_dao.revenue_between(_midnight(today), now))
+
+    def revenue_by_window(self, days: int = 30, window_days: int = 1) -> List[Dict]:
+        """Revenue and order count per `window_days` window over the last `days` days."""
+        today = datetime.now(timezone.utc).date()
+        first = today - timedelta(days=days - 1)
+        start = datetime.combine(first, datetime.min.time(), timezone.utc)
+        end = datetime.combine(today + timedelta(days=1), datetime.min.time(), timezone.utc)
+        if self.snapshot is not None:
+            return self.snapshot.revenue_by_window(start, end, window_days * 86400)
+        windows = {}
+        for r in self.report_dao.daily_revenue(first, today + timedelta(days=1)):
+            offset = (datetime.fromisoformat(str(r["day"])[:10]).date() - first).days // window_days
+            w = windows.setdefault(offset, {"revenue": 0.0, "orders": 0})
+            w["revenue"] += float(r["revenue"])
+            w["orders"] += int(r["orders_count"])
+        return [{"start": (start + timedelta(days=b * window_days)).isoformat(),
+                 "revenue": round(windows.get(b, {}).get("revenue", 0.0), 2),
+                 "orders": windows.get(b, {}).get("orders", 0)}
+                for b in range(-(-days // window_days))]
+
+    def refresh(self, full: bool = False, batch_size: int = 10000) -> Dict:
+        """Rebuild the rollups, or catch up on orders above the watermark."""
+        result = self.report_dao.refresh(full, batch_size)
+        applied = result.get("applied", 0)
+        while not full and result.get("remaining"):
+            result = self.report_dao.refresh(False, batch_size)
+            applied += result.get("applied", 0)
+        if not full:
+            result["applied"] = applied
         return result
 
+    def iter_orders_by_customer(self, min_orders: int = 0, page_size: int = 1000) -> Iterator[Dict]:
+        source = self.snapshot.orders_by_customer(min_orders) if self.snapshot is not None else \
+            self.report_dao.iter_orders_by_customer(min_orders, page_size)
+        for r in source:
+            yield {"cust_id": r["cust_id"], "customer": r["customer"], "orders_count": r["orders_count"]}
+
+    def orders_by_customer(self, min_orders: int = 0, page_size: int = 1000) -> List[Dict]:
+        return list(self.iter_orders_by_customer(min_orders, page_size))
+
     def frequent_customers(self, min_orders: int = 2) -> List[Dict]:
-        customers_orders = self.orders_by_customer()
-        return [c for c in customers_orders if c["orders_count"] > min_orders]
+        # customers with more than `min_orders` orders
+        return self.orders_by_customer(min_orders=min_orders + 1)
@@ -0,0 +1,148 @@
+import os
+import threading
+import time
+from typing import List, Dict
+from src.dao.stock_dao import StockDAO
+from src.dao.instrumentation import traced
+
+class StockError(Exception):
+    def __init__(self, message: str, failed_lines: List[Dict] | None = None):
+        super().__init__(message)
+        self.failed_lines = failed_lines or []
+
+
+class PriorityAllocation:
+    """Warehouses by priority, then id."""
+
+    name = "priority"
+    uses_customer = False
+
+    def key(self, warehouse: Dict, customer: Dict | None) -> tuple:
+        return warehouse["priority"], warehouse["warehouse_id"]
+
+    def rank(self, warehouses: List[Dict], customer: Dict | None = None) -> List[int]:
+        return [w["warehouse_id"] for w in sorted(warehouses, key=lambda w: self.key(w, customer))]
+
+
+class NearestAllocation(PriorityAllocation):
+    """Warehouses in the customer's city first, then by priority."""
+
+    name = "nearest"
+    uses_customer = True
+
+    def key(self, warehouse: Dict, customer: Dict | None) -> tuple:
+        city = ((customer or {}).get("city") or "").lower()
+        elsewhere = not city or (warehouse.get("city") or "").lower() != city
+        return (elsewhere,) + super().key(warehouse, customer)
+
+
+ALLOCATIONS = {cls.name: cls for cls in (PriorityAllocation, NearestAllocation)}
+
+@traced
+class StockService:
+    """
+    Contention-safe stock reservations.
+
+    All checks happen inside the store's conditional update, so any number of
+    workers can reserve the same SKUs concurrently without Python-side locks.
+
+    Stock can also be held in warehouses, each product's share split over
+    shard counters (sql/010_warehouse_stock.sql). An allocation strategy
+    (RETAIL_ALLOCATION, default "priority") orders the warehouses an order
+    is filled from; products.stock is the central pool used last.
+    """
+
+    def __init__(self, store=None, allocation: str | None = None, warehouse_ttl: float = 60):
+        self.repo = store or StockDAO()
+        self.default_allocation = allocation or os.getenv("RETAIL_ALLOCATION", "priority")
+        self.warehouse_ttl = warehouse_ttl
+        self._lock = threading.Lock()
+        self._warehouses: List[Dict] | None = None
+        self._warehouses_at = 0.0
+
+    @staticmethod
+    def _normalize(items: List[Dict]) -> List[Dict]:
+        totals: Dict[int, int] = {}
+        for item in items:
+            if item["quantity"] <= 0:
+                raise StockError(f"Quantity must be greater than 0 (product {item['prod_id']})")
+            totals[item["prod_id"]] = totals.get(item["prod_id"], 0) + item["quantity"]
+        return [{"prod_id": pid, "quantity": qty} for pid, qty in sorted(totals.items())]
+
+    def reserve(self, items: List[Dict]) -> None:
+        result = self.repo.reserve(self._normalize(items))
+        if not result.get("ok"):
+            failed = result.get("failed") or []
+            raise StockError("Cannot reserve stock for products: "
+                             + ", ".join(str(f["prod_id"]) for f in failed), failed_lines=failed)
+
+    def release(self, items: List[Dict]) -> None:
+        if items:
+            self.repo.release(self._normalize(items))
+
+    # ------------------ Warehouses ------------------
+    def warehouses(self, fresh: bool = False) -> List[Dict]:
+        """Active warehouses by priority; cached for `warehouse_ttl` seconds."""
+        cached = None if fresh else self.cached_warehouses()
+        if cached is not None:
+            return cached
+        return self.remember_warehouses(self.repo.warehouses())
+
+    def cached_warehouses(self) -> List[Dict] | None:
+        """The cached warehouse list, or None if it is missing or expired (see AsyncOrderService)."""
+        with self._lock:
+            if self._warehouses is not None and time.monotonic() - self._warehouses_at < self.warehouse_ttl:
+                return list(self._warehouses)
+        return None
+
+    def remember_warehouses(self, warehouses: List[Dict]) -> List[Dict]:
+        with self._lock:
+            self._warehouses, self._warehouses_at = warehouses, time.monotonic()
+        return list(warehouses)
+
+    def add_warehouse(self, code: str, name: str, city: str | None = None, priority: int = 100) -> Dict:
+        if self.repo.get_warehouse_by_code(code):
+            raise StockError(f"Warehouse already exists: {code}")
+        warehouse = self.repo.add_warehouse(code, name, city, priority)
+        with self._lock:
+            self._warehouses = None
+        return warehouse
+
+    def _warehouse_id(self, warehouse: int | str) -> int:
+        if isinstance(warehouse, int) or str(warehouse).isdigit():
+            return int(warehouse)
+        found = self.repo.get_warehouse_by_code(warehouse)
+        if not found:
+            raise StockError(f"Warehouse not found: {warehouse}")
+        return found["warehouse_id"]
+
+    def assign(self, prod_id: int, warehouse: int | str, quantity: int, shards: int = 1,
+               from_central: bool = True) -> Dict:
+        """
+        Move units into a warehouse (by id or code), split over `shards`
+        counters so concurrent orders for the product do not queue on one
+        row. With from_central=False the units are new stock.
+        """
+        if quantity <= 0:
+            raise StockError("Quantity must be greater than 0")
+        if shards <= 0:
+            raise StockError("Shards must be greater than 0")
+        result = self.repo.assign(prod_id, self._warehouse_id(warehouse), quantity, shards, from_central)
+        if not result.get("ok"):
+            raise StockError({
+                "warehouse_not_found": f"Warehouse not found: {warehouse}",
+                "product_not_found": f"Product not found: {prod_id}",
+                "insufficient_central_stock": f"Not enough unassigned stock for product {prod_id}",
+            }.get(result.get("error"), f"Cannot assign stock: {result.get('error')}"))
+        return result
+
+    def allocation(self, name: str | None = None) -> PriorityAllocation:
+        name = name or self.default_allocation
+        if name not in ALLOCATIONS:
+            raise StockError(f"Unknown allocation strategy: {name} (choose from {', '.join(ALLOCATIONS)})")
+        return ALLOCATIONS[name]()
+
+    # ------------------ Availability ------------------
+    def availability(self, prod_ids: List[int], fresh: bool = False) -> Dict[int, Dict]:
+        """{prod_id: {central, located, total, warehouses}}; unknown ids are left out."""
+        return self.repo.availability(prod_ids, fresh=fresh)
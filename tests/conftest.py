@@ -0,0 +1,76 @@
+# tests/conftest.py
+"""
+Every test runs on a fresh in-process SQLite database (src/dao/sqlite_backend.py)
+and its own outbox file, so the suite needs no Supabase project.
+"""
+from contextlib import contextmanager
+
+import pytest
+
+from src.config import SupabaseConfig
+from src.dao import cache
+from src.dao.instrumentation import instrumentation
+from src.dao.sqlite_backend import SQLiteClient
+from src.services.registry import ServiceRegistry
+
+
+@pytest.fixture(autouse=True)
+def db(tmp_path, monkeypatch):
+    monkeypatch.setenv("RETAIL_BACKEND", "sqlite")
+    monkeypatch.setenv("RETAIL_OUTBOX_PATH", str(tmp_path / "outbox.db"))
+    monkeypatch.setenv("RETAIL_OUTBOX_BACKOFF", "0")
+    client = SQLiteClient(str(tmp_path / "retail.db"))
+    SupabaseConfig.set_client(client)
+    with cache._caches_lock:
+        cache._caches.clear()  # the shared per-table caches would leak rows between databases
+    yield client
+    SupabaseConfig.close()
+    client.close()
+
+
+@pytest.fixture
+def services():
+    return ServiceRegistry()
+
+
+@pytest.fixture
+def customer(services):
+    return services.customer.add("Ann Lee", "ann@example.com", "555-0100", "Oslo")
+
+
+@pytest.fixture
+def products(services):
+    """Three products with 10, 5 and 0 units in the central pool."""
+    return [services.product.add("Pen", "PEN-1", 2.5, 10, "office"),
+            services.product.add("Ink", "INK-1", 7.0, 5, "office"),
+            services.product.add("Mug", "MUG-1", 9.0, 0, "kitchen")]
+
+
+@pytest.fixture
+def stock_of(services):
+    """Total units (central pool + warehouses) of a product, read past the caches."""
+    def read(prod_id: int) -> int:
+        return services.stock.availability([prod_id], fresh=True)[prod_id]["total"]
+    return read
+
+
+class RoundTrips:
+    count = 0
+
+
+@pytest.fixture
+def round_trips():
+    """`with round_trips() as rt: ...` counts the DAO requests made inside the block in rt.count."""
+    instrumentation.reset()
+    instrumentation.enable()
+
+    @contextmanager
+    def measure():
+        counter = RoundTrips()
+        with instrumentation.scope("test"):
+            yield counter
+        counter.count = instrumentation.scope_round_trips.pop("test", 0)
+
+    yield measure
+    instrumentation.disable()
+    instrumentation.reset()
@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from src.dao.async_dao import AsyncProductDAO
+from src.services.async_service import AsyncOrderService, AsyncProductService, AsyncReportService
+from src.services.customer_service import CustomerError
+from src.services.order_service import OrderError
+from src.services.product_service import ProductError
+
+
+def test_async_products(products):
+    async def scenario():
+        service = await AsyncProductService.create()
+        cap = await service.add("Cap", "CAP-1", 1.5, 3)
+        with pytest.raises(ProductError, match="SKU already exists"):
+            await service.add("Cap", "CAP-1", 1.5)
+        updated = await service.update(cap["prod_id"], price=2.0)
+        return cap, updated, await service.get_many([p["prod_id"] for p in products])
+
+    cap, updated, fetched = asyncio.run(scenario())
+    assert cap["sku"] == "CAP-1" and updated["price"] == 2.0
+    assert [p["sku"] for p in fetched] == ["PEN-1", "INK-1", "MUG-1"]
+
+
+def test_concurrent_lookups_share_one_query(products, round_trips):
+    async def scenario():
+        dao = await AsyncProductDAO.create()
+        return await dao.get_many([p["prod_id"] for p in products] + [999], fresh=True)
+
+    with round_trips() as rt:
+        rows = asyncio.run(scenario())
+    assert [r and r["sku"] for r in rows] == ["PEN-1", "INK-1", "MUG-1", None]
+    assert rt.count == 1
+
+
+def test_async_orders_and_reports(customer, products, stock_of):
+    pen = products[0]
+
+    async def scenario():
+        orders, reports = await asyncio.gather(AsyncOrderService.create(), AsyncReportService.create())
+        placed = await orders.create_order(customer["cust_id"], [{"prod_id": pen["prod_id"], "quantity": 2}])
+        other = await orders.create_order(customer["cust_id"], [{"prod_id": pen["prod_id"], "quantity": 1}])
+        await orders.complete_order(placed["order"]["order_id"])
+        await orders.cancel_order(other["order"]["order_id"])
+        with pytest.raises(OrderError, match="status PLACED can be cancelled"):
+            await orders.cancel_order(other["order"]["order_id"])
+        with pytest.raises(OrderError, match="Not enough stock for Pen"):
+            await orders.create_order(customer["cust_id"], [{"prod_id": pen["prod_id"], "quantity": 50}])
+        with pytest.raises(CustomerError):
+            await orders.create_order(999, [{"prod_id": pen["prod_id"], "quantity": 1}])
+        details = await orders.get_order_details(placed["order"]["order_id"])
+        return details, await reports.summary()
+
+    details, summary = asyncio.run(scenario())
+    assert details["order"]["status"] == "COMPLETED"
+    assert summary == {"top_selling_products": [{"product": "Pen", "quantity_sold": 2}],
+                       "revenue_last_30_days": pytest.approx(5.0)}
+    assert stock_of(pen["prod_id"]) == 8
+
+
+def test_async_orders_follow_allocation_and_notify_listeners(services, customer, products):
+    pen = products[0]
+    bgo = services.stock.add_warehouse("BGO", "Bergen", "Bergen", priority=1)
+    osl = services.stock.add_warehouse("OSL", "Oslo", "Oslo", priority=2)
+    services.stock.assign(pen["prod_id"], "BGO", 3)
+    services.stock.assign(pen["prod_id"], "OSL", 3)
+    events = []
+
+    async def scenario():
+        orders = await AsyncOrderService.create()
+        orders.listeners.append(lambda event, items: events.append((event, [i["quantity"] for i in items])))
+        line = [{"prod_id": pen["prod_id"], "quantity": 2}]
+        nearest = await orders.create_order(customer["cust_id"], line, allocation="nearest")
+        priority = await orders.create_order(customer["cust_id"], line, allocation="priority")
+        await orders.cancel_order(nearest["order"]["order_id"])
+        await orders.complete_order(priority["order"]["order_id"])
+        return nearest, priority
+
+    nearest, priority = asyncio.run(scenario())
+    assert {a["warehouse_id"] for a in nearest["allocations"]} == {osl["warehouse_id"]}
+    assert {a["warehouse_id"] for a in priority["allocations"]} == {bgo["warehouse_id"]}
+    assert events == [("CREATED", [2]), ("CREATED", [2]), ("CANCELLED", [2]), ("COMPLETED", [])]
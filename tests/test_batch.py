@@ -0,0 +1,80 @@
+import io
+import json
+
+import pytest
+
+from src.cli.batch import BatchRunner, run_batch, to_argv
+from src.cli.main import build_parser
+
+
+@pytest.fixture
+def runner(services):
+    return BatchRunner(services, build_parser(), group_size=3)
+
+
+def _run(runner, commands):
+    out = io.StringIO()
+    counts = run_batch(runner, [json.dumps(c) for c in commands], out)
+    return counts, [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+def test_to_argv_maps_fields_to_flags():
+    assert to_argv({"id": 1, "cmd": "order", "action": "create", "customer": 7, "item": ["1:2", "4:1"],
+                    "allocation": None, "sync": True, "desc": False}) == \
+        ["order", "create", "--customer", "7", "--item", "1:2", "4:1", "--sync"]
+    assert to_argv({"argv": ["report", "top", "--limit", 3]}) == ["report", "top", "--limit", "3"]
+
+
+def test_adds_are_grouped_into_bulk_inserts(services, runner, round_trips):
+    commands = [{"id": f"p{i}", "cmd": "product", "action": "add", "name": f"P{i}", "sku": f"P-{i}",
+                 "price": 1.5} for i in range(5)]
+    with round_trips() as rt:
+        counts, results = _run(runner, commands)
+    assert counts == {"ok": 5, "failed": 0}
+    assert [r["id"] for r in results] == [f"p{i}" for i in range(5)]
+    assert [r["result"]["sku"] for r in results] == [f"P-{i}" for i in range(5)]
+    # a SKU check and an insert per group of three
+    assert rt.count == 4
+
+
+def test_a_rejected_group_falls_back_to_per_line_results(services, runner):
+    services.product.add("Pen", "PEN-1", 2.5)
+    counts, results = _run(runner, [
+        {"cmd": "product", "action": "add", "name": "Cap", "sku": "CAP-1", "price": 1},
+        {"cmd": "product", "action": "add", "name": "Pen", "sku": "PEN-1", "price": 1},
+        {"cmd": "customer", "action": "add", "name": "Ann", "email": "ann@example.com", "phone": "1"},
+    ])
+    assert counts == {"ok": 2, "failed": 1}
+    assert [r["ok"] for r in results] == [True, False, True]
+    assert "SKU already exists" in results[1]["error"]
+
+
+def test_bad_lines_get_their_own_errors(runner):
+    out = io.StringIO()
+    counts = run_batch(runner, ["not json", "", json.dumps({"id": 7, "cmd": "order", "action": "fly"}),
+                                json.dumps({"cmd": "order", "action": "show"})], out)
+    results = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert counts == {"ok": 0, "failed": 3}
+    assert [r["id"] for r in results] == [1, 7, 4]
+    assert "invalid choice" in results[1]["error"]
+    assert "--order" in results[2]["error"]
+
+
+def test_order_commands_round_trip(services, runner, customer, products):
+    pen = products[0]
+    counts, results = _run(runner, [
+        {"id": "a", "cmd": "order", "action": "create", "customer": customer["cust_id"], "item": [f"{pen['prod_id']}:2"]},
+        {"id": "b", "cmd": "order", "action": "create", "customer": customer["cust_id"], "item": [f"{pen['prod_id']}:1"]},
+        {"id": "c", "cmd": "order", "action": "show", "order": 1},
+        {"id": "d", "cmd": "order", "action": "show", "order": 999},
+        {"id": "e", "cmd": "order", "action": "show", "order": 2},
+        {"id": "f", "cmd": "order", "action": "cancel", "order": 1, "sync": True},
+    ])
+    by_id = {r["id"]: r for r in results}
+    assert [r["id"] for r in results] == list("abcdef")
+    assert [i["quantity"] for i in by_id["c"]["result"]["items"]] == [2]
+    assert by_id["d"] == {"id": "d", "ok": False, "error": "Order not found"}
+    assert by_id["e"]["result"]["order"]["order_id"] == 2
+    # no payment was recorded, so the synchronous refund fails after the cancel
+    assert not by_id["f"]["ok"]
+    assert services.order.get_order_details(1)["order"]["status"] == "CANCELLED"
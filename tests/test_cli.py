@@ -0,0 +1,41 @@
+import sys
+
+import pytest
+
+from src.cli import main as cli
+
+
+@pytest.fixture
+def run(services, monkeypatch, capsys):
+    """Run one CLI command in-process against the test database."""
+    monkeypatch.setattr(cli, "services", services)
+
+    def invoke(*argv):
+        monkeypatch.setattr(sys, "argv", ["retail", *map(str, argv)])
+        cli.main()
+        return capsys.readouterr().out
+
+    return invoke
+
+
+@pytest.fixture
+def paid_order(services, customer, products):
+    order = services.order.create_order(customer["cust_id"],
+                                        [{"prod_id": products[0]["prod_id"], "quantity": 1}])["order"]
+    services.payment.create_pending_payment(order["order_id"], order["total_amount"])
+    return order
+
+
+def test_commands_leave_follow_ups_to_outbox_drain(services, run, paid_order):
+    assert "refund queued" in run("order", "cancel", "--order", paid_order["order_id"])
+    assert services.outbox.status()["counts"] == {"pending": 1}
+    assert services.payment.repo.get_by_order(paid_order["order_id"])["status"] == "PENDING"
+    run("outbox", "drain")
+    assert services.payment.repo.get_by_order(paid_order["order_id"])["status"] == "REFUNDED"
+
+
+def test_drain_on_exit_is_opt_in(services, run, paid_order, monkeypatch):
+    monkeypatch.setenv("RETAIL_OUTBOX_DRAIN_ON_EXIT", "1")
+    run("payment", "process", "--order", paid_order["order_id"], "--method", "Card")
+    assert services.outbox.status()["counts"] == {"done": 1}
+    assert services.order.get_order_details(paid_order["order_id"])["order"]["status"] == "COMPLETED"
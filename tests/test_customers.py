@@ -0,0 +1,65 @@
+import pytest
+
+from src.services.customer_service import CustomerError
+
+
+@pytest.fixture
+def people(services):
+    return services.customer.add_many([
+        {"name": "Ann Lee", "email": "ann@example.com", "phone": "+47 555 0100", "city": "Oslo"},
+        {"name": "Annika Berg", "email": "annika@example.com", "phone": "555-0199", "city": "Bergen"},
+        {"name": "Bob Stone", "email": "bob@example.com", "phone": "555 0142", "city": "Oslo"},
+        {"name": "Joanna Anns", "email": "jo@example.com", "phone": "555 0177", "city": None},
+    ])
+
+
+def test_add_many_checks_emails_once(services, people):
+    assert [c["name"] for c in people] == ["Ann Lee", "Annika Berg", "Bob Stone", "Joanna Anns"]
+    with pytest.raises(CustomerError, match="Email already exists: bob@example.com"):
+        services.customer.add_many([{"name": "B", "email": "bob@example.com", "phone": "1"}])
+    with pytest.raises(CustomerError, match="Duplicate email"):
+        services.customer.add_many([{"name": "C", "email": "c@example.com", "phone": "1"}] * 2)
+    with pytest.raises(CustomerError, match="Email already exists"):
+        services.customer.add("Ann", "ann@example.com", "1")
+
+
+def test_update_and_cached_reads(services, people):
+    ann = people[0]
+    assert services.customer.get_by_id(ann["cust_id"])["city"] == "Oslo"
+    assert services.customer.update(ann["cust_id"], city="Bergen")["city"] == "Bergen"
+    assert services.customer.get_by_id(ann["cust_id"])["city"] == "Bergen"
+    with pytest.raises(CustomerError, match="Customer not found: 999"):
+        services.customer.get_many([ann["cust_id"], 999])
+
+
+@pytest.mark.parametrize("criteria", [
+    {"name_prefix": "ann"},
+    {"city": "oslo"},
+    {"phone": "0142"},
+    {"text": "ann"},
+    {"text": "annika", "city": "Bergen"},
+    {"email": "JO@example.com"},
+])
+def test_local_index_ranks_like_the_database(services, people, criteria):
+    remote = services.customer.search_page(limit=10, **criteria)["results"]
+    local = services.customer.search_page(limit=10, local=True, **criteria)["results"]
+    assert remote
+    assert [(r["cust_id"], r["score"]) for r in local] == [(r["cust_id"], float(r["score"])) for r in remote]
+
+
+def test_ranked_search_pages_by_cursor(services, people):
+    for local in (False, True):
+        ranked = [c["name"] for c in services.customer.iter_search_ranked(page_size=1, local=local, text="ann")]
+        assert ranked[0] == "Ann Lee"
+        assert set(ranked) == {"Ann Lee", "Annika Berg", "Joanna Anns"}
+
+
+def test_search_page_rejects_bad_criteria(services, people):
+    with pytest.raises(CustomerError, match="Unknown search criteria: zip"):
+        services.customer.search_page(zip="0150")
+    with pytest.raises(CustomerError, match="At least one"):
+        services.customer.search_page(text="  ")
+    with pytest.raises(CustomerError, match="at least 3 digits"):
+        services.customer.search_page(phone="55")
+    with pytest.raises(CustomerError, match="invalid cursor"):
+        services.customer.search_page(text="ann", cursor="nope")
@@ -0,0 +1,41 @@
+import io
+import json
+import os
+import tempfile
+import threading
+
+import pytest
+
+from src.cli.batch import BatchRunner
+from src.cli.daemon import BatchServer, send
+from src.cli.main import build_parser
+
+
+@pytest.fixture
+def daemon(services):
+    # AF_UNIX paths are limited to ~100 bytes, too short for pytest's tmp_path
+    path = os.path.join(tempfile.mkdtemp(prefix="retail-"), "cli.sock")
+    server = BatchServer(path, BatchRunner(services, build_parser()))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield path
+    server.shutdown()
+    server.server_close()
+    os.unlink(path)
+    os.rmdir(os.path.dirname(path))
+
+
+def test_send_reads_results_while_writing(daemon, services, customer, products):
+    # ~4 MB of results: far more than the socket buffers hold while commands are still being sent
+    order_id = services.order.create_order(customer["cust_id"],
+                                           [{"prod_id": products[0]["prod_id"], "quantity": 1}])["order"]["order_id"]
+    lines = [json.dumps({"id": n, "cmd": "order", "action": "show", "order": order_id if n % 2 else 999})
+             for n in range(10_000)]
+    out, done = io.StringIO(), {}
+    sender = threading.Thread(target=lambda: done.update(send(lines, out, daemon)), daemon=True)
+    sender.start()
+    sender.join(timeout=120)
+    assert not sender.is_alive(), "send() deadlocked"
+    assert done == {"ok": 5000, "failed": 5000}
+    results = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [r["id"] for r in results] == list(range(10_000))
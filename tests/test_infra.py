@@ -0,0 +1,78 @@
+import gc
+import json
+import threading
+
+import pytest
+
+from benchmarks.import_time import SCENARIOS, probe
+from src.config import SupabaseConfig
+from src.dao.instrumentation import instrumentation
+from src.dao.loader import BatchLoader
+
+
+def test_scopes_count_round_trips_per_service_call(services, customer, products, tmp_path):
+    log = tmp_path / "slow.ndjson"
+    instrumentation.reset()
+    instrumentation.enable(slow_ms=0, slow_log=str(log))
+    try:
+        services.product.get_many([p["prod_id"] for p in products], fresh=True)
+        snap = instrumentation.snapshot()
+    finally:
+        instrumentation.disable()
+        instrumentation.reset()
+    assert snap["round_trips"] == {"ProductService.get_many": 1}
+    assert [(q["table"], q["op"], q["calls"], q["rows"]) for q in snap["queries"]] == [("products", "select", 1, 3)]
+    assert json.loads(log.read_text().splitlines()[0])["scope"] == "ProductService.get_many"
+
+
+def test_batch_loader_fetches_primed_ids_once():
+    calls = []
+
+    def fetch_many(ids):
+        calls.append(list(ids))
+        return {i: {"id": i} for i in ids if i != 3}
+
+    loader = BatchLoader(fetch_many, max_batch=2).prime([1, 2, 3])
+    assert loader.load_many([3, 1]) == [None, {"id": 1}]
+    assert loader.load(2) == {"id": 2}
+    assert calls == [[1, 2], [3]]
+
+
+class _Pool:
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_thread_clients_are_closed_with_their_thread(monkeypatch):
+    SupabaseConfig.close()
+    monkeypatch.setenv("RETAIL_BACKEND", "supabase")
+    monkeypatch.setenv("SUPABASE_CLIENT_SCOPE", "thread")
+    pools = []
+
+    def build():
+        pool = _Pool()
+        pools.append(pool)
+        with SupabaseConfig._lock:
+            SupabaseConfig._http_clients.append(pool)
+        return object(), pool
+
+    monkeypatch.setattr(SupabaseConfig, "_build_client", build)
+    clients = []
+    worker = threading.Thread(target=lambda: clients.extend([SupabaseConfig.get_client(),
+                                                              SupabaseConfig.get_client()]))
+    worker.start()
+    worker.join()
+    del worker
+    gc.collect()
+    assert clients[0] is clients[1]
+    assert len(pools) == 1 and pools[0].closed
+    assert pools[0] not in SupabaseConfig._http_clients
+
+
+@pytest.mark.parametrize("scenario", SCENARIOS)
+def test_cli_startup_loads_only_what_a_command_needs(scenario):
+    statement, allowed = SCENARIOS[scenario]
+    loaded = probe(statement)["loaded"]
+    assert [m for m in loaded if m not in allowed] == []
@@ -0,0 +1,16 @@
+from src.services.ingest_service import IngestService
+
+
+def test_ingest_places_every_request_once(services, products, stock_of):
+    pen, ink, _ = products
+    buyers = [services.customer.add(f"C{i}", f"c{i}@example.com", "555") for i in range(4)]
+    requests = [{"ref": n, "cust_id": buyers[n % 4]["cust_id"],
+                 "items": [{"prod_id": pen["prod_id"] if n % 2 else ink["prod_id"], "quantity": 1}]}
+                for n in range(20)]
+    requests.append({"ref": "bad", "items": []})
+    results = list(IngestService(services.order, workers=3, queue_size=2).ingest(requests))
+    assert sorted(map(str, (r["ref"] for r in results))) == sorted(map(str, range(20))) + ["bad"]
+    assert sum(r["ok"] for r in results) == 15  # ten pens, five inks
+    assert stock_of(pen["prod_id"]) == 0 and stock_of(ink["prod_id"]) == 0
+    # orders for one SKU always land on its owning worker
+    assert {r["worker"] for r in results if r["ok"] and r["order"]["total_amount"] == 2.5} == {pen["prod_id"] % 3}
@@ -0,0 +1,178 @@
+import threading
+
+import pytest
+
+from src.config import SupabaseConfig
+from src.services.customer_service import CustomerError
+from src.services.order_service import OrderError
+
+
+def test_create_order_reserves_stock_and_returns_everything(services, customer, products, stock_of):
+    pen, ink, _ = products
+    result = services.order.create_order(customer["cust_id"], [{"prod_id": pen["prod_id"], "quantity": 3},
+                                                               {"prod_id": ink["prod_id"], "quantity": 1}])
+    order = result["order"]
+    assert order["status"] == "PLACED"
+    assert order["total_amount"] == pytest.approx(3 * 2.5 + 7.0)
+    assert result["customer"]["cust_id"] == customer["cust_id"]
+    assert sorted((i["prod_id"], i["quantity"], i["price"]) for i in result["items"]) == \
+        [(pen["prod_id"], 3, 2.5), (ink["prod_id"], 1, 7.0)]
+    assert stock_of(pen["prod_id"]) == 7
+    assert stock_of(ink["prod_id"]) == 4
+
+
+def test_repeated_lines_are_merged(services, customer, products, stock_of):
+    pen = products[0]
+    services.order.create_order(customer["cust_id"], [{"prod_id": pen["prod_id"], "quantity": 2},
+                                                      {"prod_id": pen["prod_id"], "quantity": 3}])
+    assert stock_of(pen["prod_id"]) == 5
+
+
+def test_failed_order_takes_nothing(services, customer, products, stock_of):
+    pen, ink, mug = products
+    with pytest.raises(OrderError) as err:
+        services.order.create_order(customer["cust_id"], [{"prod_id": pen["prod_id"], "quantity": 1},
+                                                          {"prod_id": mug["prod_id"], "quantity": 1}])
+    assert "Not enough stock for Mug" in str(err.value)
+    assert [f["prod_id"] for f in err.value.failed_lines] == [mug["prod_id"]]
+    assert stock_of(pen["prod_id"]) == 10
+    assert services.order.list_orders_by_customer(customer["cust_id"]) == []
+
+
+def test_create_order_rejects_bad_input(services, customer, products):
+    with pytest.raises(OrderError, match="at least one item"):
+        services.order.create_order(customer["cust_id"], [])
+    with pytest.raises(OrderError, match="greater than 0"):
+        services.order.create_order(customer["cust_id"], [{"prod_id": products[0]["prod_id"], "quantity": 0}])
+    with pytest.raises(OrderError, match="Product not found: 999"):
+        services.order.create_order(customer["cust_id"], [{"prod_id": 999, "quantity": 1}])
+    with pytest.raises(CustomerError, match="Customer not found"):
+        services.order.create_order(999, [{"prod_id": products[0]["prod_id"], "quantity": 1}])
+
+
+def test_concurrent_orders_never_oversell(services, products, stock_of):
+    pen = products[0]
+    buyers = [services.customer.add(f"C{i}", f"c{i}@example.com", "555") for i in range(8)]
+    placed, errors = [], []
+
+    def buy(cust_id):
+        for _ in range(3):
+            try:
+                placed.append(services.order.create_order(cust_id, [{"prod_id": pen["prod_id"], "quantity": 1}]))
+            except OrderError as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=buy, args=(c["cust_id"],)) for c in buyers]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(placed) == 10
+    assert len(errors) == 14
+    assert stock_of(pen["prod_id"]) == 0
+
+
+def test_cancel_restores_stock_once(services, customer, products, stock_of):
+    pen = products[0]
+    order = services.order.create_order(customer["cust_id"], [{"prod_id": pen["prod_id"], "quantity": 4}])["order"]
+    cancelled = services.order.cancel_order(order["order_id"])
+    assert cancelled["status"] == "CANCELLED"
+    assert stock_of(pen["prod_id"]) == 10
+    with pytest.raises(OrderError, match="status PLACED can be cancelled"):
+        services.order.cancel_order(order["order_id"])
+    assert stock_of(pen["prod_id"]) == 10
+    with pytest.raises(OrderError, match="Order not found"):
+        services.order.cancel_order(999)
+
+
+def test_concurrent_cancels_restore_stock_once(services, customer, products, stock_of):
+    pen = products[0]
+    order_id = services.order.create_order(customer["cust_id"],
+                                           [{"prod_id": pen["prod_id"], "quantity": 4}])["order"]["order_id"]
+    outcomes = []
+
+    def cancel():
+        try:
+            services.order.cancel_order(order_id)
+            outcomes.append("ok")
+        except OrderError:
+            outcomes.append("rejected")
+
+    threads = [threading.Thread(target=cancel) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(outcomes) == ["ok", "rejected", "rejected", "rejected"]
+    assert stock_of(pen["prod_id"]) == 10
+
+
+def test_complete_order(services, customer, products):
+    order = services.order.create_order(customer["cust_id"],
+                                        [{"prod_id": products[0]["prod_id"], "quantity": 1}])["order"]
+    assert services.order.complete_order(order["order_id"])["status"] == "COMPLETED"
+    with pytest.raises(OrderError, match="status PLACED can be completed"):
+        services.order.complete_order(order["order_id"])
+    with pytest.raises(OrderError, match="Order not found"):
+        services.order.complete_order(999)
+
+
+def test_complete_orders_skips_orders_not_placed(services, customer, products):
+    ids = [services.order.create_order(customer["cust_id"],
+                                       [{"prod_id": products[0]["prod_id"], "quantity": 1}])["order"]["order_id"]
+           for _ in range(3)]
+    services.order.cancel_order(ids[1])
+    completed = services.order.complete_orders(ids + [999])
+    assert sorted(o["order_id"] for o in completed) == [ids[0], ids[2]]
+    assert {o["status"] for o in completed} == {"COMPLETED"}
+
+
+def test_order_details_single_and_batched(services, customer, products):
+    ids = [services.order.create_order(customer["cust_id"],
+                                       [{"prod_id": products[0]["prod_id"], "quantity": n}])["order"]["order_id"]
+           for n in (1, 2)]
+    details = services.order.get_order_details(ids[1])
+    assert details["customer"]["email"] == "ann@example.com"
+    assert [i["quantity"] for i in details["items"]] == [2]
+    batched = services.order.get_orders_details([ids[1], 999, ids[0]])
+    assert batched[1] is None
+    assert [d["order"]["order_id"] for d in (batched[0], batched[2])] == [ids[1], ids[0]]
+    assert batched[0]["items"] == details["items"]
+    with pytest.raises(OrderError, match="Order not found"):
+        services.order.get_order_details(999)
+
+
+def test_iter_orders_by_customer_pages_by_keyset(services, customer, products):
+    ids = [services.order.create_order(customer["cust_id"],
+                                       [{"prod_id": products[0]["prod_id"], "quantity": 1}])["order"]["order_id"]
+           for _ in range(5)]
+    assert [o["order_id"] for o in services.order.iter_orders_by_customer(customer["cust_id"], page_size=2)] == ids
+
+
+def test_listeners_see_created_and_cancelled_orders(services, customer, products):
+    events = []
+    services.order.listeners.append(lambda event, items: events.append((event, [i["quantity"] for i in items])))
+    order = services.order.create_order(customer["cust_id"],
+                                        [{"prod_id": products[0]["prod_id"], "quantity": 2}])["order"]
+    services.order.cancel_order(order["order_id"])
+    assert events == [("CREATED", [2]), ("CANCELLED", [2])]
+
+
+def test_create_order_is_one_round_trip(services, customer, products, round_trips):
+    services.stock.warehouses()  # cached for warehouse_ttl seconds
+    with round_trips() as rt:
+        services.order.create_order(customer["cust_id"], [{"prod_id": products[0]["prod_id"], "quantity": 2}])
+    assert rt.count == 1
+    assert services.report.top_selling_products(1) == [{"product": "Pen", "quantity_sold": 2}]
+
+
+def test_completions_apply_their_rollups_in_the_same_call(services, customer, products, round_trips):
+    ids = [services.order.create_order(customer["cust_id"],
+                                       [{"prod_id": products[0]["prod_id"], "quantity": 1}])["order"]["order_id"]
+           for _ in range(4)]
+    with round_trips() as rt:
+        services.order.complete_order(ids[0])
+        services.order.complete_orders(ids[1:])
+    assert rt.count == 2
+    events = SupabaseConfig.get_client().table("sales_rollup_events").select("*").eq("event", "COMPLETED").execute()
+    assert sorted(e["order_id"] for e in events.data) == ids
@@ -0,0 +1,114 @@
+import pytest
+
+from src.services.order_service import OrderError, ROLLUP_EFFECTS
+from src.services.payment_service import PaymentError
+
+
+@pytest.fixture
+def paid_order(services, customer, products):
+    order = services.order.create_order(customer["cust_id"],
+                                        [{"prod_id": products[0]["prod_id"], "quantity": 2}])["order"]
+    services.payment.create_pending_payment(order["order_id"], order["total_amount"])
+    return order
+
+
+def _payment_status(services, order_id):
+    return services.payment.repo.get_by_order(order_id)["status"]
+
+
+def test_cancel_refunds_the_payment_on_drain(services, paid_order, stock_of, products):
+    order_id = paid_order["order_id"]
+    assert services.outbox.cancel_order(order_id)["status"] == "CANCELLED"
+    assert stock_of(products[0]["prod_id"]) == 10
+    assert _payment_status(services, order_id) == "PENDING"
+    assert services.outbox.drain() == {"batches": 1, "done": 1, "skipped": 0, "retried": 0, "dead": 0}
+    assert _payment_status(services, order_id) == "REFUNDED"
+    assert services.outbox.drain()["batches"] == 0
+
+
+def test_process_payment_completes_the_order_on_drain(services, paid_order):
+    order_id = paid_order["order_id"]
+    assert services.outbox.process_payment(order_id, "Cash")["status"] == "PAID"
+    assert services.order.get_order_details(order_id)["order"]["status"] == "PLACED"
+    assert services.outbox.drain()["done"] == 1
+    assert services.order.get_order_details(order_id)["order"]["status"] == "COMPLETED"
+    assert services.report.top_selling_products(1) == [{"product": "Pen", "quantity_sold": 2}]
+
+
+def test_rejected_writes_leave_no_entry(services, paid_order):
+    with pytest.raises(OrderError):
+        services.outbox.cancel_order(999)
+    with pytest.raises(PaymentError):
+        services.outbox.process_payment(999, "Cash")
+    services.outbox.process_payment(paid_order["order_id"], "Cash")
+    with pytest.raises(PaymentError, match="already processed"):
+        services.outbox.process_payment(paid_order["order_id"], "Cash")
+    assert services.outbox.status()["counts"] == {"pending": 1}
+
+
+def test_completion_is_skipped_once_the_order_was_cancelled(services, paid_order):
+    order_id = paid_order["order_id"]
+    services.outbox.process_payment(order_id, "Card")
+    services.order.cancel_order(order_id)
+    assert services.outbox.drain()["skipped"] == 1
+    assert services.outbox.status()["counts"] == {"skipped": 1}
+
+
+def test_rollup_entries_are_applied_once(services, paid_order):
+    order_id = paid_order["order_id"]
+    services.order.cancel_order(order_id)  # applies the CANCELLED event itself
+    services.outbox.store.enqueue(ROLLUP_EFFECTS["CANCELLED"], f"rollup:{order_id}", {"order_id": order_id})
+    assert services.outbox.drain()["skipped"] == 1
+    assert services.report.top_selling_products(1) == []
+
+
+def test_failing_listeners_are_redelivered(services, customer, products):
+    calls = []
+
+    def flaky(event, items):
+        calls.append(event)
+        if len(calls) == 1:
+            raise RuntimeError("down")
+
+    services.order.listeners.append(flaky)
+    services.order.create_order(customer["cust_id"], [{"prod_id": products[0]["prod_id"], "quantity": 1}])
+    assert services.order.queued == 1
+    assert services.outbox.drain()["done"] == 1
+    assert calls == ["CREATED", "CREATED"]
+
+
+def test_failing_effects_are_retried_then_dead_lettered(services, paid_order, monkeypatch):
+    monkeypatch.setenv("RETAIL_OUTBOX_MAX_ATTEMPTS", "2")
+    outbox = type(services.outbox)(order_service=services.order, payment_service=services.payment)
+    monkeypatch.setattr(outbox.payment_service.repo, "update_status_many",
+                        lambda *a, **k: (_ for _ in ()).throw(RuntimeError("payments down")))
+    outbox.cancel_order(paid_order["order_id"])
+    # no backoff here, so the same drain picks the entry up again until it is dead
+    assert outbox.drain() == {"batches": 2, "done": 0, "skipped": 0, "retried": 1, "dead": 1}
+    dead = outbox.status()["dead"]
+    assert [d["payload"]["order_id"] for d in dead] == [paid_order["order_id"]]
+    assert "payments down" in dead[0]["last_error"]
+
+
+def test_completions_drain_in_two_round_trips(services, customer, products, round_trips):
+    ids = []
+    for _ in range(5):
+        order = services.order.create_order(customer["cust_id"],
+                                            [{"prod_id": products[0]["prod_id"], "quantity": 1}])["order"]
+        services.payment.create_pending_payment(order["order_id"], order["total_amount"])
+        services.outbox.process_payment(order["order_id"], "UPI")
+        ids.append(order["order_id"])
+    with round_trips() as rt:
+        assert services.outbox.drain()["done"] == 5
+    assert rt.count == 2  # the payments, then one complete_orders call
+    assert {d["order"]["status"] for d in services.order.get_orders_details(ids)} == {"COMPLETED"}
+
+
+def test_refund_without_a_payment_is_dead_lettered(services, customer, products):
+    order = services.order.create_order(customer["cust_id"],
+                                        [{"prod_id": products[0]["prod_id"], "quantity": 1}])["order"]
+    services.outbox.cancel_order(order["order_id"])
+    assert services.outbox.drain() == {"batches": 1, "done": 0, "skipped": 0, "retried": 0, "dead": 1}
+    dead = services.outbox.status()["dead"]
+    assert [(d["payload"]["order_id"], d["last_error"]) for d in dead] == \
+        [(order["order_id"], "no payment record to refund")]
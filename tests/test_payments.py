@@ -0,0 +1,65 @@
+import pytest
+
+from src.services.payment_service import PaymentError
+
+
+@pytest.fixture
+def placed(services, customer, products):
+    """Three PLACED orders of 2.5, 5.0 and 7.5, each with a PENDING payment."""
+    orders = []
+    for qty in (1, 2, 3):
+        order = services.order.create_order(customer["cust_id"],
+                                            [{"prod_id": products[0]["prod_id"], "quantity": qty}])["order"]
+        services.payment.create_pending_payment(order["order_id"], order["total_amount"])
+        orders.append(order)
+    return orders
+
+
+def test_process_payment_completes_the_order(services, placed):
+    order_id = placed[0]["order_id"]
+    assert services.payment.process_payment(order_id, "Card")["status"] == "PAID"
+    assert services.order.get_order_details(order_id)["order"]["status"] == "COMPLETED"
+    with pytest.raises(PaymentError, match="already processed"):
+        services.payment.process_payment(order_id, "Card")
+    with pytest.raises(PaymentError, match="not found"):
+        services.payment.process_payment(999, "Cash")
+
+
+def test_settle_reconciles_every_line(services, placed):
+    a, b, c = (o["order_id"] for o in placed)
+    services.order.cancel_order(b)
+    lines = [
+        {"order_id": a, "amount": 2.5, "method": "UPI"},
+        {"order_id": a, "amount": 2.5, "method": "UPI"},
+        {"order_id": b, "amount": 5.0, "method": "Cash"},
+        {"order_id": 999, "amount": 1.0, "method": "Cash"},
+        {"order_id": a + 1000, "amount": "x", "method": "Card"},
+        {"order_id": a, "method": "Cheque", "amount": 1},
+    ]
+    results = {(r.get("line"), r["order_id"]): r["result"] for r in services.payment.settle(lines, chunk_size=2)}
+    assert results == {
+        (1, a): "settled",
+        (2, a): "duplicate_line",
+        (3, b): "order_not_placed",
+        (4, 999): "unknown_order",
+        (5, a + 1000): "invalid_line",
+        (6, a): "invalid_line",
+        (None, c): "unsettled",
+    }
+    assert services.order.get_order_details(a)["order"]["status"] == "COMPLETED"
+
+
+def test_settle_checks_amounts_and_earlier_payments(services, placed):
+    a, b, _ = (o["order_id"] for o in placed)
+    services.payment.process_payment(b, "Card")
+    results = [r["result"] for r in services.payment.settle([{"order_id": a, "amount": 2.6, "method": "Cash"},
+                                                             {"order_id": b, "amount": 5.0, "method": "Cash"}])]
+    assert results[:2] == ["amount_mismatch", "already_paid"]
+    assert [r["result"] for r in services.payment.settle([{"order_id": a, "amount": 2.505, "method": "Cash"}])][0] \
+        == "settled"
+
+
+def test_settle_reports_lines_that_are_not_objects(services):
+    results = list(services.payment.settle([["x"], 5, "order 1"]))
+    assert [(r["line"], r["order_id"], r["result"]) for r in results] == \
+        [(1, None, "invalid_line"), (2, None, "invalid_line"), (3, None, "invalid_line")]
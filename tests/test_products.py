@@ -0,0 +1,89 @@
+import pytest
+
+from src.dao.product_dao import ProductQuery
+from src.services.product_service import ProductError
+
+
+def test_writes_return_the_written_row(services):
+    pen = services.product.add("Pen", "PEN-1", 2.5, 10, "office")
+    assert (pen["name"], pen["sku"], pen["stock"], pen["category"]) == ("Pen", "PEN-1", 10, "office")
+    updated = services.product.update(pen["prod_id"], price=3.0)
+    assert updated["price"] == 3.0 and updated["stock"] == 10
+    assert services.product.delete(pen["prod_id"])["sku"] == "PEN-1"
+    with pytest.raises(ProductError, match="Product not found"):
+        services.product.get_by_id(pen["prod_id"])
+
+
+def test_add_rejects_bad_prices_and_taken_skus(services, products):
+    with pytest.raises(ProductError, match="SKU already exists"):
+        services.product.add("Pen", "PEN-1", 1.0)
+    with pytest.raises(ProductError, match="greater than 0"):
+        services.product.add("Free", "FREE-1", 0)
+    with pytest.raises(ProductError, match="finite"):
+        services.product.add("Odd", "NAN-1", float("nan"))
+    with pytest.raises(ProductError, match="SKU already exists: INK-1"):
+        services.product.add_many([{"name": "Cap", "sku": "CAP-1", "price": 1.0},
+                                   {"name": "Ink", "sku": "INK-1", "price": 1.0}])
+    with pytest.raises(ProductError, match="Duplicate SKU"):
+        services.product.add_many([{"name": "Cap", "sku": "CAP-1", "price": 1.0}] * 2)
+
+
+def test_cached_reads_see_updates(services, products):
+    pen = products[0]
+    assert services.product.get_by_id(pen["prod_id"])["price"] == 2.5
+    services.product.update(pen["prod_id"], price=4.0)
+    assert services.product.get_by_id(pen["prod_id"])["price"] == 4.0
+    assert [p["sku"] for p in services.product.get_many([products[1]["prod_id"], pen["prod_id"]])] == ["INK-1", "PEN-1"]
+    with pytest.raises(ProductError, match="Product not found: 999"):
+        services.product.get_many([pen["prod_id"], 999])
+
+
+def test_bulk_upsert_only_writes_the_columns_a_row_carries(services, products):
+    summary = services.product.bulk_upsert([
+        {"name": "Pen", "sku": "PEN-1", "price": "3.0"},                       # keeps stock and category
+        {"name": "Cap", "sku": "CAP-1", "price": 1.5, "stock": 4},
+        {"name": "Cap", "sku": "CAP-1", "price": 1.75, "stock": 6},            # last occurrence wins
+        {"name": "", "sku": "X-1", "price": 1},
+        ["not", "an", "object"],
+    ], chunk_size=2)
+    assert (summary["read"], summary["duplicates"], summary["rejected"]) == (5, 1, 2)
+    assert [e["line"] for e in summary["errors"]] == [4, 5]
+    exported = {p["sku"]: p for p in services.product.export(page_size=2)}
+    assert (exported["PEN-1"]["price"], exported["PEN-1"]["stock"], exported["PEN-1"]["category"]) == (3.0, 10, "office")
+    assert (exported["CAP-1"]["price"], exported["CAP-1"]["stock"]) == (1.75, 6)
+    assert len(exported) == 4
+
+
+def test_find_filters_sorts_and_pages(services, products):
+    query = ProductQuery.of(categories=["office"], sort="price", desc=True, fields=["sku", "price"])
+    first = services.product.find(query, limit=1)
+    assert first["results"] == [{"sku": "INK-1", "price": 7.0}]
+    second = services.product.find(query, limit=1, cursor=first["next_cursor"])
+    assert second["results"] == [{"sku": "PEN-1", "price": 2.5}]
+    assert services.product.find(query, limit=1, cursor=second["next_cursor"]) == {"results": [], "next_cursor": None}
+    assert [p["sku"] for p in services.product.iter_query(ProductQuery.of(stock_below=6), page_size=1)] == \
+        ["INK-1", "MUG-1"]
+    assert [p["sku"] for p in services.product.iter_query(ProductQuery.of(min_price=3, max_price=8))] == ["INK-1"]
+
+
+def test_name_and_sku_filters_match_wildcards_literally(services):
+    services.product.add("100% Cotton", "TEE_1", 5.0)
+    services.product.add("1000 Cotton", "TEEX1", 5.0)
+    by_name = ProductQuery.of(name="100%")
+    assert [p["sku"] for p in services.product.iter_query(by_name)] == ["TEE_1"]
+    assert [p["sku"] for p in services.product.iter_query(ProductQuery.of(sku_prefix="TEE_"))] == ["TEE_1"]
+    with pytest.raises(ValueError):
+        ProductQuery.of(name="a*b")
+    with pytest.raises(ValueError, match="cannot sort"):
+        ProductQuery.of(sort="name; drop table products")
+
+
+def test_availability_covers_central_and_warehouse_stock(services, products):
+    pen = products[0]
+    services.stock.add_warehouse("OSL", "Oslo")
+    services.stock.assign(pen["prod_id"], "OSL", 4)
+    assert [a["total"] for a in services.product.availability([pen["prod_id"], products[2]["prod_id"]])] == [10, 0]
+    rows = list(services.product.with_availability(services.product.list(), chunk_size=2))
+    assert [r["available"] for r in rows] == [10, 5, 0]
+    with pytest.raises(ProductError, match="Product not found: 999"):
+        services.product.availability([999])
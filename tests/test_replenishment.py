@@ -0,0 +1,29 @@
+import pytest
+
+
+def test_alerts_follow_orders_and_cancellations(services, customer, products):
+    pen, ink, mug = products
+    planner = services.replenishment
+    planner.configure(window_days=7, lead_time_days=2, safety_days=1)
+    # only the out-of-stock Mug is tracked before anything sold
+    assert [a["sku"] for a in planner.alerts()] == ["MUG-1"]
+    order = services.order.create_order(customer["cust_id"], [{"prod_id": ink["prod_id"], "quantity": 4}])["order"]
+    # 1 unit left at 4/7 a day: under two days of cover
+    assert [(a["sku"], a["stock"], a["units_sold"]) for a in planner.alerts()] == [("MUG-1", 0, 0), ("INK-1", 1, 4)]
+    plan = {p["sku"]: p for p in planner.plan(target_days=7)}
+    assert plan["INK-1"]["reorder_quantity"] == 5  # ceil(4/7 * 9) - 1
+    services.order.cancel_order(order["order_id"])
+    assert [a["sku"] for a in planner.alerts()] == ["MUG-1"]
+
+
+def test_reload_picks_up_sales_and_restocks(services, customer, products):
+    planner = services.replenishment
+    services.order.create_order(customer["cust_id"], [{"prod_id": products[1]["prod_id"], "quantity": 4}])
+    assert planner.load() == 2
+    assert [a["sku"] for a in planner.alerts(horizon_days=10)] == ["MUG-1", "INK-1"]
+    services.product.update(products[2]["prod_id"], stock=50)
+    planner.load()
+    assert [a["sku"] for a in planner.alerts(horizon_days=10)] == ["INK-1"]
+    assert planner.status()["tracked_skus"] == 1  # the restocked Mug never sold
+    with pytest.raises(ValueError):
+        planner.configure(window_days=0)
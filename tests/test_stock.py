@@ -0,0 +1,119 @@
+import threading
+
+import pytest
+
+from src.config import SupabaseConfig
+from src.services.order_service import OrderError
+from src.services.stock_service import StockError
+
+
+def test_reserve_is_all_or_nothing(services, products, stock_of):
+    pen, ink, _ = products
+    services.stock.reserve([{"prod_id": pen["prod_id"], "quantity": 4}, {"prod_id": pen["prod_id"], "quantity": 1}])
+    assert stock_of(pen["prod_id"]) == 5
+    with pytest.raises(StockError) as err:
+        services.stock.reserve([{"prod_id": pen["prod_id"], "quantity": 1}, {"prod_id": ink["prod_id"], "quantity": 6}])
+    assert [f["prod_id"] for f in err.value.failed_lines] == [ink["prod_id"]]
+    assert stock_of(pen["prod_id"]) == 5
+    services.stock.release([{"prod_id": pen["prod_id"], "quantity": 5}])
+    assert stock_of(pen["prod_id"]) == 10
+    with pytest.raises(StockError, match="greater than 0"):
+        services.stock.reserve([{"prod_id": pen["prod_id"], "quantity": -1}])
+
+
+def test_concurrent_reservations_never_oversell(services, products, stock_of):
+    ink = products[1]
+    outcomes = []
+
+    def take():
+        try:
+            services.stock.reserve([{"prod_id": ink["prod_id"], "quantity": 1}])
+            outcomes.append("ok")
+        except StockError:
+            outcomes.append("short")
+
+    threads = [threading.Thread(target=take) for _ in range(12)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert outcomes.count("ok") == 5
+    assert stock_of(ink["prod_id"]) == 0
+
+
+def test_assign_moves_central_stock_into_shards(services, products):
+    pen = products[0]
+    services.stock.add_warehouse("OSL", "Oslo", "Oslo", priority=1)
+    services.stock.assign(pen["prod_id"], "OSL", 6, shards=3)
+    avail = services.stock.availability([pen["prod_id"]], fresh=True)[pen["prod_id"]]
+    assert (avail["central"], avail["located"], avail["total"]) == (4, 6, 10)
+    with pytest.raises(StockError, match="Not enough unassigned stock"):
+        services.stock.assign(pen["prod_id"], "OSL", 5)
+    services.stock.assign(pen["prod_id"], "OSL", 5, from_central=False)
+    assert services.stock.availability([pen["prod_id"]], fresh=True)[pen["prod_id"]]["total"] == 15
+
+
+def test_assign_rejects_bad_input(services, products):
+    services.stock.add_warehouse("OSL", "Oslo")
+    with pytest.raises(StockError, match="already exists"):
+        services.stock.add_warehouse("OSL", "Oslo again")
+    with pytest.raises(StockError, match="Warehouse not found: BGO"):
+        services.stock.assign(products[0]["prod_id"], "BGO", 1)
+    with pytest.raises(StockError, match="Product not found: 999"):
+        services.stock.assign(999, "OSL", 1, from_central=False)
+    with pytest.raises(StockError, match="Shards must be"):
+        services.stock.assign(products[0]["prod_id"], "OSL", 1, shards=0)
+    with pytest.raises(StockError, match="Unknown allocation strategy"):
+        services.stock.allocation("cheapest")
+
+
+def _warehouses_used(order_id):
+    rows = SupabaseConfig.get_client().table("order_allocations").select("*").eq("order_id", order_id).execute().data
+    used = {}
+    for r in rows:
+        used[r["warehouse_id"]] = used.get(r["warehouse_id"], 0) + r["quantity"]
+    return used
+
+
+@pytest.fixture
+def warehouses(services, products):
+    """Pen: 3 units in Bergen (priority 1) and 3 in Oslo (priority 2), 4 central."""
+    pen = products[0]
+    bgo = services.stock.add_warehouse("BGO", "Bergen", "Bergen", priority=1)
+    osl = services.stock.add_warehouse("OSL", "Oslo", "Oslo", priority=2)
+    services.stock.assign(pen["prod_id"], "BGO", 3, shards=2)
+    services.stock.assign(pen["prod_id"], "OSL", 3, shards=2)
+    return bgo, osl
+
+
+def test_priority_allocation_fills_from_the_first_warehouse(services, customer, products, warehouses):
+    bgo, osl = warehouses
+    order = services.order.create_order(customer["cust_id"], [{"prod_id": products[0]["prod_id"], "quantity": 2}],
+                                        allocation="priority")["order"]
+    assert _warehouses_used(order["order_id"]) == {bgo["warehouse_id"]: 2}
+
+
+def test_nearest_allocation_prefers_the_customers_city(services, customer, products, warehouses):
+    bgo, osl = warehouses
+    order = services.order.create_order(customer["cust_id"], [{"prod_id": products[0]["prod_id"], "quantity": 2}],
+                                        allocation="nearest")["order"]
+    assert _warehouses_used(order["order_id"]) == {osl["warehouse_id"]: 2}
+
+
+def test_orders_spill_over_to_the_central_pool(services, customer, products, warehouses, stock_of):
+    pen = products[0]
+    order = services.order.create_order(customer["cust_id"], [{"prod_id": pen["prod_id"], "quantity": 8}])["order"]
+    used = _warehouses_used(order["order_id"])
+    assert sum(used.values()) == 8 and used[None] == 2
+    assert stock_of(pen["prod_id"]) == 2
+    with pytest.raises(OrderError, match="Not enough stock for Pen"):
+        services.order.create_order(customer["cust_id"], [{"prod_id": pen["prod_id"], "quantity": 3}])
+
+
+def test_cancel_puts_units_back_where_they_came_from(services, customer, products, warehouses):
+    pen = products[0]
+    before = services.stock.availability([pen["prod_id"]], fresh=True)[pen["prod_id"]]
+    order = services.order.create_order(customer["cust_id"], [{"prod_id": pen["prod_id"], "quantity": 8}])["order"]
+    services.order.cancel_order(order["order_id"])
+    after = services.stock.availability([pen["prod_id"]], fresh=True)[pen["prod_id"]]
+    assert after == before